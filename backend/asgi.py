@@ -0,0 +1,145 @@
+"""ASGI application serving the same routes as router.lambda_handler.
+
+Run with any ASGI server, e.g.: uvicorn asgi:app --port 8000
+
+One event loop serves every connection. Scoring only reads the preloaded
+snapshots, so it runs inline on the loop; handlers that wait on the
+database run on a bounded thread pool, each thread keeping its own warm
+connection, so a slow query never stalls the loop and the number of
+database connections stays fixed however many clients there are.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+import gender_gap_handler
+import router
+from instrumentation import timing_requested
+from singleflight import SingleFlight
+from structured_logging import get_logger
+
+logger = get_logger('asgi')
+
+# Threads (and so database connections) for blocking handlers
+DB_THREADS = int(os.environ.get('DB_THREADS', '8'))
+
+# Handlers that wait on the database; the others only read the snapshots
+BLOCKING_HANDLERS = {gender_gap_handler.calculate_gender_gap}
+
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix='db')
+
+# Identical concurrent requests for the pool share one pool slot and one response
+POOL_FLIGHTS = SingleFlight('pooled requests')
+
+
+def build_event(scope, body):
+    """API Gateway (REST, v1) proxy event for an ASGI HTTP request"""
+    query = scope.get('query_string', b'').decode('latin-1')
+    return {
+        'httpMethod': scope['method'],
+        'path': scope['path'],
+        'headers': {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']},
+        'queryStringParameters': dict(parse_qsl(query)) or None,
+        'body': body.decode('utf-8') if body else None,
+        'isBase64Encoded': False
+    }
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def data_ready():
+    return all(cache.ready() for cache in router.DATA_CACHES)
+
+
+async def call_handler(target, event, key):
+    """Run inline when the handler only reads loaded snapshots, else on the database pool.
+
+    Pooled calls are coalesced on key (see request_key), so a burst of
+    identical requests holds one thread rather than all of them.
+    """
+    if target not in BLOCKING_HANDLERS and data_ready():
+        return target(event, None)
+    response = await POOL_FLIGHTS.do_async(key, run_pooled, target, event)
+    # Shared: a sampled trace of the call must not add timing nobody asked for
+    return response if key[-1] else strip_timing(response)
+
+
+def request_key(scope, event, body):
+    """Coalescing key: the request line and body, plus whether X-Timing asked for a
+    Server-Timing header, so a shared response always matches that choice"""
+    timed = timing_requested(event['headers'])
+    return scope['method'], scope['path'], scope.get('query_string', b''), body, timed
+
+
+def strip_timing(response):
+    """The response without a Server-Timing header (from a sampled trace of the shared call)"""
+    headers = response.get('headers')
+    if not headers or 'Server-Timing' not in headers:
+        return response
+    headers = {name: value for name, value in headers.items() if name != 'Server-Timing'}
+    return dict(response, headers=headers)
+
+
+async def run_pooled(target, event):
+    # Blocks on a query, or on the first load (up to READY_TIMEOUT)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(DB_EXECUTOR, target, event, None)
+
+
+async def send_response(send, response):
+    body = (response.get('body') or '').encode('utf-8')
+    headers = [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+               for name, value in (response.get('headers') or {}).items()]
+    headers.append((b'content-length', str(len(body)).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': response.get('statusCode', 200), 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def http(scope, receive, send):
+    body = await read_body(receive)
+    if body is None:
+        return
+    event = build_event(scope, body)
+    target, result = router.resolve(event)
+    if target is None:
+        await send_response(send, result)
+        return
+    try:
+        key = request_key(scope, event, body)
+        response = await call_handler(target, result, key)
+    except Exception as e:
+        logger.error("Unhandled error for %s %s: %s", scope['method'], scope['path'], e)
+        response = {'statusCode': 500, 'body': json.dumps({'success': False, 'error': {'code': 'INTERNAL_ERROR'}})}
+    await send_response(send, response)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Load off the loop; until then requests wait on the pool (and get 503 past the deadline)
+            for cache in router.DATA_CACHES:
+                cache.preload('background')
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            DB_EXECUTOR.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'http':
+        await http(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await lifespan(receive, send)
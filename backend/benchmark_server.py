@@ -0,0 +1,118 @@
+"""Requests per second of server.py against its number of worker processes.
+
+Usage: python benchmark_server.py [--workers 1,2,4,8] [--clients 16] [--seconds 10]
+
+Each round starts server.py with that many workers on the same snapshot
+file (built from the database if it does not exist yet), then runs
+keep-alive clients in separate processes posting fairness calculations.
+Throughput should grow with the worker count up to the number of cores.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+BODY = json.dumps({
+    "occupation": "Engineering Managers",
+    "industry": "Mining",
+    "education": "Bachelor Degree",
+    "location": "VIC",
+    "currentHourlyRate": 45.50,
+    "yearsExperience": 5,
+    "workIntensity": 75,
+    "earningsType": "weekly"
+})
+
+HEADERS = {'Content-Type': 'application/json'}
+
+
+def client(port, seconds, results):
+    """Post requests over one keep-alive connection until time is up; reports (ok, failed)"""
+    ok = failed = 0
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            connection.request('POST', '/fairness/calculate', BODY, HEADERS)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                ok += 1
+            else:
+                failed += 1
+            if response.will_close:
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            connection.close()
+    connection.close()
+    results.put((ok, failed))
+
+
+def wait_until_serving(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/gender-gap/options')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start within {timeout}s')
+
+
+def run_round(workers, args):
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'),
+               '--host', '127.0.0.1', '--port', str(args.port), '--workers', str(workers),
+               '--snapshot', args.snapshot, '--reuse-snapshot']
+    env = dict(os.environ, LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'))
+    server = subprocess.Popen(command, env=env)
+    try:
+        wait_until_serving(args.port, args.startup_timeout)
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client, args=(args.port, args.seconds, results))
+                   for _ in range(args.clients)]
+        start = time.perf_counter()
+        for process in clients:
+            process.start()
+        totals = [results.get() for _ in clients]
+        elapsed = time.perf_counter() - start
+        for process in clients:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait()
+    ok = sum(count for count, _ in totals)
+    failed = sum(count for _, count in totals)
+    return ok / elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark server.py throughput against worker count')
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cores} | {n for n in (8, 16, 32) if n <= cores})
+    parser.add_argument('--workers', default=','.join(map(str, default_workers)))
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive connections')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--snapshot', default='/tmp/wage-fairness-benchmark.snapshot')
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"{cores} cores, {args.clients} clients, {args.seconds:g}s per round")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'errors':>7}")
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(',')):
+        rate, failed = run_round(workers, args)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.0f} {rate / baseline:>7.2f}x {failed:>7}")
+
+
+if __name__ == '__main__':
+    main()
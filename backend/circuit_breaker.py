@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+from structured_logging import get_logger
+
+logger = get_logger('circuit_breaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+
+
+class CircuitOpen(Exception):
+    """The dependency is marked down; the call was refused without trying it"""
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency so callers fail fast instead of timing out.
+
+    Outcomes of the last `window` calls are kept; a call that raises, or
+    (with check_latency) takes longer than `slow_ms`, is a failure. Once at
+    least `min_calls` are recorded and the failure share reaches
+    `failure_rate`, the breaker opens: call() raises CircuitOpen at once.
+    While open, a daemon thread runs `probe()` every `open_seconds` and
+    closes the breaker on the first success, then calls the on_recover
+    listeners (e.g. to reload data that was served stale meanwhile).
+    """
+
+    def __init__(self, name, probe, failure_rate=0.5, min_calls=5, window=20,
+                 slow_ms=2000, open_seconds=10):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_ms = slow_ms
+        self.open_seconds = open_seconds
+        self._probe = probe
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.state = CLOSED
+        self.opened_at = None
+        self.trips = 0
+        self.rejected = 0
+
+    def is_open(self):
+        return self.state == OPEN
+
+    def on_recover(self, callback):
+        """Call callback() each time the breaker closes again"""
+        self._listeners.append(callback)
+
+    def call(self, fn, *args, check_latency=True):
+        """Return fn(*args), recording its outcome; raises CircuitOpen while open"""
+        if self.state == OPEN:
+            with self._lock:
+                self.rejected += 1
+            raise CircuitOpen(f"{self.name} is unavailable (circuit open)")
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            self.record(False)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.record(not (check_latency and elapsed_ms > self.slow_ms))
+        return result
+
+    def record(self, ok):
+        """Add one call outcome, opening the breaker if the failure share is too high"""
+        with self._lock:
+            if self.state == OPEN:
+                return
+            self._outcomes.append(ok)
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+            if calls < self.min_calls or failures < calls * self.failure_rate:
+                return
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            self._outcomes.clear()
+        logger.warning("Circuit %s opened: %d of the last %d calls failed or were slow",
+                       self.name, failures, calls)
+        threading.Thread(target=self._recover, name=f'probe-{self.name}', daemon=True).start()
+
+    def _recover(self):
+        while True:
+            time.sleep(self.open_seconds)
+            try:
+                self._probe()
+            except Exception as e:
+                logger.info("Circuit %s still open: %s", self.name, e)
+                continue
+            break
+        with self._lock:
+            self.state = CLOSED
+            down = time.monotonic() - self.opened_at
+        logger.warning("Circuit %s closed after %.0fs", self.name, down)
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Circuit %s recovery callback failed: %s", self.name, e)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': len(self._outcomes) - sum(self._outcomes)
+            }
@@ -0,0 +1,302 @@
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from instrumentation import emit_load_metric
+from structured_logging import get_logger
+
+logger = get_logger('data_snapshot')
+
+# Seconds between background refreshes (0 disables the schedule)
+REFRESH_INTERVAL = float(os.environ.get('DATA_REFRESH_SECONDS', '3600'))
+
+# Load at import: "background", "sync" or "off" (default: background on Lambda, off elsewhere)
+PRELOAD_MODE = os.environ.get(
+    'PRELOAD_DATA', 'background' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'off'
+).lower()
+
+# Seconds a request waits for a load in progress before giving up
+READY_TIMEOUT = float(os.environ.get('DATA_READY_TIMEOUT', '20'))
+
+
+# Snapshot file layout: magic, payload length, buffer count, then (offset, length)
+# per out-of-band buffer; the pickle payload follows and the buffers are 8-byte aligned
+SNAPSHOT_MAGIC = b'WFSNAP1\n'
+_HEADER = struct.Struct('<QQ')
+_BUFFER = struct.Struct('<QQ')
+
+
+class DataNotReady(Exception):
+    """The first snapshot is still loading and the caller's deadline passed"""
+
+
+class Snapshot:
+    """One fully built generation of reference data; never modified once published"""
+    __slots__ = ('data', 'version', 'loaded_at', 'stamp', 'fallback')
+
+    def __init__(self, data, version, stamp=None):
+        self.data = data
+        self.version = version
+        self.loaded_at = datetime.now(timezone.utc)
+        self.stamp = stamp
+        # Served from the cache's fallback because the source could not be loaded
+        self.fallback = False
+
+    def describe(self, stale=False):
+        """Version block reported in API responses; stale marks data that may be out of date"""
+        return {
+            'version': self.version,
+            'loadedAt': self.loaded_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'stale': stale or self.fallback
+        }
+
+
+class _FirstLoad:
+    """One attempt at loading the first snapshot, which any number of callers wait on"""
+    __slots__ = ('done', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class SnapshotCache:
+    """Double-buffered data cache rebuilt off the request path.
+
+    `build(previous)` gets the published snapshot's data (None on a full
+    load) so it can reuse it, but must not modify it.
+
+    A refresh builds a complete new Snapshot while readers keep using the
+    published one, then publishes it with a single reference assignment, so
+    a reader holding a snapshot never sees a half-built one and never waits
+    for a reload. Even the very first load runs on a thread of its own;
+    callers only wait for it, each up to its own timeout.
+
+    A daemon thread refreshes every `interval` seconds, or at once after
+    request_refresh(). `stamp`, if given, returns a cheap change marker
+    (e.g. a file mtime); scheduled refreshes are skipped while it is unchanged.
+    On Lambda the thread only runs while the container is thawed.
+
+    If the first load fails, `fallback()` (when given) may return a
+    Snapshot to serve instead, e.g. one mapped from a bundled snapshot file;
+    it is marked stale until a load succeeds.
+    """
+
+    def __init__(self, name, build, interval=REFRESH_INTERVAL, stamp=None, fallback=None):
+        self.name = name
+        self.interval = interval
+        self._build = build
+        self._stamp = stamp
+        self._fallback = fallback
+        self.current = None
+        self._version = 0
+        self._build_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._forced = False
+        self._thread = None
+        self._first_load = None
+
+    def ready(self):
+        """Whether a snapshot has been published"""
+        return self.current is not None
+
+    def get(self, timeout=None):
+        """Return the published snapshot, waiting at most `timeout` seconds for the first one.
+
+        The caller never loads it itself: a first load is started in the
+        background, or the one in progress joined, and DataNotReady is
+        raised if it is not published in time. The load carries on for later
+        callers. If it fails, its error is raised to the callers waiting on
+        it and the next get() starts another.
+        """
+        snapshot = self.current
+        if snapshot is not None:
+            return snapshot
+        attempt = self._start_first_load('request')
+        if not attempt.done.wait(timeout):
+            raise DataNotReady(f"{self.name} is still loading after {timeout}s")
+        if self.current is None:
+            raise attempt.error
+        return self.current
+
+    def preload(self, mode=PRELOAD_MODE):
+        """Start the first load during module initialization (the Lambda init phase).
+
+        "background" returns at once; requests then wait for the load
+        through get(timeout). "sync" waits for it before returning.
+        Failures are logged and the next get() retries.
+        """
+        if mode not in ('background', 'sync') or self.current is not None:
+            return
+        attempt = self._start_first_load('init')
+        if mode == 'sync':
+            attempt.done.wait()
+
+    def _start_first_load(self, phase):
+        """The first-load attempt in progress, starting one if there is none"""
+        with self._start_lock:
+            attempt = self._first_load
+            if attempt is None or (attempt.done.is_set() and self.current is None):
+                attempt = self._first_load = _FirstLoad()
+                threading.Thread(target=self._load_first, args=(attempt, phase),
+                                 name=f'load-{self.name}', daemon=True).start()
+            return attempt
+
+    def _load_first(self, attempt, phase):
+        try:
+            with self._build_lock:
+                try:
+                    if self.current is None:
+                        self._publish(phase=phase)
+                except Exception as e:
+                    logger.error("Loading %s failed: %s", self.name, e)
+                    if self._load_fallback() is None:
+                        attempt.error = e
+        finally:
+            attempt.done.set()
+        if self.interval:
+            self.start()
+
+    def _load_fallback(self):
+        if self._fallback is None:
+            return None
+        try:
+            snapshot = self._fallback()
+        except Exception as e:
+            logger.error("Loading the fallback for %s failed: %s", self.name, e)
+            return None
+        if snapshot is None:
+            return None
+        snapshot.fallback = True
+        self._version = max(self._version, snapshot.version)
+        self.current = snapshot
+        logger.warning("Serving %s from its fallback (version %d) until a load succeeds",
+                       self.name, snapshot.version)
+        return snapshot
+
+    def refresh(self, force=True, full=False):
+        """Build and publish a new snapshot now; returns the published snapshot.
+
+        full=True rebuilds from scratch instead of from the current data.
+        """
+        with self._build_lock:
+            current = self.current
+            if not force and current is not None and self._stamp is not None:
+                if self._stamp() == current.stamp:
+                    return current
+            return self._publish(full)
+
+    def _publish(self, full=False, phase='refresh'):
+        start = time.perf_counter()
+        stamp = self._stamp() if self._stamp is not None else None
+        previous = self.current
+        data = self._build(None if full or previous is None else previous.data)
+        emit_load_metric(self.name, phase, (time.perf_counter() - start) * 1000)
+        self._version += 1
+        snapshot = Snapshot(data, self._version, stamp)
+        # The swap: readers see the old snapshot or this one, nothing in between
+        self.current = snapshot
+        logger.info("Published %s version %d", self.name, snapshot.version)
+        return snapshot
+
+    def adopt(self, snapshot):
+        """Publish a snapshot built elsewhere (e.g. mapped from a snapshot file)"""
+        with self._build_lock:
+            self._version = max(self._version, snapshot.version)
+            self.current = snapshot
+        logger.info("Adopted %s version %d", self.name, snapshot.version)
+        return snapshot
+
+    def request_refresh(self):
+        """Ask the background thread to rebuild now (e.g. after the tables change)"""
+        self._forced = True
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        """Start the background refresh thread if it is not running"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f'refresh-{self.name}', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval or None)
+            self._wake.clear()
+            forced, self._forced = self._forced, False
+            try:
+                self.refresh(force=forced)
+            except Exception as e:
+                # Keep serving the published snapshot; the next cycle retries
+                logger.error("Refreshing %s failed: %s", self.name, e)
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def dump_snapshot(snapshot, path):
+    """Write a snapshot to path for map_snapshot(), replacing any old file atomically.
+
+    Only pickle protocol 5 buffers (EarningsCube cells) are stored out of
+    band as raw bytes, so every process mapping the file shares one copy in
+    the page cache. Everything else (the employees, weekly, hourly,
+    occupation, curve and baseline dicts) is in the pickle payload and is
+    rebuilt as ordinary objects on the loading process's heap.
+    """
+    buffers = []
+    payload = pickle.dumps(snapshot, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+
+    offset = _align(len(SNAPSHOT_MAGIC) + _HEADER.size + _BUFFER.size * len(raws) + len(payload))
+    table = []
+    for raw in raws:
+        table.append((offset, raw.nbytes))
+        offset = _align(offset + raw.nbytes)
+
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC + _HEADER.pack(len(payload), len(raws)))
+        for entry in table:
+            f.write(_BUFFER.pack(*entry))
+        f.write(payload)
+        for (start, _), raw in zip(table, raws):
+            f.write(b'\0' * (start - f.tell()))
+            f.write(raw)
+    # Processes that mapped the old file keep it until they drop it
+    os.replace(temp, path)
+    logger.info("Wrote snapshot version %d to %s (%d bytes)", snapshot.version, path, offset)
+
+
+def map_snapshot(path):
+    """Load a snapshot written by dump_snapshot(), its out-of-band buffers backed by a read-only mmap.
+
+    The dict tables are unpickled onto this process's heap. Forked workers
+    (server.py) share them only copy-on-write: reference counting writes
+    to the pages they touch, so each worker gradually gains private copies
+    of those pages. gc.freeze() before forking keeps the collector from
+    touching them all.
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    start = len(SNAPSHOT_MAGIC)
+    if view[:start] != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a snapshot file")
+    payload_length, count = _HEADER.unpack_from(mapped, start)
+    start += _HEADER.size
+    buffers = []
+    for _ in range(count):
+        offset, length = _BUFFER.unpack_from(mapped, start)
+        buffers.append(view[offset:offset + length])
+        start += _BUFFER.size
+    return pickle.loads(view[start:start + payload_length], buffers=buffers)
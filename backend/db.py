@@ -0,0 +1,100 @@
+import os
+import threading
+import pymysql.cursors
+from pymysql.querycache import QueryCache
+from circuit_breaker import CircuitBreaker
+from structured_logging import get_logger
+
+logger = get_logger('db')
+
+# Socket timeouts in seconds; a request's deadline (request_deadline) can only shorten them
+CONNECT_TIMEOUT = float(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.environ.get('DB_READ_TIMEOUT', '30'))
+WRITE_TIMEOUT = float(os.environ.get('DB_WRITE_TIMEOUT', '30'))
+
+# Database configuration shared by every handler
+DB_CONFIG = {
+    'host': 'fairwageaustralia.ct08osmucf2b.ap-southeast-2.rds.amazonaws.com',
+    'port': 3306,
+    'user': 'admin',
+    'password': 'fairwageaustralia',
+    'database': 'fairwageaustralia',
+    'charset': 'utf8mb4',
+    'cursorclass': pymysql.cursors.RecordCursor,
+    'connect_timeout': CONNECT_TIMEOUT,
+    'read_timeout': READ_TIMEOUT,
+    'write_timeout': WRITE_TIMEOUT
+}
+
+# Request-time SELECT results, shared across warm invocations and endpoints.
+# The tables only change on refresh, so a short TTL bounds staleness.
+QUERY_CACHE = QueryCache(maxsize=512, ttl=900)
+
+# One long-lived connection per thread for request-time queries
+_local = threading.local()
+
+# Circuit breaker thresholds (see circuit_breaker.CircuitBreaker)
+BREAKER_FAILURE_RATE = float(os.environ.get('DB_BREAKER_FAILURE_RATE', '0.5'))
+BREAKER_MIN_CALLS = int(os.environ.get('DB_BREAKER_MIN_CALLS', '5'))
+BREAKER_SLOW_MS = float(os.environ.get('DB_BREAKER_SLOW_MS', '2000'))
+BREAKER_OPEN_SECONDS = float(os.environ.get('DB_BREAKER_OPEN_SECONDS', '10'))
+
+
+def connect(**options):
+    """Open a new connection with DB_CONFIG plus options; the caller closes it"""
+    try:
+        return pymysql.connect(**dict(DB_CONFIG, **options))
+    except Exception as e:
+        logger.error("Database connection error: %s", e)
+        raise Exception(f"Failed to connect to database: {str(e)}")
+
+
+def shared_connection(deadline=None):
+    """Return this thread's warm connection (query cache on), reconnecting if it dropped.
+
+    Reused across invocations so its prepared statements are too. Its socket
+    operations are bounded by `deadline` (a request_deadline.Deadline) until
+    the next call.
+    """
+    expires = deadline.expires if deadline is not None else None
+    conn = getattr(_local, 'connection', None)
+    if conn is not None and conn.open:
+        conn.set_deadline(expires)
+        try:
+            conn.ping(reconnect=True)
+            return conn
+        except Exception as e:
+            logger.warning("Shared connection lost, reconnecting: %s", e)
+    _local.connection = None
+    _local.connection = connect(query_cache=QUERY_CACHE, deadline=expires)
+    return _local.connection
+
+
+def discard_shared_connection():
+    """Close this thread's warm connection (e.g. after a query error); the next call reconnects"""
+    conn = getattr(_local, 'connection', None)
+    _local.connection = None
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def probe():
+    """Recovery check for the breaker: open a connection and ping it"""
+    conn = connect()
+    try:
+        conn.ping(reconnect=False)
+    finally:
+        conn.close()
+
+
+# Wraps every query and table load; while open, callers serve cached data instead of waiting on timeouts
+DB_BREAKER = CircuitBreaker(
+    'database', probe,
+    failure_rate=BREAKER_FAILURE_RATE,
+    min_calls=BREAKER_MIN_CALLS,
+    slow_ms=BREAKER_SLOW_MS,
+    open_seconds=BREAKER_OPEN_SECONDS
+)
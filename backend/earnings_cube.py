@@ -0,0 +1,168 @@
+import math
+import pickle
+from array import array
+from itertools import product
+
+try:
+    import numpy as np
+
+    _have_numpy = True
+except ImportError:
+    _have_numpy = False
+
+NAN = float('nan')
+
+
+class EarningsCube:
+    """Dense, array-backed cube of earnings measures.
+
+    Every dimension has a fixed label order resolved to integer positions, so
+    a lookup is a handful of dict hits plus one flat-array index. Missing
+    cells hold NaN and are returned as None.
+    """
+
+    def __init__(self, dimensions, measures, values=None):
+        # dimensions: list of (name, labels); measures: list of measure names;
+        # values: existing cell buffer of the right size (default: all NaN)
+        self.dim_names = tuple(name for name, _ in dimensions)
+        self.labels = {name: list(labels) for name, labels in dimensions}
+        self.positions = {name: {label: i for i, label in enumerate(labels)} for name, labels in dimensions}
+        self.measures = {measure: i for i, measure in enumerate(measures)}
+
+        # Row-major strides with the measure as the innermost axis
+        self.shape = tuple(len(labels) for _, labels in dimensions) + (len(measures),)
+        strides = []
+        step = 1
+        for size in reversed(self.shape):
+            strides.append(step)
+            step *= size
+        self.strides = tuple(reversed(strides))
+        self.values = array('d', [NAN]) * step if values is None else values
+
+    def __reduce_ex__(self, protocol):
+        # Protocol 5 pickles the cells out of band, so a mapped snapshot file
+        # (data_snapshot.map_snapshot) backs them without a copy
+        values = pickle.PickleBuffer(self.values) if protocol >= 5 else self.values
+        dimensions = [(name, self.labels[name]) for name in self.dim_names]
+        return _restore_cube, (dimensions, list(self.measures), values)
+
+    def _offset(self, coords, measure):
+        offset = self.measures[measure] * self.strides[-1]
+        for name, stride, label in zip(self.dim_names, self.strides, coords):
+            offset += self.positions[name][label] * stride
+        return offset
+
+    def set(self, coords, measure, value):
+        self.values[self._offset(coords, measure)] = value
+
+    def get(self, coords, measure):
+        """Return the value at coords (one label per dimension) or None"""
+        try:
+            value = self.values[self._offset(coords, measure)]
+        except KeyError:
+            return None
+        return None if math.isnan(value) else value
+
+    def get_many(self, coords, measures):
+        """Return {measure: value} for several measures of one cell"""
+        try:
+            base = self._offset(coords, next(iter(self.measures)))
+        except KeyError:
+            return {measure: None for measure in measures}
+        result = {}
+        for measure in measures:
+            value = self.values[base + self.measures[measure] * self.strides[-1]]
+            result[measure] = None if math.isnan(value) else value
+        return result
+
+    def slice(self, measure, **selection):
+        """Iterate (coords, value) over the cells matching a selection.
+
+        Each keyword names a dimension and gives one label or a list of
+        labels; unnamed dimensions span all their labels. Empty cells are
+        skipped.
+        """
+        axes = []
+        for name in self.dim_names:
+            chosen = selection.get(name)
+            if chosen is None:
+                axes.append(self.labels[name])
+            elif isinstance(chosen, (list, tuple, set, frozenset)):
+                axes.append([label for label in chosen if label in self.positions[name]])
+            else:
+                axes.append([chosen] if chosen in self.positions[name] else [])
+
+        for coords in product(*axes):
+            value = self.values[self._offset(coords, measure)]
+            if not math.isnan(value):
+                yield coords, value
+
+    def as_array(self, measure=None):
+        """Zero-copy NumPy view of the cube (optionally of one measure)"""
+        if not _have_numpy:
+            raise RuntimeError('NumPy is required for as_array()')
+        cube = np.frombuffer(self.values, dtype=np.float64).reshape(self.shape)
+        if measure is None:
+            return cube
+        return cube[..., self.measures[measure]]
+
+    def latest(self, dimension):
+        """Last label of a dimension (e.g. the newest survey year)"""
+        return self.labels[dimension][-1]
+
+
+def _restore_cube(dimensions, measures, values):
+    if not isinstance(values, array):
+        # An out-of-band buffer (read-only when mapped from a file)
+        values = memoryview(values).cast('d')
+    return EarningsCube(dimensions, measures, values)
+
+
+def build_cube(rows, dimensions, measures):
+    """Build an EarningsCube from (coords, {measure: value}) rows.
+
+    dimensions is a list of dimension names; labels are collected from the
+    rows and sorted so that slices come out in a stable order.
+    """
+    labels = {name: set() for name in dimensions}
+    for coords, _ in rows:
+        for name, label in zip(dimensions, coords):
+            labels[name].add(label)
+
+    cube = EarningsCube([(name, sorted(labels[name])) for name in dimensions], measures)
+    for coords, values in rows:
+        for measure, value in values.items():
+            if value is not None:
+                cube.set(coords, measure, value)
+    return cube
+
+
+def merge_cube(cube, rows):
+    """Return a copy of cube with (coords, {measure: value}) rows written in.
+
+    Cells named in rows are replaced (missing measures become empty); the
+    rest are kept. When the only new labels are trailing labels of the first
+    dimension (a new survey year), the old values are copied as one block.
+    """
+    dimensions = list(cube.dim_names)
+    measures = list(cube.measures)
+    labels = {name: set(cube.labels[name]) for name in dimensions}
+    for coords, _ in rows:
+        for name, label in zip(dimensions, coords):
+            labels[name].add(label)
+
+    merged = EarningsCube([(name, sorted(labels[name])) for name in dimensions], measures)
+    first = dimensions[0]
+    if (all(merged.labels[name] == cube.labels[name] for name in dimensions[1:])
+            and merged.labels[first][:len(cube.labels[first])] == cube.labels[first]):
+        memoryview(merged.values)[:len(cube.values)] = cube.values
+    else:
+        for measure in measures:
+            for coords, value in cube.slice(measure):
+                merged.set(coords, measure, value)
+
+    for coords, values in rows:
+        for measure in measures:
+            value = values.get(measure)
+            merged.set(coords, measure, NAN if value is None else value)
+    return merged
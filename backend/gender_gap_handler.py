@@ -1,62 +1,56 @@
 import json
 import csv
 import os
-import logging
+from concurrent.futures import ThreadPoolExecutor
 import pymysql.cursors
-from collections import defaultdict
+import db
+from circuit_breaker import CircuitOpen
+from data_snapshot import READY_TIMEOUT, DataNotReady, SnapshotCache
+from industry_codes import INDUSTRY_MAPPING
+from request_deadline import Deadline
+from singleflight import FlightTimeout, SingleFlight
+from structured_logging import get_logger
+from validation import compile_schema
 
 # Setup logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger('gender_gap_handler')
 
-# Global data cache
-INDUSTRY_DATA = {}
-DATA_LOADED = False
+# Threads running the history queries; each keeps its own warm connection
+HISTORY_WORKERS = int(os.environ.get('HISTORY_WORKERS', '4'))
+HISTORY_POOL = ThreadPoolExecutor(max_workers=HISTORY_WORKERS, thread_name_prefix='history')
 
-# Industry code mapping
-INDUSTRY_MAPPING = {
-    'A': 'Agriculture, forestry and fishing',
-    'B': 'Mining',
-    'C': 'Manufacturing',
-    'D': 'Electricity, gas, water and waste services',
-    'E': 'Construction',
-    'F': 'Wholesale trade',
-    'G': 'Retail trade',
-    'H': 'Accommodation and food services',
-    'I': 'Transport, postal and warehousing',
-    'J': 'Information media and telecommunications',
-    'K': 'Financial and insurance services',
-    'L': 'Rental, hiring and real estate services',
-    'M': 'Professional, scientific and technical services',
-    'N': 'Administrative and support services',
-    'O': 'Public administration and safety',
-    'P': 'Education and training',
-    'Q': 'Health care and social assistance',
-    'R': 'Arts and recreation services'
+# Concurrent requests for the same (state, industry) share one query, run on
+# HISTORY_POOL so each request stops waiting at its own deadline
+HISTORY_FLIGHTS = SingleFlight('historical earnings', executor=HISTORY_POOL)
+
+# Last good result per (state, industry), served stale while the database is failing
+LAST_GOOD_HISTORY = {}
+
+AVAILABLE_STATES = ["Australia", "NSW", "VIC", "QLD", "SA", "WA", "TAS", "NT", "ACT"]
+
+# Request schema - compiled once at import into a fast validator
+GENDER_GAP_SCHEMA = {
+    'state': {'type': 'str', 'allow_empty': False, 'message': 'State parameter must be a string'},
+    'industry': {'type': 'str', 'allow_empty': False, 'choices': list(INDUSTRY_MAPPING.keys())}
 }
 
-# CSV file paths (只保留gender1.csv)
-GENDER1_CSV_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gender1.csv')
+GENDER_GAP_VALIDATOR = compile_schema(GENDER_GAP_SCHEMA)
 
-# Database configuration
-DB_CONFIG = {
-    'host': 'fairwageaustralia.ct08osmucf2b.ap-southeast-2.rds.amazonaws.com',
-    'user': 'admin',
-    'password': 'fairwageaustralia',
-    'port': 3306,
-    'database': 'fairwageaustralia',  # 请根据实际数据库名称调整
-    'charset': 'utf8mb4',
-    'cursorclass': pymysql.cursors.DictCursor
+# Validator (field, code) -> API error code
+VALIDATION_ERROR_CODES = {
+    ('state', 'missing'): 'MISSING_STATE',
+    ('state', 'type'): 'INVALID_STATE',
+    ('industry', 'missing'): 'MISSING_INDUSTRY_CODE',
+    ('industry', 'type'): 'INVALID_INDUSTRY_CODE',
+    ('industry', 'choice'): 'INVALID_INDUSTRY_CODE'
 }
 
-def get_db_connection():
-    """获取数据库连接"""
-    try:
-        connection = pymysql.connect(**DB_CONFIG)
-        return connection
-    except Exception as e:
-        logger.error(f"Database connection failed: {str(e)}")
-        raise Exception(f"Failed to connect to database: {str(e)}")
+# CSV file paths (只保留gender1.csv)
+GENDER1_CSV_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gender1.csv')
+
+def get_db_connection(deadline=None):
+    """获取数据库连接 (the warm shared connection, with the query cache, bounded by deadline)"""
+    return db.shared_connection(deadline)
 
 def parse_earnings_value(value):
     """Parse earnings value, handling strings with commas"""
@@ -70,20 +64,16 @@ def parse_earnings_value(value):
     except (ValueError, TypeError):
         return 0
 
-def load_industry_data():
-    """Load industry data from gender1.csv"""
-    global INDUSTRY_DATA, DATA_LOADED
-    
-    if DATA_LOADED:
-        return
-    
+def build_industry_data(previous=None):
+    """Load industry data from gender1.csv into a new dict (the file is small; always re-read)"""
+    industry_data = {}
     try:
         # Load industry data (gender1.csv)
         with open(GENDER1_CSV_PATH, 'r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
             for row in reader:
                 industry_name = row['Industry'].strip()
-                INDUSTRY_DATA[industry_name] = {
+                industry_data[industry_name] = {
                     'average_midpoint': float(row['Average GPG Mid-point (%)']) if row['Average GPG Mid-point (%)'] else 0,
                     'median_midpoint': float(row['Median GPG Mid-point (%)']) if row['Median GPG Mid-point (%)'] else 0,
                     'total_women_percentage': float(row['Total Women (%)']) if row['Total Women (%)'] else 0,
@@ -95,20 +85,69 @@ def load_industry_data():
                     }
                 }
         
-        DATA_LOADED = True
-        logger.info(f"Loaded {len(INDUSTRY_DATA)} industries from gender1.csv")
+        logger.info("Loaded %d industries from gender1.csv", len(industry_data))
+        return industry_data
         
     except Exception as e:
-        logger.error(f"Error loading industry data: {str(e)}")
+        logger.error("Error loading industry data: %s", e)
         raise Exception(f"Failed to load industry data: {str(e)}")
 
-def get_historical_earnings_data(state, industry_code):
-    """从数据库获取指定州和行业代码的历史薪资数据"""
-    connection = None
+# Global data cache: rebuilt in the background when gender1.csv changes
+INDUSTRY_CACHE = SnapshotCache(
+    'industry data', build_industry_data,
+    stamp=lambda: os.path.getmtime(GENDER1_CSV_PATH)
+)
+
+def load_industry_data():
+    """Return the current industry data snapshot, waiting (up to READY_TIMEOUT) for the first load"""
+    return INDUSTRY_CACHE.get(timeout=READY_TIMEOUT)
+
+def get_historical_earnings_data(state, industry_code, deadline=None):
+    """从数据库获取指定州和行业代码的历史薪资数据 (one query for concurrent identical lookups).
+    
+    Returns (data, error message, stale). The request waits for the shared
+    query only until its deadline (a request_deadline.Deadline). When the
+    query fails, runs past the deadline or the database circuit is open,
+    the last good result is returned as stale; with none, CircuitOpen and
+    FlightTimeout propagate and other errors become the message.
+    """
+    key = (state, industry_code)
+    timeout = deadline.remaining() if deadline is not None else None
     try:
-        connection = get_db_connection()
+        data, error = HISTORY_FLIGHTS.do(key, fetch_historical_earnings_data, state, industry_code,
+                                         timeout=timeout)
+    except Exception as e:
+        last_good = LAST_GOOD_HISTORY.get(key)
+        if last_good is not None:
+            logger.warning("Serving stale history for %s/%s: %s", state, industry_code, e)
+            return last_good, None, True
+        if isinstance(e, (CircuitOpen, FlightTimeout)):
+            raise
+        return None, f"Database error: {str(e)}", False
+    logger.debug("Single-flight stats: %s", HISTORY_FLIGHTS.stats())
+    return data, error, False
+
+def fetch_historical_earnings_data(state, industry_code):
+    """The shared query behind get_historical_earnings_data.
+    
+    It belongs to no single request, so its database work is bounded by a
+    budget of its own rather than by the deadline of whichever request
+    started it. A result that arrives after every waiter gave up still
+    becomes the last good one.
+    """
+    data, error = db.DB_BREAKER.call(query_historical_earnings_data, state, industry_code,
+                                     Deadline.for_request())
+    if data is not None:
+        LAST_GOOD_HISTORY[(state, industry_code)] = data
+    return data, error
+
+def query_historical_earnings_data(state, industry_code, deadline=None):
+    """Query and process the historical earnings rows for one state and industry code"""
+    try:
+        connection = get_db_connection(deadline)
         
-        with connection.cursor() as cursor:
+        # Prepared once per connection; parameters and rows go over the binary protocol
+        with connection.cursor(pymysql.cursors.PreparedRecordCursor) as cursor:
             # 使用正确的表名和字段名
             sql = """
             SELECT 
@@ -127,6 +166,7 @@ def get_historical_earnings_data(state, industry_code):
             
             cursor.execute(sql, (state, industry_code))
             results = cursor.fetchall()
+            logger.debug("Query cache stats: %s", db.QUERY_CACHE.stats())
             
             if not results:
                 return None, f"No data found for state '{state}' and industry_code '{industry_code}'"
@@ -157,12 +197,26 @@ def get_historical_earnings_data(state, industry_code):
             return processed_data, None
             
     except Exception as e:
-        logger.error(f"Database query error: {str(e)}")
-        return None, f"Database error: {str(e)}"
+        logger.error("Database query error: %s", e)
+        # Drop the connection; the next request reconnects
+        db.discard_shared_connection()
+        raise
+
+def validation_error_response(error, body):
+    """Map the first validator error onto the API's error codes and messages"""
+    error_code = VALIDATION_ERROR_CODES.get((error['field'], error['code']), 'INVALID_INPUT')
     
-    finally:
-        if connection:
-            connection.close()
+    if error_code == 'MISSING_STATE':
+        return error_response(400, error_code, 'State parameter is required')
+    if error_code == 'MISSING_INDUSTRY_CODE':
+        return error_response(400, error_code, 'Industry_Code parameter is required')
+    if error_code == 'INVALID_INDUSTRY_CODE':
+        return error_response(400, error_code, {
+            'message': f"Invalid industry code: {body.get('industry')}",
+            'available_codes': list(INDUSTRY_MAPPING.keys()),
+            'code_mapping': INDUSTRY_MAPPING
+        })
+    return error_response(400, error_code, error['message'])
 
 def calculate_trend_change(historical_data, field):
     """Calculate percentage change from first to last year for a given field"""
@@ -200,33 +254,27 @@ def calculate_gender_gap(event, context):
     
     try:
         # 加载本地行业数据
-        load_industry_data()
+        snapshot = load_industry_data()
+        industry_snapshot = snapshot.data
         
         body = json.loads(event['body'])
-        state = body.get('state')
-        industry = body.get('industry')
         
-        # 验证必需参数
-        if not state:
-            return error_response(400, 'MISSING_STATE', 'State parameter is required')
+        # 验证必需参数和行业代码
+        validation = GENDER_GAP_VALIDATOR.validate(body)
+        if not validation.valid:
+            return validation_error_response(validation.errors[0], body)
         
-        if not industry:
-            return error_response(400, 'MISSING_INDUSTRY_CODE', 'Industry_Code parameter is required')
-        
-        # 验证行业代码是否有效
-        if industry not in INDUSTRY_MAPPING:
-            return error_response(400, 'INVALID_INDUSTRY_CODE', {
-                'message': f'Invalid industry code: {industry}',
-                'available_codes': list(INDUSTRY_MAPPING.keys()),
-                'code_mapping': INDUSTRY_MAPPING
-            })
+        state = validation.data['state']
+        industry = validation.data['industry']
         
         # 从数据库获取历史薪资数据
-        historical_data, db_error = get_historical_earnings_data(state, industry)
+        # Leaves time to fall back to the last good result before the Lambda times out
+        deadline = Deadline.for_request(context)
+        historical_data, db_error, stale = get_historical_earnings_data(state, industry, deadline)
         
         if db_error:
             # 如果查询失败，提供可用选项信息
-            available_states = ["Australia", "NSW", "VIC", "QLD", "SA", "WA", "TAS", "NT", "ACT"]
+            available_states = AVAILABLE_STATES
             available_industries = [
                 {'code': code, 'name': name} 
                 for code, name in INDUSTRY_MAPPING.items()
@@ -259,8 +307,8 @@ def calculate_gender_gap(event, context):
         
         # 如果本地行业数据中有匹配的行业，添加行业统计信息
         industry_name = INDUSTRY_MAPPING[industry]
-        if industry_name in INDUSTRY_DATA:
-            industry_data = INDUSTRY_DATA[industry_name]
+        if industry_name in industry_snapshot:
+            industry_data = industry_snapshot[industry_name]
             result['industry_statistics'] = {
                 'average_midpoint': industry_data['average_midpoint'],
                 'median_midpoint': industry_data['median_midpoint'],
@@ -273,10 +321,17 @@ def calculate_gender_gap(event, context):
                 }
             }
         
+        result['data_version'] = snapshot.describe(stale=stale)
         return success_response(result)
         
+    except DataNotReady as e:
+        logger.warning("Data not ready: %s", e)
+        return error_response(503, 'DATA_NOT_READY', 'Data is still loading, please retry shortly')
+    except (CircuitOpen, FlightTimeout) as e:
+        logger.warning("Database unavailable: %s", e)
+        return error_response(503, 'DATABASE_UNAVAILABLE', 'Data is temporarily unavailable, please retry shortly')
     except Exception as e:
-        logger.error(f"Error: {str(e)}")
+        logger.error("Error: %s", e)
         return error_response(500, 'INTERNAL_ERROR', str(e))
 
 def get_available_options(event, context):
@@ -295,7 +350,7 @@ def get_available_options(event, context):
     
     try:
         # 可用的州列表（基于数据观察）
-        available_states = ["Australia", "NSW", "VIC", "QLD", "SA", "WA", "TAS", "NT", "ACT"]
+        available_states = AVAILABLE_STATES
         
         # 使用本地映射而不需要查询数据库
         available_industries = [
@@ -313,7 +368,7 @@ def get_available_options(event, context):
         return success_response(result)
         
     except Exception as e:
-        logger.error(f"Error getting available options: {str(e)}")
+        logger.error("Error getting available options: %s", e)
         return error_response(500, 'INTERNAL_ERROR', str(e))
 
 def success_response(data):
@@ -343,4 +398,7 @@ def error_response(status_code, error_code, message):
                 'message': message
             }
         })
-    }
\ No newline at end of file
+    }
+
+# Start loading in module initialization (the Lambda init phase), not in the first request
+INDUSTRY_CACHE.preload()
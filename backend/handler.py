@@ -1,53 +1,56 @@
 import json
-import logging
 import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import pymysql.cursors
+import db
+from data_snapshot import READY_TIMEOUT, DataNotReady, SnapshotCache, map_snapshot
+from earnings_cube import build_cube, merge_cube
+from industry_codes import INDUSTRY_MAPPING
+from percentile_curve import PERCENTILE_CATEGORIES, build_percentile_curves
+from request_deadline import Deadline
+from instrumentation import NULL_TRACE, start_trace
+from singleflight import SingleFlight
+from structured_logging import SAMPLED, get_logger
+from validation import compile_schema
 
 # Setup logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-
-# Industry mapping - hardcoded for performance
-INDUSTRY_MAPPING = {
-    'A': 'Agriculture, forestry and fishing',
-    'B': 'Mining', 
-    'C': 'Manufacturing',
-    'D': 'Electricity, gas, water and waste services',
-    'E': 'Construction',
-    'F': 'Wholesale trade',
-    'G': 'Retail trade',
-    'H': 'Accommodation and food services',
-    'I': 'Transport, postal and warehousing',
-    'J': 'Information media and telecommunications',
-    'K': 'Financial and insurance services',
-    'L': 'Rental, hiring and real estate services',
-    'M': 'Professional, scientific and technical services',
-    'N': 'Administrative and support services',
-    'O': 'Public administration and safety',
-    'P': 'Education and training',
-    'Q': 'Health care and social assistance',
-    'R': 'Arts and recreation services'
+logger = get_logger('handler')
+
+# Request employmentStatus -> percentile table column
+EMPLOYMENT_STATUS_COLUMNS = {
+    'fullTime': 'Full_time',
+    'partTime': 'Part_time',
+    'all': 'Total'
 }
 
-# Global data cache
-OCCUPATION_DATA = {}
-EMPLOYEES_DATA = {}
-WEEKLY_EARNINGS_DATA = {}
-HOURLY_EARNINGS_DATA = {}
-DATA_LOADED = False
-
-# Database configuration
-DB_CONFIG = {
-    'host': 'fairwageaustralia.ct08osmucf2b.ap-southeast-2.rds.amazonaws.com',
-    'port': 3306,
-    'user': 'admin',
-    'password': 'fairwageaustralia',
-    'database': 'fairwageaustralia',
-    'charset': 'utf8mb4',
-    'cursorclass': pymysql.cursors.DictCursor
+# Request employmentStatus -> industry table Category
+EMPLOYMENT_STATUS_CATEGORIES = {
+    'fullTime': 'Full-time',
+    'partTime': 'Part-time',
+    'all': 'Total'
 }
 
+INDUSTRY_MEAN_DIMENSIONS = ['year', 'state', 'industry_code', 'status']
+INDUSTRY_MEAN_MEASURES = [
+    'persons_weekly', 'persons_hourly',
+    'males_weekly', 'males_hourly',
+    'females_weekly', 'females_hourly'
+]
+
+# Concurrent requests for the same category tuple share one factor computation
+FACTOR_FLIGHTS = SingleFlight('10-year factors')
+
+# Loaders run concurrently at load time, each on its own connection
+LOAD_WORKERS = int(os.environ.get('LOAD_WORKERS', '6'))
+
+# Snapshot file shipped with the package (refresh_tables.py --snapshot),
+# served when the database cannot be reached for the first load
+BUNDLED_SNAPSHOT = os.environ.get(
+    'BUNDLED_SNAPSHOT', os.path.join(os.path.dirname(__file__), 'data', 'wage_data.snapshot')
+)
+
 def normalize_industry(user_input):
     """Convert user input to industry code for database queries"""
     user_input = user_input.strip().upper()
@@ -69,41 +72,159 @@ def normalize_industry(user_input):
     return user_input
 
 def get_db_connection():
-    """Create MySQL database connection using PyMySQL"""
-    try:
-        conn = pymysql.connect(**DB_CONFIG)
-        return conn
-    except Exception as e:
-        logger.error(f"Database connection error: {str(e)}")
-        raise Exception(f"Failed to connect to database: {str(e)}")
+    """Open a new loader connection; warmup pulls whole tables across zones, so compress the transfer"""
+    return db.connect(compress=True)
 
-def load_all_data():
-    """Load all required data from database"""
-    global DATA_LOADED
-    
-    if DATA_LOADED:
-        return
+def build_wage_data(previous=None):
+    """Load the tables from the database into a new data dict.
     
+    Given the previous snapshot's data, the survey tables (append-only by
+    `Survey month`) are re-read only from their newest loaded month on and
+    merged into copies of the previous structures.
+    """
+    previous = previous or {}
     try:
-        conn = get_db_connection()
-        
-        load_occupation_data(conn)
-        load_employees_data(conn)
-        load_weekly_earnings_data(conn)
-        load_hourly_earnings_data(conn)
-        
-        conn.close()
+        data = run_loaders([
+            ('occupation', load_occupation_data, ()),
+            ('employees', load_employees_data, (previous.get('employees'),)),
+            ('weekly_earnings', load_weekly_earnings_data, (previous.get('weekly_earnings'),)),
+            ('hourly_earnings', load_hourly_earnings_data, (previous.get('hourly_earnings'),)),
+            ('percentile', load_percentile_data,
+             (previous.get('percentile_curves'), previous.get('percentile_year'))),
+            ('industry_mean_cube', load_industry_mean_data, (previous.get('industry_mean_cube'),))
+        ])
+        data['percentile_curves'], percentile_year = data.pop('percentile')
+        data['percentile_year'] = percentile_year
         
-        DATA_LOADED = True
-        logger.info("All data loaded successfully")
+        data.update(derive_latest_year(data))
+        data['survey_months'] = {
+            'employees': latest_survey_month(data['employees']),
+            'weekly_earnings': latest_survey_month(data['weekly_earnings']),
+            'hourly_earnings': latest_survey_month(data['hourly_earnings']),
+            'percentile': percentile_year,
+            'industry_mean': data['industry_mean_cube'].latest('year') if data['industry_mean_cube'] else None
+        }
+        logger.info("All data loaded successfully (%s), latest survey months: %s",
+                    'incremental' if previous else 'full', data['survey_months'])
+        return data
         
     except Exception as e:
-        logger.error(f"Error loading data: {str(e)}")
+        logger.error("Error loading data: %s", e)
         raise
 
+class DataLoadError(Exception):
+    """One or more table loaders failed; `errors` maps loader name -> exception"""
+    
+    def __init__(self, errors):
+        self.errors = errors
+        details = '; '.join(f"{name}: {error}" for name, error in errors.items())
+        super().__init__(f"{len(errors)} loader(s) failed: {details}")
+
+def run_loaders(loaders):
+    """Run (name, loader, extra args) loaders concurrently, each on its own connection.
+    
+    Returns {name: result} in loader order, whatever order they finish in.
+    Every loader runs to completion; failures are raised together as one
+    DataLoadError. Cold-start time approaches the slowest single loader.
+    """
+    def load(loader, args):
+        conn = get_db_connection()
+        try:
+            return loader(conn, *args)
+        finally:
+            conn.close()
+    
+    def run(loader, args):
+        start = time.perf_counter()
+        # Whole-table loads are slow by nature; only their failures count toward the breaker
+        result = db.DB_BREAKER.call(load, loader, args, check_latency=False)
+        return result, (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix='loader') as pool:
+        futures = [(name, pool.submit(run, loader, args)) for name, loader, args in loaders]
+    
+    results, timings, errors = {}, {}, {}
+    for name, future in futures:
+        try:
+            results[name], timings[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+    
+    total_ms = (time.perf_counter() - start) * 1000
+    logger.info("Loaders finished in %.0f ms (sum %.0f ms): %s", total_ms, sum(timings.values()),
+                ', '.join(f"{name}={ms:.0f}ms" for name, ms in timings.items()))
+    if errors:
+        raise DataLoadError(errors)
+    return results
+
+def load_bundled_snapshot():
+    """The bundled snapshot, or None if the package has none"""
+    if not os.path.exists(BUNDLED_SNAPSHOT):
+        return None
+    return map_snapshot(BUNDLED_SNAPSHOT)
+
+# Global data cache: rebuilt in the background and swapped in whole
+DATA_CACHE = SnapshotCache('wage data', build_wage_data, fallback=load_bundled_snapshot)
+
+# Reload as soon as the database is back; the data may have been served stale meanwhile
+db.DB_BREAKER.on_recover(DATA_CACHE.request_refresh)
+
+def load_all_data(deadline=None):
+    """Return the current data snapshot, waiting (up to READY_TIMEOUT, and not past deadline) for the first load.
+    
+    The load itself never runs on the request's thread, so it is not bound
+    by the request's deadline; past it the request gets DataNotReady (503).
+    """
+    timeout = READY_TIMEOUT if deadline is None else min(READY_TIMEOUT, deadline.remaining())
+    return DATA_CACHE.get(timeout=timeout)
+
+def latest_survey_month(years):
+    """Newest survey month key of a {year: ...} table, or None if it is empty"""
+    return max(years) if years else None
+
+def survey_query(query, since):
+    """cursor.execute() arguments for a loader query, limited to `Survey month` >= since (None: all rows)"""
+    if since is None:
+        return (query,)
+    return (query + "    AND `Survey month` >= %s\n", (since,))
+
+def merge_years(base, loaded):
+    """Copy of a {year: {...}} table with the re-read years replaced and new ones added"""
+    if not base:
+        return loaded
+    merged = dict(base)
+    merged.update(loaded)
+    return merged
+
+def derive_latest_year(data):
+    """Recompute the artifacts that depend only on the latest survey year"""
+    # Anchor education: most employees in the latest year, Australia-wide, per industry
+    anchor_education = {}
+    employees_data = data['employees']
+    if employees_data:
+        counts = {}
+        for (state, ind_code, education), count in employees_data[max(employees_data)].items():
+            if state == "Australia" and count > counts.get(ind_code, 0):
+                counts[ind_code] = count
+                anchor_education[ind_code] = education
+    
+    # Baseline salary: latest year Australia anchor education, per earnings type
+    baselines = {}
+    for earnings_type in ('weekly', 'hourly'):
+        earnings_data = data[f'{earnings_type}_earnings']
+        year_data = earnings_data[max(earnings_data)] if earnings_data else {}
+        baselines[earnings_type] = {
+            ind_code: year_data[("Australia", ind_code, education)]
+            for ind_code, education in anchor_education.items()
+            if ("Australia", ind_code, education) in year_data
+        }
+    
+    return {'anchor_education': anchor_education, 'baselines': baselines}
+
 def load_occupation_data(connection):
     """Load occupation salary data"""
-    global OCCUPATION_DATA
+    occupation_data = {}
     
     query = """
         SELECT anzsco_code, occupation, 
@@ -116,16 +237,18 @@ def load_occupation_data(connection):
         cursor.execute(query)
         for row in cursor.fetchall():
             code = str(row['anzsco_code'])
-            OCCUPATION_DATA[code] = {
+            occupation_data[code] = {
                 'occupation': row['occupation'],
                 'full_time_hours': float(row['avg_fulltime_hours'] or 0),
                 'weekly_earnings': float(row['median_fulltime_earnings']) if row['median_fulltime_earnings'] else None,
                 'hourly_earnings': float(row['median_fulltime_hourly_earnings']) if row['median_fulltime_hourly_earnings'] else None
             }
+    
+    return occupation_data
 
-def load_employees_data(connection):
-    """Load employee count data"""
-    global EMPLOYEES_DATA
+def load_employees_data(connection, base=None):
+    """Load employee count data (merged into a copy of base, re-reading from its latest month)"""
+    employees_data = {}
     
     query = """
         SELECT `Survey month`, `State and territory`, `industry_code`,
@@ -139,7 +262,7 @@ def load_employees_data(connection):
     """
     
     with connection.cursor() as cursor:
-        cursor.execute(query)
+        cursor.execute(*survey_query(query, latest_survey_month(base)))
         education_fields = [
             'Postgraduate Degree', 'Graduate Diploma or Certificate', 'Bachelor Degree',
             'Advanced Diploma or Diploma', 'Certificate III or IV', 
@@ -148,8 +271,8 @@ def load_employees_data(connection):
         
         for row in cursor.fetchall():
             year = str(row['Survey month'])
-            if year not in EMPLOYEES_DATA:
-                EMPLOYEES_DATA[year] = {}
+            if year not in employees_data:
+                employees_data[year] = {}
             
             state = row['State and territory']
             industry_code = row['industry_code']
@@ -158,11 +281,13 @@ def load_employees_data(connection):
                 count = row[education]
                 if count and count > 0:
                     key = (state, industry_code, education)
-                    EMPLOYEES_DATA[year][key] = float(count)
+                    employees_data[year][key] = float(count)
+    
+    return merge_years(base, employees_data)
 
-def load_weekly_earnings_data(connection):
-    """Load weekly earnings data"""
-    global WEEKLY_EARNINGS_DATA
+def load_weekly_earnings_data(connection, base=None):
+    """Load weekly earnings data (merged into a copy of base, re-reading from its latest month)"""
+    earnings_data = {}
     
     query = """
         SELECT `Survey month`, `State and territory`, `industry_code`,
@@ -172,7 +297,8 @@ def load_weekly_earnings_data(connection):
                `Advanced Diploma or Diploma`, `Advanced Diploma or Diploma_RSE`,
                `Certificate III or IV`, `Certificate III or IV_RSE`,
                `Other qualification`, `Other qualification_RSE`,
-               `Without qualification`, `Without qualification_RSE`
+               `Without qualification`, `Without qualification_RSE`,
+               `Total`, `Total_RSE`
         FROM `6_Education_Weekly_State_Gender_Industry`
         WHERE `Parameter` = 'Median weekly earnings'
         AND `Sex` = 'Persons'
@@ -180,17 +306,17 @@ def load_weekly_earnings_data(connection):
     """
     
     with connection.cursor() as cursor:
-        cursor.execute(query)
+        cursor.execute(*survey_query(query, latest_survey_month(base)))
         education_fields = [
             'Postgraduate Degree', 'Graduate Diploma or Certificate', 'Bachelor Degree',
             'Advanced Diploma or Diploma', 'Certificate III or IV', 
-            'Other qualification', 'Without qualification'
+            'Other qualification', 'Without qualification', 'Total'
         ]
         
         for row in cursor.fetchall():
             year = str(row['Survey month'])
-            if year not in WEEKLY_EARNINGS_DATA:
-                WEEKLY_EARNINGS_DATA[year] = {}
+            if year not in earnings_data:
+                earnings_data[year] = {}
             
             state = row['State and territory']
             industry_code = row['industry_code']
@@ -201,14 +327,16 @@ def load_weekly_earnings_data(connection):
                 
                 if value and value > 0:
                     key = (state, industry_code, education)
-                    WEEKLY_EARNINGS_DATA[year][key] = {
+                    earnings_data[year][key] = {
                         'value': float(value),
                         'rse': float(rse) if rse else 50.0
                     }
+    
+    return merge_years(base, earnings_data)
 
-def load_hourly_earnings_data(connection):
-    """Load hourly earnings data"""
-    global HOURLY_EARNINGS_DATA
+def load_hourly_earnings_data(connection, base=None):
+    """Load hourly earnings data (merged into a copy of base, re-reading from its latest month)"""
+    earnings_data = {}
     
     query = """
         SELECT `Survey month`, `State and territory`, `industry_code`,
@@ -218,7 +346,8 @@ def load_hourly_earnings_data(connection):
                `Advanced Diploma or Diploma`, `Advanced Diploma or Diploma_RSE`,
                `Certificate III or IV`, `Certificate III or IV_RSE`,
                `Other qualification`, `Other qualification_RSE`,
-               `Without qualification`, `Without qualification_RSE`
+               `Without qualification`, `Without qualification_RSE`,
+               `Total`, `Total_RSE`
         FROM `6_Education_Hourly_State_Gender_Industry`
         WHERE `Parameter` = 'Median hourly earnings'
         AND `Sex` = 'Persons'
@@ -226,17 +355,17 @@ def load_hourly_earnings_data(connection):
     """
     
     with connection.cursor() as cursor:
-        cursor.execute(query)
+        cursor.execute(*survey_query(query, latest_survey_month(base)))
         education_fields = [
             'Postgraduate Degree', 'Graduate Diploma or Certificate', 'Bachelor Degree',
             'Advanced Diploma or Diploma', 'Certificate III or IV', 
-            'Other qualification', 'Without qualification'
+            'Other qualification', 'Without qualification', 'Total'
         ]
         
         for row in cursor.fetchall():
             year = str(row['Survey month'])
-            if year not in HOURLY_EARNINGS_DATA:
-                HOURLY_EARNINGS_DATA[year] = {}
+            if year not in earnings_data:
+                earnings_data[year] = {}
             
             state = row['State and territory']
             industry_code = row['industry_code']
@@ -247,61 +376,190 @@ def load_hourly_earnings_data(connection):
                 
                 if value and value > 0:
                     key = (state, industry_code, education)
-                    HOURLY_EARNINGS_DATA[year][key] = {
+                    earnings_data[year][key] = {
                         'value': float(value),
                         'rse': float(rse) if rse else 50.0
                     }
+    
+    return merge_years(base, earnings_data)
 
-def get_anchor_education(industry_code):
-    """Find education level with most employees in latest year for given industry code"""
-    latest_year = max(EMPLOYEES_DATA.keys())
-    year_data = EMPLOYEES_DATA[latest_year]
+def load_percentile_data(connection, base_curves=None, base_year=None):
+    """Load hourly earnings percentiles; returns (latest-year curves per state/sex/status, year).
+    
+    Only the latest year is used, so rows before base_year are not read.
+    """
+    query = """
+        SELECT `Survey month`, `State and territory`, `Sex`, `Category`,
+               `Full_time`, `Part_time`, `Total`
+        FROM `2_Percentile_Hourly_State_Gender_FullPart`
+        WHERE `Parameter` = 'Median hourly earnings'
+    """
+    
+    with connection.cursor() as cursor:
+        cursor.execute(*survey_query(query, base_year))
+        rows = cursor.fetchall()
+    
+    if not rows:
+        return base_curves or {}, base_year
+    
+    latest_year = max(str(row['Survey month']) for row in rows)
+    points = {}
+    for row in rows:
+        percentile = PERCENTILE_CATEGORIES.get(row['Category'])
+        if percentile is None or str(row['Survey month']) != latest_year:
+            continue
+        
+        state = row['State and territory']
+        sex = row['Sex'].strip()
+        for status, column in EMPLOYMENT_STATUS_COLUMNS.items():
+            value = row[column]
+            if value:
+                points.setdefault((state, sex, status), []).append((percentile, float(value)))
+    
+    return build_percentile_curves(points), latest_year
+
+def load_industry_mean_data(connection, base=None):
+    """Load mean earnings by industry/state/sex into an array-backed cube (None if empty).
+    
+    Given a base cube, only rows from its latest year on are read and merged into a copy.
+    """
+    query = """
+        SELECT `Survey month`, `State and territory`, `Industry_Code`, `Category`,
+               `Persons Weekly Earnings`, `Persons Hourly Earnings`,
+               `Males Weekly Earnings`, `Males Hourly Earnings`,
+               `Females Weekly Earnings`, `Females Hourly Earnings`
+        FROM `3_Industry_Mean_Gender_State_Weekly_Hourly`
+        WHERE `Leave entitlements` = 'Total employees'
+    """
     
-    education_counts = {}
-    for (state, ind_code, education), count in year_data.items():
-        if state == "Australia" and ind_code == industry_code:
-            education_counts[education] = count
+    with connection.cursor() as cursor:
+        cursor.execute(*survey_query(query, base.latest('year') if base is not None else None))
+        rows = []
+        for row in cursor.fetchall():
+            coords = (str(row['Survey month']), row['State and territory'], row['Industry_Code'], row['Category'])
+            # Zero means the ABS suppressed the estimate
+            rows.append((coords, {
+                'persons_weekly': float(row['Persons Weekly Earnings'] or 0) or None,
+                'persons_hourly': float(row['Persons Hourly Earnings'] or 0) or None,
+                'males_weekly': float(row['Males Weekly Earnings'] or 0) or None,
+                'males_hourly': float(row['Males Hourly Earnings'] or 0) or None,
+                'females_weekly': float(row['Females Weekly Earnings'] or 0) or None,
+                'females_hourly': float(row['Females Hourly Earnings'] or 0) or None
+            }))
+    
+    if not rows:
+        return base
+    if base is None:
+        return build_cube(rows, INDUSTRY_MEAN_DIMENSIONS, INDUSTRY_MEAN_MEASURES)
+    return merge_cube(base, rows)
+
+def get_industry_benchmark(data, industry_code, state, earnings_type, employment_status, your_rate):
+    """Compare industry mean and median earnings, with a gender breakdown"""
+    cube = data['industry_mean_cube']
+    if cube is None:
+        return None
+    
+    year = cube.latest('year')
+    status = EMPLOYMENT_STATUS_CATEGORIES[employment_status]
+    means = cube.get_many(
+        (year, state, industry_code, status),
+        (f'persons_{earnings_type}', f'males_{earnings_type}', f'females_{earnings_type}')
+    )
+    mean = means[f'persons_{earnings_type}']
+    if mean is None:
+        return None
+    
+    # Median across all qualifications from the education earnings table
+    earnings_data = data['hourly_earnings'] if earnings_type == 'hourly' else data['weekly_earnings']
+    median_data = earnings_data.get(year, {}).get((state, industry_code, 'Total'))
+    median = median_data['value'] if median_data else None
+    
+    males = means[f'males_{earnings_type}']
+    females = means[f'females_{earnings_type}']
+    gender_gap = round((males - females) / males * 100, 2) if males and females else None
+    
+    return {
+        'year': year,
+        'state': state,
+        'employmentStatus': employment_status,
+        'meanEarnings': round(mean, 2),
+        'medianEarnings': round(median, 2) if median else None,
+        'meanToMedianRatio': round(mean / median, 3) if median else None,
+        'yourRateToMean': round(your_rate / mean, 3),
+        'genderBreakdown': {
+            'malesMean': round(males, 2) if males else None,
+            'femalesMean': round(females, 2) if females else None,
+            'meanGapPercentage': gender_gap
+        }
+    }
+
+def get_percentile_rank(data, hourly_rate, state, sex, employment_status):
+    """Place an hourly rate on the precomputed percentile curve"""
+    curve = data['percentile_curves'].get((state, sex, employment_status))
+    if curve is None:
+        raise ValueError(f"No percentile data for {state} {sex} {employment_status}")
     
-    if not education_counts:
+    return {
+        'rank': round(curve.rank(hourly_rate), 1),
+        'year': data['percentile_year'],
+        'state': state,
+        'sex': sex,
+        'employmentStatus': employment_status,
+        'curve': curve.knots()
+    }
+
+def get_anchor_education(data, industry_code):
+    """Find education level with most employees in latest year for given industry code"""
+    # Precomputed per snapshot by derive_latest_year
+    anchor_education = data['anchor_education'].get(industry_code)
+    if anchor_education is None:
         raise ValueError(f"No employee data found for industry code '{industry_code}'")
     
-    anchor_education = max(education_counts.items(), key=lambda x: x[1])[0]
-    logger.info(f"Anchor education for industry '{industry_code}': {anchor_education}")
+    logger.debug("Anchor education for industry '%s': %s", industry_code, anchor_education)
     return anchor_education
 
-def get_occupation_base_salary(occupation, earnings_type):
+def get_occupation_base_salary(data, occupation, earnings_type):
     """Get base salary for occupation based on earnings type"""
-    for code, data in OCCUPATION_DATA.items():
-        if data['occupation'].lower() == occupation.lower():
+    occupation_data = data['occupation']
+    for code, entry in occupation_data.items():
+        if entry['occupation'].lower() == occupation.lower():
             if earnings_type == 'hourly':
-                if data['hourly_earnings']:
-                    return data['hourly_earnings']
+                if entry['hourly_earnings']:
+                    return entry['hourly_earnings']
                 else:
                     raise ValueError(f"No hourly earnings data for '{occupation}'")
             else:  # weekly
-                if data['weekly_earnings']:
-                    return data['weekly_earnings']
+                if entry['weekly_earnings']:
+                    return entry['weekly_earnings']
                 else:
                     raise ValueError(f"No weekly earnings data for '{occupation}'")
     
-    available = [data['occupation'] for data in OCCUPATION_DATA.values()][:10]
+    available = [entry['occupation'] for entry in occupation_data.values()][:10]
     raise ValueError(f"Occupation '{occupation}' not found. Available: {available}")
 
-def calculate_10_year_factors(industry_code, user_state, user_education, earnings_type):
+def calculate_10_year_factors(data, industry_code, anchor_education, user_state, user_education, earnings_type):
+    """Calculate salary factors for 10 years, once for concurrent identical requests (the result is shared).
+
+    Callers time this as a whole, so each request's span covers its own wait
+    whether it ran the computation or joined one; no trace is shared.
+    """
+    # id(data) keys on the snapshot; it stays unique while the computation holds it.
+    # anchor_education follows from the snapshot and industry, so it needs no place in the key
+    key = (id(data), industry_code, user_state, user_education, earnings_type)
+    return FACTOR_FLIGHTS.do(key, compute_10_year_factors,
+                             data, industry_code, anchor_education, user_state, user_education, earnings_type)
+
+def compute_10_year_factors(data, industry_code, anchor_education, user_state, user_education, earnings_type):
     """Calculate salary factors for 10 years using industry codes"""
     
     # Choose data source based on earnings_type
-    earnings_data = HOURLY_EARNINGS_DATA if earnings_type == 'hourly' else WEEKLY_EARNINGS_DATA
-    
-    # Get anchor education from latest year using industry code
-    anchor_education = get_anchor_education(industry_code)
+    earnings_data = data['hourly_earnings'] if earnings_type == 'hourly' else data['weekly_earnings']
     
     # Get latest year for baseline
     latest_year = max(earnings_data.keys())
     
-    # Get baseline salary (latest year Australia anchor education)
-    baseline_key = ("Australia", industry_code, anchor_education)
-    baseline_data = earnings_data[latest_year].get(baseline_key)
+    # Get baseline salary (latest year Australia anchor education, precomputed per snapshot)
+    baseline_data = data['baselines'][earnings_type].get(industry_code)
     
     if not baseline_data:
         raise ValueError(f"No baseline data for {latest_year} Australia industry code '{industry_code}' {anchor_education}")
@@ -329,7 +587,8 @@ def calculate_10_year_factors(industry_code, user_state, user_education, earning
             })
         else:
             # Skip years without data as requested
-            logger.info(f"Skipping year {year} - no data for {user_state} industry code {industry_code} {user_education}")
+            logger.debug("Skipping year %s - no data for %s industry code %s %s",
+                         year, user_state, industry_code, user_education, extra=SAMPLED)
     
     return yearly_factors
 
@@ -354,50 +613,86 @@ def calculate_intensity_factor(work_intensity):
     """Calculate work intensity factor"""
     return 0.005 * work_intensity + 0.7
 
-def get_verdict(fairness_ratio):
-    """Get verdict based on fairness ratio"""
-    if fairness_ratio >= 1.2:
-        return "Above Average"
-    elif fairness_ratio >= 0.8:
-        return "Average"
-    else:
-        return "Below Average"
+# Lowest fairness score for each verdict, per scoring mode
+VERDICT_THRESHOLDS = {
+    'ratio': ((90, "Above Average"), (60, "Average")),  # rate 1.2x / 0.8x expected
+    'percentile': ((75, "Above Average"), (25, "Average"))  # top / bottom quartile
+}
+
+def get_verdict(fairness_score, scoring_mode='ratio'):
+    """Get verdict for the fairness score returned in the given scoring mode"""
+    for threshold, verdict in VERDICT_THRESHOLDS[scoring_mode]:
+        if fairness_score >= threshold:
+            return verdict
+    return "Below Average"
+
+VALID_EDUCATION_LEVELS = [
+    'Postgraduate Degree', 'Bachelor Degree', 'Advanced Diploma or Diploma',
+    'Certificate III or IV', 'Other qualification', 'Without qualification'
+]
+
+# Request schema - compiled once at import into a fast validator
+FAIRNESS_SCHEMA = {
+    'occupation': {'type': 'str'},
+    'industry': {'type': 'str'},
+    'education': {
+        'type': 'str',
+        'choices': VALID_EDUCATION_LEVELS,
+        'message': f'Invalid education level. Must be one of: {VALID_EDUCATION_LEVELS}'
+    },
+    'location': {'type': 'str'},
+    'currentHourlyRate': {
+        'type': 'number', 'exclusive_min': 0,
+        'message': 'currentHourlyRate must be a positive number'
+    },
+    'yearsExperience': {
+        'type': 'int', 'min': 0, 'max': 50,
+        'message': 'yearsExperience must be an integer between 0 and 50'
+    },
+    'workIntensity': {
+        'type': 'number', 'min': 0, 'max': 100,
+        'message': 'workIntensity must be a number between 0 and 100'
+    },
+    'earningsType': {
+        'type': 'str', 'required': False, 'default': 'hourly',
+        'choices': ['hourly', 'weekly'],
+        'message': 'earningsType must be either "hourly" or "weekly"'
+    },
+    'scoringMode': {
+        'type': 'str', 'required': False, 'default': 'ratio',
+        'choices': ['ratio', 'percentile'],
+        'message': 'scoringMode must be either "ratio" or "percentile"'
+    },
+    'sex': {
+        'type': 'str', 'required': False, 'default': 'Persons',
+        'choices': ['Persons', 'Males', 'Females'],
+        'message': 'sex must be one of "Persons", "Males" or "Females"'
+    },
+    'employmentStatus': {
+        'type': 'str', 'required': False, 'default': 'fullTime',
+        'choices': list(EMPLOYMENT_STATUS_COLUMNS.keys()),
+        'message': f'employmentStatus must be one of: {list(EMPLOYMENT_STATUS_COLUMNS.keys())}'
+    }
+}
+
+FAIRNESS_VALIDATOR = compile_schema(FAIRNESS_SCHEMA)
 
 def validate_input(data):
-    """Validate input data"""
-    required_fields = ['occupation', 'industry', 'education', 'location', 'currentHourlyRate', 'yearsExperience', 'workIntensity']
-    
-    for field in required_fields:
-        if field not in data:
-            return {'valid': False, 'message': f'Missing required field: {field}'}
-    
-    # Set default earningsType if not provided
-    if 'earningsType' not in data:
-        data['earningsType'] = 'hourly'
-    
-    if not isinstance(data['currentHourlyRate'], (int, float)) or data['currentHourlyRate'] <= 0:
-        return {'valid': False, 'message': 'currentHourlyRate must be a positive number'}
-    
-    if not isinstance(data['yearsExperience'], int) or data['yearsExperience'] < 0 or data['yearsExperience'] > 50:
-        return {'valid': False, 'message': 'yearsExperience must be an integer between 0 and 50'}
-    
-    if not isinstance(data['workIntensity'], (int, float)) or data['workIntensity'] < 0 or data['workIntensity'] > 100:
-        return {'valid': False, 'message': 'workIntensity must be a number between 0 and 100'}
-    
-    valid_education_levels = [
-        'Postgraduate Degree', 'Bachelor Degree', 'Advanced Diploma or Diploma',
-        'Certificate III or IV', 'Other qualification', 'Without qualification'
-    ]
-    if data['education'] not in valid_education_levels:
-        return {'valid': False, 'message': f'Invalid education level. Must be one of: {valid_education_levels}'}
-    
-    if data['earningsType'] not in ['hourly', 'weekly']:
-        return {'valid': False, 'message': 'earningsType must be either "hourly" or "weekly"'}
-    
-    return {'valid': True, 'message': 'Valid input'}
+    """Validate input data, returning the cleaned copy under 'data'"""
+    return FAIRNESS_VALIDATOR.validate(data).as_dict()
 
-def calculate_fairness_score(input_data):
-    """Main calculation function"""
+def validate_batch_input(records):
+    """Validate many requests at once; returns (cleaned records, {index: errors})"""
+    cleaned, errors = FAIRNESS_VALIDATOR.validate_batch(records)
+    for index, row in enumerate(cleaned):
+        if row is not None and row['scoringMode'] == 'percentile' and row['earningsType'] != 'hourly':
+            errors[index] = [{'field': 'scoringMode', 'code': 'choice',
+                              'message': 'scoringMode "percentile" requires earningsType "hourly"'}]
+            cleaned[index] = None
+    return cleaned, errors
+
+def calculate_fairness_score(input_data, data, trace=NULL_TRACE):
+    """Main calculation function, reading one data snapshot's tables"""
     occupation = input_data['occupation']
     industry_input = input_data['industry']
     education = input_data['education']
@@ -406,26 +701,63 @@ def calculate_fairness_score(input_data):
     years_exp = input_data['yearsExperience']
     work_intensity = input_data['workIntensity']
     earnings_type = input_data['earningsType']
+    scoring_mode = input_data['scoringMode']
     
     # Normalize industry input to industry code
-    industry_code = normalize_industry(industry_input)
+    with trace.span('normalize_industry'):
+        industry_code = normalize_industry(industry_input)
     
     # Use state code directly
     user_state = location
     
     # Get base salary from occupation data (matching earnings type)
-    base_salary = get_occupation_base_salary(occupation, earnings_type)
+    with trace.span('get_occupation_base_salary'):
+        base_salary = get_occupation_base_salary(data, occupation, earnings_type)
     
     # Get experience and intensity factors
     experience_factor = get_experience_factor(industry_input, years_exp)
     intensity_factor = calculate_intensity_factor(work_intensity)
     
+    # Get anchor education from latest year using industry code
+    with trace.span('get_anchor_education'):
+        anchor_education = get_anchor_education(data, industry_code)
+    
     # Calculate 10-year factors with chosen earnings type using industry code
-    yearly_factors = calculate_10_year_factors(industry_code, user_state, education, earnings_type)
+    with trace.span('calculate_10_year_factors'):
+        yearly_factors = calculate_10_year_factors(
+            data, industry_code, anchor_education, user_state, education, earnings_type
+        )
     
     if not yearly_factors:
         raise Exception("No historical data available for calculation")
     
+    with trace.span('response_assembly'):
+        response = build_fairness_response(
+            yearly_factors, base_salary, experience_factor, intensity_factor,
+            hourly_rate, industry_code, industry_input, earnings_type
+        )
+    
+    with trace.span('industry_benchmark'):
+        response['industryBenchmark'] = get_industry_benchmark(
+            data, industry_code, user_state, earnings_type, input_data['employmentStatus'], hourly_rate
+        )
+    
+    # Percentile mode scores the rate against the state's hourly earnings distribution
+    response['scoringMode'] = scoring_mode
+    if scoring_mode == 'percentile':
+        with trace.span('percentile_rank'):
+            percentile = get_percentile_rank(
+                data, hourly_rate, user_state, input_data['sex'], input_data['employmentStatus']
+            )
+        response['fairnessScore'] = percentile['rank']
+        response['verdict'] = get_verdict(percentile['rank'], 'percentile')
+        response['percentile'] = percentile
+    
+    return response
+
+def build_fairness_response(yearly_factors, base_salary, experience_factor, intensity_factor,
+                            hourly_rate, industry_code, industry_input, earnings_type):
+    """Assemble the fairness response from yearly factors"""
     # Build historical data with complete salary calculations
     historical_data = []
     for factor_data in yearly_factors:
@@ -451,7 +783,7 @@ def calculate_fairness_score(input_data):
     
     # Calculate fairness metrics
     fairness_ratio = hourly_rate / expected_hourly_rate
-    fairness_score = min(100, max(0, fairness_ratio * 75))
+    fairness_score = round(min(100, max(0, fairness_ratio * 75)), 1)
     
     # Calculate trend
     salaries = [item['salary'] for item in historical_data]
@@ -464,8 +796,8 @@ def calculate_fairness_score(input_data):
     
     # Build response
     return {
-        "fairnessScore": round(fairness_score, 1),
-        "verdict": get_verdict(fairness_ratio),
+        "fairnessScore": fairness_score,
+        "verdict": get_verdict(fairness_score),
         "comparison": {
             "yourRate": hourly_rate,
             "expectedRate": round(expected_hourly_rate, 2),
@@ -493,31 +825,56 @@ def lambda_handler(event, context):
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type, Accept, Authorization',
+                'Access-Control-Allow-Headers': 'Content-Type, Accept, Authorization, X-Timing',
                 'Access-Control-Allow-Methods': 'POST, OPTIONS',
                 'Access-Control-Max-Age': '86400'
             },
             'body': ''
         }
     
+    # Change signal (e.g. invoked after the tables are reloaded): drop cached query results, rebuild in the background
+    if event.get('refreshData'):
+        db.QUERY_CACHE.clear()
+        DATA_CACHE.request_refresh()
+        return {'statusCode': 202, 'body': json.dumps({'success': True, 'message': 'Data refresh requested'})}
+    
+    trace = start_trace(event, context)
+    deadline = Deadline.for_request(context)
+    
     try:
-        load_all_data()
+        with trace.span('load_all_data'):
+            snapshot = load_all_data(deadline)
         
         if 'body' not in event:
             return error_response(400, 'MISSING_BODY', 'Request body is required')
         
         body = json.loads(event['body'])
-        logger.info(f"Received request: {body}")
+        logger.debug("Received request: %s", body, extra=SAMPLED)
         
-        validation_result = validate_input(body)
+        with trace.span('validate_input'):
+            validation_result = validate_input(body)
         if not validation_result['valid']:
             return error_response(400, 'INVALID_INPUT', validation_result['message'])
+        input_data = validation_result['data']
+        if input_data['scoringMode'] == 'percentile' and input_data['earningsType'] != 'hourly':
+            # The percentile curves are of hourly earnings only
+            return error_response(400, 'INVALID_INPUT', 'scoringMode "percentile" requires earningsType "hourly"')
         
-        fairness_data = calculate_fairness_score(body)
-        return success_response(fairness_data)
+        fairness_data = calculate_fairness_score(input_data, snapshot.data, trace)
+        fairness_data['dataVersion'] = snapshot.describe(stale=db.DB_BREAKER.is_open())
+        with trace.span('json_dumps'):
+            response = success_response(fairness_data)
         
+        if trace.enabled:
+            response['headers']['Server-Timing'] = trace.server_timing()
+            trace.emit('calculate')
+        return response
+        
+    except DataNotReady as e:
+        logger.warning("Data not ready: %s", e)
+        return error_response(503, 'DATA_NOT_READY', 'Data is still loading, please retry shortly')
     except Exception as e:
-        logger.error(f"Error: {str(e)}")
+        logger.error("Error: %s", e)
         return error_response(500, 'INTERNAL_ERROR', f'Internal server error: {str(e)}')
 
 def success_response(data):
@@ -527,7 +884,7 @@ def success_response(data):
         'headers': {
             'Content-Type': 'application/json',
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type, Accept, Authorization',
+            'Access-Control-Allow-Headers': 'Content-Type, Accept, Authorization, X-Timing',
             'Access-Control-Allow-Methods': 'POST, OPTIONS'
         },
         'body': json.dumps({
@@ -545,7 +902,7 @@ def error_response(status_code, error_code, message):
         'headers': {
             'Content-Type': 'application/json',
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type, Accept, Authorization',
+            'Access-Control-Allow-Headers': 'Content-Type, Accept, Authorization, X-Timing',
             'Access-Control-Allow-Methods': 'POST, OPTIONS'
         },
         'body': json.dumps({
@@ -556,4 +913,7 @@ def error_response(status_code, error_code, message):
                 'message': message
             }
         })
-    }
\ No newline at end of file
+    }
+
+# Start loading in module initialization (the Lambda init phase), not in the first request
+DATA_CACHE.preload()
@@ -0,0 +1,167 @@
+import json
+import os
+import random
+import time
+from structured_logging import get_logger
+
+logger = get_logger('instrumentation')
+
+# Request header that forces timing on for a single request
+TIMING_HEADER = 'x-timing'
+
+# Fraction of requests traced when the header is absent (0.0 - 1.0)
+TIMING_SAMPLE_RATE = float(os.environ.get('TIMING_SAMPLE_RATE', '0'))
+
+# Emit a CloudWatch Embedded Metric Format line for every traced request
+TIMING_EMF = os.environ.get('TIMING_EMF', '').lower() in ('1', 'true', 'yes')
+EMF_NAMESPACE = os.environ.get('TIMING_EMF_NAMESPACE', 'WageFairness')
+
+
+class _NullSpan:
+    """Reusable no-op context manager used when tracing is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTrace:
+    """Disabled trace: every span is the same shared no-op object"""
+    enabled = False
+
+    def span(self, stage):
+        return _NULL_SPAN
+
+    def records(self):
+        return []
+
+    def emit(self, operation):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class _Span:
+    __slots__ = ('trace', 'stage', 'start')
+
+    def __init__(self, trace, stage):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        self.trace.timings.append((self.stage, elapsed_ms))
+        return False
+
+
+class RequestTrace:
+    """Collects (stage, milliseconds) records for one request"""
+    enabled = True
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.timings = []
+
+    def span(self, stage):
+        return _Span(self, stage)
+
+    def records(self):
+        """Return timing records, one dict per stage in completion order"""
+        return [{'stage': stage, 'ms': round(ms, 3)} for stage, ms in self.timings]
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        """Format timings as a Server-Timing response header value"""
+        return ', '.join(f'{stage};dur={ms:.3f}' for stage, ms in self.timings)
+
+    def emit(self, operation):
+        """Log the structured timing record and, if enabled, an EMF line"""
+        record = {
+            'operation': operation,
+            'requestId': self.request_id,
+            'totalMs': round(self.total_ms(), 3),
+            'stages': self.records()
+        }
+        logger.info('timing', extra={'timing': record})
+        if TIMING_EMF:
+            # EMF lines must be printed verbatim so CloudWatch can extract them
+            print(json.dumps(emf_record(operation, self.timings, record['totalMs'])))
+
+
+def emf_record(operation, timings, total_ms):
+    """Build a CloudWatch Embedded Metric Format document for stage timings"""
+    metrics = [{'Name': 'total', 'Unit': 'Milliseconds'}]
+    document = {'Operation': operation, 'total': total_ms}
+    for stage, ms in timings:
+        if stage not in document:
+            metrics.append({'Name': stage, 'Unit': 'Milliseconds'})
+            document[stage] = 0.0
+        document[stage] += round(ms, 3)
+    document['_aws'] = {
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [{
+            'Namespace': EMF_NAMESPACE,
+            'Dimensions': [['Operation']],
+            'Metrics': metrics
+        }]
+    }
+    return document
+
+
+def emit_load_metric(cache, phase, ms):
+    """Record how long a data load took and in which phase.
+
+    phase is "init" (started during module initialization), "request"
+    (started because a request found no data) or "refresh" (background
+    rebuild), so init-phase loads can be told apart from the ones requests
+    had to wait for.
+    """
+    record = {'cache': cache, 'phase': phase, 'ms': round(ms, 3)}
+    logger.info('data_load', extra={'dataLoad': record})
+    if TIMING_EMF:
+        print(json.dumps({
+            'Cache': cache,
+            'Phase': phase,
+            'dataLoadMs': record['ms'],
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': EMF_NAMESPACE,
+                    'Dimensions': [['Cache', 'Phase']],
+                    'Metrics': [{'Name': 'dataLoadMs', 'Unit': 'Milliseconds'}]
+                }]
+            }
+        }))
+
+
+def timing_requested(headers):
+    """Whether request headers turn timing on (the X-Timing header)"""
+    for name, value in (headers or {}).items():
+        if name.lower() == TIMING_HEADER:
+            return str(value).lower() in ('1', 'true', 'yes', 'on')
+    return False
+
+
+def start_trace(event, context=None):
+    """Return a RequestTrace if the request asks for timing or is sampled, else NULL_TRACE"""
+    forced = timing_requested(event.get('headers'))
+
+    if not forced and (TIMING_SAMPLE_RATE <= 0 or random.random() >= TIMING_SAMPLE_RATE):
+        return NULL_TRACE
+
+    request_id = getattr(context, 'aws_request_id', None)
+    return RequestTrace(request_id)
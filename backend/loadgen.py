@@ -0,0 +1,107 @@
+"""Asyncio HTTP load generator for the local servers (asgi.py, server.py).
+
+Usage: python loadgen.py [--port 8000] [--connections 1000] [--seconds 10] [--endpoint fairness]
+
+Opens that many keep-alive connections from one process and posts requests
+on each as fast as the responses come back, then reports throughput and
+latency percentiles. Thousands of connections may need a higher open-file
+limit (ulimit -n).
+"""
+import argparse
+import asyncio
+import json
+import time
+
+REQUESTS = {
+    'fairness': ('POST', '/fairness/calculate', {
+        "occupation": "Engineering Managers",
+        "industry": "Mining",
+        "education": "Bachelor Degree",
+        "location": "VIC",
+        "currentHourlyRate": 45.50,
+        "yearsExperience": 5,
+        "workIntensity": 75,
+        "earningsType": "weekly"
+    }),
+    'gender-gap': ('POST', '/gender-gap/calculate', {"state": "VIC", "industry": "B"}),
+    'options': ('GET', '/gender-gap/options', None)
+}
+
+
+def encode_request(host, port, method, path, payload):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    head = (f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def read_response(reader):
+    """Read one response; returns (status, whether the server closes the connection)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() == 'close'
+
+
+async def connection(args, request, deadline, stats):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(args.host, args.port)
+            start = time.perf_counter()
+            writer.write(request)
+            status, closing = await read_response(reader)
+            stats['latencies'].append(time.perf_counter() - start)
+            stats['ok' if status < 500 else 'failed'] += 1
+            if closing:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats['failed'] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+async def run(args):
+    method, path, payload = REQUESTS[args.endpoint]
+    request = encode_request(args.host, args.port, method, path, payload)
+    stats = {'ok': 0, 'failed': 0, 'latencies': []}
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(connection(args, request, deadline, stats) for _ in range(args.connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(stats['latencies'])
+    print(f"{args.connections} connections, {elapsed:.1f}s, {method} {path}")
+    print(f"  {stats['ok'] / elapsed:.0f} req/s, {stats['ok']} ok, {stats['failed']} failed")
+    print("  latency ms: p50 %.1f  p90 %.1f  p99 %.1f  max %.1f" % tuple(
+        percentile(latencies, q) * 1000 for q in (0.5, 0.9, 0.99, 1.0)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate HTTP load against a local API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--endpoint', choices=sorted(REQUESTS), default='fairness')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+from bisect import bisect_right
+
+try:
+    import numpy as np
+
+    _have_numpy = True
+except ImportError:
+    _have_numpy = False
+
+# ABS percentile category label -> percentile
+PERCENTILE_CATEGORIES = {
+    '10th percentile': 10.0,
+    '20th percentile': 20.0,
+    '25th percentile (1st quartile)': 25.0,
+    '30th percentile': 30.0,
+    '40th percentile': 40.0,
+    'Median earnings': 50.0,
+    '60th percentile': 60.0,
+    '70th percentile': 70.0,
+    '75th percentile (3rd quartile)': 75.0,
+    '80th percentile': 80.0,
+    '90th percentile': 90.0
+}
+
+
+def _end_slope(h0, h1, d0, d1):
+    slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+    if slope * d0 <= 0:
+        return 0.0
+    if d0 * d1 <= 0 and abs(slope) > abs(3 * d0):
+        return 3 * d0
+    return slope
+
+
+def _pchip_slopes(xs, ys):
+    """Fritsch-Carlson slopes so the cubic Hermite interpolant stays monotone"""
+    n = len(xs)
+    deltas = [(ys[i + 1] - ys[i]) / (xs[i + 1] - xs[i]) for i in range(n - 1)]
+    if n == 2:
+        return [deltas[0], deltas[0]]
+
+    slopes = [0.0] * n
+    for i in range(1, n - 1):
+        d0, d1 = deltas[i - 1], deltas[i]
+        if d0 * d1 <= 0:
+            slopes[i] = 0.0
+        else:
+            h0, h1 = xs[i] - xs[i - 1], xs[i + 1] - xs[i]
+            w0, w1 = 2 * h1 + h0, h1 + 2 * h0
+            slopes[i] = (w0 + w1) / (w0 / d0 + w1 / d1)
+
+    # One-sided three-point end slopes, clipped to preserve monotonicity
+    slopes[0] = _end_slope(xs[1] - xs[0], xs[2] - xs[1], deltas[0], deltas[1])
+    slopes[-1] = _end_slope(xs[-1] - xs[-2], xs[-2] - xs[-3], deltas[-1], deltas[-2])
+    return slopes
+
+
+class PercentileCurve:
+    """Monotone interpolated map from earnings to percentile rank.
+
+    Built once from the ABS percentile points (10th-90th). Between knots a
+    monotone cubic (PCHIP) is used; below the 10th percentile the rank falls
+    linearly to 0 at zero earnings, and above the 90th it approaches 100 as
+    90 + 10 * (1 - p90 / rate).
+    """
+    __slots__ = ('xs', 'ys', 'slopes', '_arrays')
+
+    def __init__(self, points):
+        xs, ys = [], []
+        for percentile, value in sorted(points, key=lambda item: item[0]):
+            # Drop points that would break strict monotonicity (survey noise)
+            if value is None or value <= 0 or (xs and value <= xs[-1]):
+                continue
+            xs.append(float(value))
+            ys.append(float(percentile))
+        if len(xs) < 2:
+            raise ValueError('At least two increasing percentile points are required')
+
+        self.xs = xs
+        self.ys = ys
+        self.slopes = _pchip_slopes(xs, ys)
+        self._arrays = (np.asarray(xs), np.asarray(ys), np.asarray(self.slopes)) if _have_numpy else None
+
+    def knots(self):
+        """Return {percentile: earnings} for the knots used by the curve"""
+        return {int(y): x for x, y in zip(self.xs, self.ys)}
+
+    def _evaluate(self, i, rate):
+        xs, ys, slopes = self.xs, self.ys, self.slopes
+        h = xs[i + 1] - xs[i]
+        t = (rate - xs[i]) / h
+        t2 = t * t
+        t3 = t2 * t
+        return ((2 * t3 - 3 * t2 + 1) * ys[i] + (t3 - 2 * t2 + t) * h * slopes[i]
+                + (-2 * t3 + 3 * t2) * ys[i + 1] + (t3 - t2) * h * slopes[i + 1])
+
+    def _tail(self, rate):
+        xs, ys = self.xs, self.ys
+        if rate <= 0:
+            return 0.0
+        if rate <= xs[0]:
+            return ys[0] * rate / xs[0]
+        return ys[-1] + (100.0 - ys[-1]) * (1.0 - xs[-1] / rate)
+
+    def rank(self, rate):
+        """Percentile rank (0-100) of an earnings rate, O(log n)"""
+        xs = self.xs
+        if rate <= xs[0] or rate >= xs[-1]:
+            return self._tail(rate)
+        i = bisect_right(xs, rate) - 1
+        return min(100.0, max(0.0, self._evaluate(i, rate)))
+
+    def rank_many(self, rates):
+        """Percentile ranks for a batch of rates (vectorised searchsorted when NumPy is available)"""
+        if not _have_numpy:
+            return [self.rank(rate) for rate in rates]
+
+        rates = np.asarray(rates, dtype=float)
+        xs, ys, slopes = self._arrays
+
+        i = np.clip(np.searchsorted(xs, rates, side='right') - 1, 0, len(xs) - 2)
+        h = xs[i + 1] - xs[i]
+        t = (rates - xs[i]) / h
+        t2 = t * t
+        t3 = t2 * t
+        inner = ((2 * t3 - 3 * t2 + 1) * ys[i] + (t3 - 2 * t2 + t) * h * slopes[i]
+                 + (-2 * t3 + 3 * t2) * ys[i + 1] + (t3 - t2) * h * slopes[i + 1])
+
+        safe_rates = np.where(rates > 0, rates, 1.0)
+        low = np.where(rates > 0, ys[0] * rates / xs[0], 0.0)
+        high = ys[-1] + (100.0 - ys[-1]) * (1.0 - xs[-1] / safe_rates)
+        result = np.where(rates <= xs[0], low, np.where(rates >= xs[-1], high, inner))
+        return np.clip(result, 0.0, 100.0).tolist()
+
+
+def build_percentile_curves(points_by_key):
+    """Build a PercentileCurve per key from {key: [(percentile, earnings), ...]}"""
+    curves = {}
+    for key, points in points_by_key.items():
+        try:
+            curves[key] = PercentileCurve(points)
+        except ValueError:
+            continue
+    return curves
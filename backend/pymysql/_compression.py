@@ -0,0 +1,72 @@
+"""
+Codecs and framing for the compressed client/server protocol.
+"""
+import struct
+import zlib
+
+try:
+    import zstandard
+
+    _have_zstd = True
+except ImportError:
+    _have_zstd = False
+
+
+#: Payloads shorter than this are sent uncompressed (same as libmysqlclient).
+MIN_COMPRESS_LENGTH = 50
+
+#: Largest payload carried by one compressed frame.
+MAX_FRAME_LEN = 2**24 - 1
+
+
+class ZlibCodec:
+    name = "zlib"
+
+    def __init__(self, level=None):
+        self.level = 6 if level is None else level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data, length):
+        return zlib.decompress(data)
+
+
+class ZstdCodec:
+    name = "zstd"
+
+    def __init__(self, level=None):
+        self.level = 3 if level is None else level
+        self._compressor = zstandard.ZstdCompressor(level=self.level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def decompress(self, data, length):
+        return self._decompressor.decompress(data, max_output_size=length)
+
+
+def compress_frames(data, codec, sequence):
+    """Wrap plain protocol bytes in compressed frames.
+
+    Returns ``(frames, next_sequence)``. Small or incompressible chunks are
+    sent as-is with an uncompressed length of 0.
+    """
+    frames = bytearray()
+    view = memoryview(data)
+    for pos in range(0, len(data), MAX_FRAME_LEN):
+        chunk = view[pos : pos + MAX_FRAME_LEN]
+        body = chunk
+        length = 0
+        if len(chunk) >= MIN_COMPRESS_LENGTH:
+            compressed = codec.compress(chunk)
+            if len(compressed) < len(chunk):
+                body = compressed
+                length = len(chunk)
+        frames += struct.pack("<I", len(body))[:3]
+        frames.append(sequence)
+        frames += struct.pack("<I", length)[:3]
+        frames += body
+        sequence = (sequence + 1) % 256
+    return bytes(frames), sequence
@@ -0,0 +1,291 @@
+"""
+Compiles specialized text- and binary-protocol row decoders for one result-set schema.
+"""
+import datetime
+import struct
+
+from .constants import FIELD_TYPE, FLAG
+from .protocol import NULL_COLUMN, UNSIGNED_SHORT_COLUMN, UNSIGNED_INT24_COLUMN
+
+
+# Converters that accept ASCII bytes directly, so the column can skip decode()
+BYTES_CONVERTERS = (int, float)
+
+_cache = {}
+_CACHE_LIMIT = 256
+
+
+def _lenenc(data, first, pos):
+    """Finish reading a length-encoded integer whose first byte was > 251."""
+    if first == UNSIGNED_SHORT_COLUMN:
+        return data[pos] | data[pos + 1] << 8, pos + 2
+    if first == UNSIGNED_INT24_COLUMN:
+        return data[pos] | data[pos + 1] << 8 | data[pos + 2] << 16, pos + 3
+    return int.from_bytes(data[pos : pos + 8], "little"), pos + 8
+
+
+def _column_expression(index, encoding, converter):
+    raw = "data[pos:pos + n]"
+    if converter in BYTES_CONVERTERS:
+        # int(b"12") / float(b"1.5") parse ASCII bytes without a str round-trip
+        return f"conv{index}({raw})"
+    if encoding is not None:
+        value = f"{raw}.decode({encoding!r})"
+    else:
+        value = f"bytes({raw})"
+    if converter is not None:
+        return f"conv{index}({value})"
+    return value
+
+
+def compile_row_decoder(converters):
+    """Return ``decode(data, pos, end) -> tuple`` for a list of (encoding, converter).
+
+    ``data`` is a bytes or bytearray holding one row packet between ``pos``
+    and ``end``. The generated function is cached by schema, so result sets
+    with the same column types share one decoder.
+    """
+    key = tuple(converters)
+    try:
+        return _cache[key]
+    except (KeyError, TypeError):
+        pass
+
+    namespace = {"_lenenc": _lenenc}
+    lines = ["def decode_row(data, pos, end):"]
+    names = []
+    for index, (encoding, converter) in enumerate(converters):
+        if converter is not None:
+            namespace[f"conv{index}"] = converter
+        # Short rows: see https://github.com/PyMySQL/PyMySQL/pull/434
+        lines.append(f"    if pos >= end: return ({''.join(n + ', ' for n in names)})")
+        lines.append("    n = data[pos]; pos += 1")
+        lines.append(f"    if n == {NULL_COLUMN}:")
+        lines.append(f"        c{index} = None")
+        lines.append("    else:")
+        lines.append(f"        if n > {NULL_COLUMN}: n, pos = _lenenc(data, n, pos)")
+        lines.append(f"        c{index} = {_column_expression(index, encoding, converter)}")
+        lines.append("        pos += n")
+        names.append(f"c{index}")
+    lines.append(f"    return ({''.join(n + ', ' for n in names)})")
+
+    exec("\n".join(lines), namespace)
+    decode_row = namespace["decode_row"]
+    if len(_cache) >= _CACHE_LIMIT:
+        _cache.clear()
+    try:
+        _cache[key] = decode_row
+    except TypeError:
+        # Unhashable custom converter; just don't cache
+        pass
+    return decode_row
+
+
+def compile_column_factory(kinds, converters):
+    """Return a factory building a column-appending decoder for one schema.
+
+    ``kinds`` holds one of "int", "uint", "float", "category" or "object"
+    per column. The factory is called as ``factory(values, masks,
+    categories, pad)`` with per-column ``append`` callables
+    (masks/categories may hold None) and returns ``decode_into(data, pos,
+    end)``, which appends one row's cells to the columns instead of building
+    a tuple. ``pad(i)`` is called for short rows to fill columns ``i..``
+    with NULLs.
+    """
+    key = ("columns", tuple(kinds), tuple(converters))
+    try:
+        return _cache[key]
+    except (KeyError, TypeError):
+        pass
+
+    namespace = {"_lenenc": _lenenc}
+    args = []
+    body = []
+    for index, (kind, (encoding, converter)) in enumerate(zip(kinds, converters)):
+        args.append(f"v{index}")
+        raw = "data[pos:pos + n]"
+        body.append(f"        if pos >= end: return pad({index})")
+        body.append("        n = data[pos]; pos += 1")
+        if kind in ("int", "uint", "float"):
+            namespace[f"conv{index}"] = float if kind == "float" else int
+            null_value = "NAN" if kind == "float" else "0"
+            body.append(f"        if n == {NULL_COLUMN}:")
+            body.append(f"            v{index}({null_value}); m{index}(1)")
+            body.append("        else:")
+            body.append(f"            if n > {NULL_COLUMN}: n, pos = _lenenc(data, n, pos)")
+            body.append(f"            v{index}(conv{index}({raw})); m{index}(0)")
+            body.append("            pos += n")
+        elif kind == "category":
+            body.append(f"        if n == {NULL_COLUMN}:")
+            body.append(f"            v{index}(-1); m{index}(1)")
+            body.append("        else:")
+            body.append(f"            if n > {NULL_COLUMN}: n, pos = _lenenc(data, n, pos)")
+            body.append(f"            s = {raw}.decode({encoding!r})")
+            body.append(f"            c = k{index}.get(s)")
+            body.append("            if c is None:")
+            body.append(f"                c = k{index}[s] = len(k{index})")
+            body.append(f"            v{index}(c); m{index}(0)")
+            body.append("            pos += n")
+        else:
+            body.append(f"        if n == {NULL_COLUMN}:")
+            body.append(f"            v{index}(None)")
+            body.append("        else:")
+            body.append(f"            if n > {NULL_COLUMN}: n, pos = _lenenc(data, n, pos)")
+            body.append(f"            v{index}({_column_expression(index, encoding, converter)})")
+            body.append("            pos += n")
+            if converter is not None:
+                namespace[f"conv{index}"] = converter
+
+    count = len(kinds)
+    lines = ["def factory(values, masks, categories, pad):"]
+    lines.append(f"    {''.join(a + ', ' for a in args)}= values")
+    lines.append(f"    {''.join(f'm{i}, ' for i in range(count))}= masks")
+    lines.append(f"    {''.join(f'k{i}, ' for i in range(count))}= categories")
+    lines.append("    def decode_into(data, pos, end):")
+    lines.extend(body)
+    lines.append("    return decode_into")
+
+    namespace["NAN"] = float("nan")
+    exec("\n".join(lines), namespace)
+    factory = namespace["factory"]
+    if len(_cache) >= _CACHE_LIMIT:
+        _cache.clear()
+    try:
+        _cache[key] = factory
+    except TypeError:
+        pass
+    return factory
+
+
+# Binary protocol: fixed-width column types -> (signed format, unsigned format)
+BINARY_FIXED = {
+    FIELD_TYPE.TINY: ("<b", "<B"),
+    FIELD_TYPE.SHORT: ("<h", "<H"),
+    FIELD_TYPE.YEAR: ("<h", "<H"),
+    FIELD_TYPE.INT24: ("<i", "<I"),
+    FIELD_TYPE.LONG: ("<i", "<I"),
+    FIELD_TYPE.LONGLONG: ("<q", "<Q"),
+    FIELD_TYPE.FLOAT: ("<f", "<f"),
+    FIELD_TYPE.DOUBLE: ("<d", "<d"),
+}
+
+BINARY_TEMPORAL = {
+    FIELD_TYPE.DATE: "_binary_date",
+    FIELD_TYPE.DATETIME: "_binary_datetime",
+    FIELD_TYPE.TIMESTAMP: "_binary_datetime",
+    FIELD_TYPE.TIME: "_binary_time",
+}
+
+
+def _binary_datetime(data, pos):
+    n = data[pos]
+    pos += 1
+    if n == 0:
+        return "0000-00-00 00:00:00", pos
+    year = data[pos] | data[pos + 1] << 8
+    month, day = data[pos + 2], data[pos + 3]
+    hour = minute = second = microsecond = 0
+    if n >= 7:
+        hour, minute, second = data[pos + 4], data[pos + 5], data[pos + 6]
+    if n >= 11:
+        microsecond = int.from_bytes(data[pos + 7 : pos + 11], "little")
+    try:
+        value = datetime.datetime(year, month, day, hour, minute, second, microsecond)
+    except ValueError:
+        # Zero dates and friends come back as text, like the text protocol
+        value = f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:{second:02d}"
+    return value, pos + n
+
+
+def _binary_date(data, pos):
+    value, pos = _binary_datetime(data, pos)
+    if isinstance(value, datetime.datetime):
+        return value.date(), pos
+    return value[:10], pos
+
+
+def _binary_time(data, pos):
+    n = data[pos]
+    pos += 1
+    if n == 0:
+        return datetime.timedelta(0), pos
+    negative = data[pos]
+    days = int.from_bytes(data[pos + 1 : pos + 5], "little")
+    microseconds = 0
+    if n >= 12:
+        microseconds = int.from_bytes(data[pos + 8 : pos + 12], "little")
+    value = datetime.timedelta(
+        days=days,
+        hours=data[pos + 5],
+        minutes=data[pos + 6],
+        seconds=data[pos + 7],
+        microseconds=microseconds,
+    )
+    return (-value if negative else value), pos + n
+
+
+def compile_binary_row_decoder(fields, converters):
+    """Return ``decode(data, pos, end) -> tuple`` for binary-protocol rows.
+
+    Used for prepared-statement results: integers and floats are unpacked
+    from their fixed-width wire format and temporal types from their packed
+    form, so no text parsing happens. Length-encoded columns (strings,
+    DECIMAL, JSON, ...) go through the usual ``(encoding, converter)``.
+    """
+    schema = tuple(
+        (field.type_code, bool(field.flags & FLAG.UNSIGNED)) for field in fields
+    )
+    key = ("binary", schema, tuple(converters))
+    try:
+        return _cache[key]
+    except (KeyError, TypeError):
+        pass
+
+    namespace = {
+        "_lenenc": _lenenc,
+        "_binary_date": _binary_date,
+        "_binary_datetime": _binary_datetime,
+        "_binary_time": _binary_time,
+    }
+    null_bytes = (len(schema) + 7 + 2) // 8
+    lines = [
+        "def decode_row(data, pos, end):",
+        f"    nulls = int.from_bytes(data[pos + 1:pos + {1 + null_bytes}], 'little')",
+        f"    pos += {1 + null_bytes}",
+    ]
+    names = []
+    for index, ((type_code, unsigned), (encoding, converter)) in enumerate(
+        zip(schema, converters)
+    ):
+        lines.append(f"    if nulls >> {index + 2} & 1:")
+        lines.append(f"        c{index} = None")
+        lines.append("    else:")
+        if type_code in BINARY_FIXED:
+            fmt = BINARY_FIXED[type_code][unsigned]
+            unpack = struct.Struct(fmt)
+            namespace[f"unpack{index}"] = unpack.unpack_from
+            lines.append(f"        c{index}, = unpack{index}(data, pos)")
+            lines.append(f"        pos += {unpack.size}")
+        elif type_code in BINARY_TEMPORAL:
+            lines.append(f"        c{index}, pos = {BINARY_TEMPORAL[type_code]}(data, pos)")
+        elif type_code == FIELD_TYPE.NULL:
+            lines.append(f"        c{index} = None")
+        else:
+            if converter is not None:
+                namespace[f"conv{index}"] = converter
+            lines.append("        n = data[pos]; pos += 1")
+            lines.append(f"        if n > {NULL_COLUMN}: n, pos = _lenenc(data, n, pos)")
+            lines.append(f"        c{index} = {_column_expression(index, encoding, converter)}")
+            lines.append("        pos += n")
+        names.append(f"c{index}")
+    lines.append(f"    return ({''.join(n + ', ' for n in names)})")
+
+    exec("\n".join(lines), namespace)
+    decode_row = namespace["decode_row"]
+    if len(_cache) >= _CACHE_LIMIT:
+        _cache.clear()
+    try:
+        _cache[key] = decode_row
+    except TypeError:
+        pass
+    return decode_row
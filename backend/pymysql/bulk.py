@@ -0,0 +1,264 @@
+"""
+Bulk ingest: CSV files or column arrays into a table.
+
+``LOAD DATA LOCAL INFILE`` is used when the connection allows it
+(``local_infile="streams"`` or ``True``); the data is streamed to the
+server from memory rather than a file on disk, and while it is the server
+can't request any other file. Otherwise rows go through multi-row INSERTs
+built from columns escaped a whole column at a time.
+"""
+import csv
+import io
+import itertools
+import math
+
+from . import err
+from .constants import ER
+
+
+#: Server errors meaning LOAD DATA LOCAL is refused; the INSERT path is used instead.
+#: 3948 is ER_CLIENT_LOCAL_FILES_DISABLED (MySQL 8.0).
+LOCAL_INFILE_REFUSED = {ER.NOT_ALLOWED_COMMAND, 3948}
+
+_stream_ids = itertools.count(1)
+
+_tsv_escape_table = {
+    ord("\\"): "\\\\",
+    ord("\t"): "\\t",
+    ord("\n"): "\\n",
+    ord("\r"): "\\r",
+    0: "\\0",
+}
+
+
+def _quote_name(name):
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _column_list(names):
+    return ", ".join(_quote_name(name) for name in names)
+
+
+def _column_kind(values):
+    """Return "int", "float" or "str" if every non-None value is of that kind, else None.
+
+    A column mixing ints and floats is "float".
+    """
+    dtype = getattr(values, "dtype", None)
+    if dtype is not None:
+        if dtype.kind in "iu":
+            return "int"
+        if dtype.kind == "f":
+            return "float"
+        return None
+    kinds = {type(value) for value in values}
+    kinds.discard(type(None))
+    if kinds == {int}:
+        return "int"
+    if kinds and kinds <= {int, float}:
+        return "float"
+    if kinds == {str}:
+        return "str"
+    return None
+
+
+def _as_list(values):
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def _check_columns(columns):
+    names = list(columns)
+    if not names:
+        raise err.ProgrammingError("No columns to load")
+    lengths = {len(columns[name]) for name in names}
+    if len(lengths) != 1:
+        raise err.ProgrammingError("Columns have different lengths")
+    return names, lengths.pop()
+
+
+def _check_finite(values):
+    if math.inf in values or -math.inf in values:
+        raise err.ProgrammingError("inf can not be used with MySQL")
+
+
+def _float_text(value, null):
+    if value is None or value != value:
+        return null
+    if math.isinf(value):
+        raise err.ProgrammingError(f"{value!r} can not be used with MySQL")
+    return repr(value)
+
+
+def encode_tsv_column(values, null="\\N"):
+    """Encode one column as LOAD DATA text fields (default escaping)."""
+    kind = _column_kind(values)
+    values = _as_list(values)
+    if kind == "int":
+        return [null if value is None else str(value) for value in values]
+    if kind == "float":
+        _check_finite(values)
+        # NaN != NaN: missing values in float arrays become NULL
+        return [null if value is None or value != value else repr(value) for value in values]
+    table = _tsv_escape_table
+    encoded = []
+    for value in values:
+        if value is None:
+            encoded.append(null)
+        elif isinstance(value, float):
+            encoded.append(_float_text(value, null))
+        elif isinstance(value, (bytes, bytearray)):
+            encoded.append(bytes(value).decode("ascii", "surrogateescape").translate(table))
+        else:
+            encoded.append(str(value).translate(table))
+    return encoded
+
+
+def escape_column(values, conn):
+    """Escape one column to SQL literals with :meth:`Connection.escape_column`.
+
+    NaN (missing values in float arrays) is written as NULL.
+    """
+    kind = _column_kind(values)
+    values = _as_list(values)
+    if kind == "float":
+        values = [None if value != value else value for value in values]
+    return conn.escape_column(values)
+
+
+def _load_local(cursor, name, sql, stream):
+    """Run a LOAD DATA LOCAL statement for ``name``, served from an in-memory stream."""
+    conn = cursor._get_db()
+    conn._local_streams[name] = stream
+    try:
+        return cursor.execute(sql)
+    finally:
+        conn._local_streams.pop(name, None)
+
+
+def _refused(error):
+    return error.args[0] in LOCAL_INFILE_REFUSED
+
+
+def insert_columns(cursor, table, columns, replace=False):
+    """Insert ``{name: values}`` with multi-row INSERTs; returns rows affected."""
+    conn = cursor._get_db()
+    names, count = _check_columns(columns)
+    if not count:
+        return 0
+    escaped = [escape_column(columns[name], conn) for name in names]
+    verb = "REPLACE" if replace else "INSERT"
+    prefix = f"{verb} INTO {_quote_name(table)} ({_column_list(names)}) VALUES "
+    max_length = cursor.max_stmt_length
+
+    rows = 0
+    values = []
+    length = len(prefix)
+    for row in zip(*escaped):
+        group = "(" + ",".join(row) + ")"
+        if values and length + len(group) + 1 > max_length:
+            rows += cursor.execute(prefix + ",".join(values))
+            values = []
+            length = len(prefix)
+        values.append(group)
+        length += len(group) + 1
+    rows += cursor.execute(prefix + ",".join(values))
+    return rows
+
+
+def load_columns(cursor, table, columns, replace=False):
+    """Bulk-load ``{name: values}`` (lists, array.array or NumPy arrays).
+
+    The columns are encoded into one in-memory tab-separated buffer and sent
+    with LOAD DATA LOCAL INFILE; falls back to :func:`insert_columns`.
+    Returns the number of rows loaded.
+    """
+    conn = cursor._get_db()
+    names, count = _check_columns(columns)
+    if not count:
+        return 0
+    if not conn._local_infile:
+        return insert_columns(cursor, table, columns, replace)
+
+    encoded = [encode_tsv_column(columns[name]) for name in names]
+    text = "".join("\t".join(row) + "\n" for row in zip(*encoded))
+    stream = io.BytesIO(text.encode(conn.encoding, "surrogateescape"))
+    name = f"pymysql-stream-{next(_stream_ids)}"
+    sql = (
+        f"LOAD DATA LOCAL INFILE '{name}' "
+        f"{'REPLACE' if replace else 'IGNORE'} INTO TABLE {_quote_name(table)} "
+        f"CHARACTER SET {conn.charset} ({_column_list(names)})"
+    )
+    try:
+        return _load_local(cursor, name, sql, stream)
+    except err.MySQLError as e:
+        if not _refused(e):
+            raise
+    return insert_columns(cursor, table, columns, replace)
+
+
+def _read_csv_source(source, encoding):
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    data = source.read()
+    return data.encode(encoding) if isinstance(data, str) else data
+
+
+def load_csv(cursor, table, source, columns=None, replace=False):
+    """Bulk-load a CSV with a header row into ``table``.
+
+    ``source`` is a path, bytes, or a file object, in the connection's
+    encoding. The raw CSV is streamed as-is to LOAD DATA LOCAL INFILE;
+    empty fields are loaded as NULL.
+    ``columns`` maps CSV header names to table columns (default: same
+    names). Falls back to parsing the CSV and :func:`insert_columns`.
+    Returns the number of rows loaded.
+    """
+    conn = cursor._get_db()
+    encoding = conn.encoding
+    data = _read_csv_source(source, encoding)
+    if data.startswith(b"\xef\xbb\xbf"):
+        data = data[3:]
+    header_end = data.find(b"\n")
+    header_line = data[:header_end] if header_end >= 0 else data
+    header = next(csv.reader([header_line.decode(encoding)]))
+    names = [columns.get(name, name) for name in header] if columns else header
+
+    if conn._local_infile:
+        line_end = "\\r\\n" if data[header_end - 1 : header_end] == b"\r" else "\\n"
+        variables = ", ".join(f"@v{i}" for i in range(len(names)))
+        assignments = ", ".join(
+            f"{_quote_name(name)} = NULLIF(@v{i}, '')" for i, name in enumerate(names)
+        )
+        name = f"pymysql-stream-{next(_stream_ids)}"
+        sql = (
+            f"LOAD DATA LOCAL INFILE '{name}' "
+            f"{'REPLACE' if replace else 'IGNORE'} INTO TABLE {_quote_name(table)} "
+            f"CHARACTER SET {conn.charset} "
+            f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            f"LINES TERMINATED BY '{line_end}' IGNORE 1 LINES "
+            f"({variables}) SET {assignments}"
+        )
+        try:
+            return _load_local(cursor, name, sql, io.BytesIO(data))
+        except err.MySQLError as e:
+            if not _refused(e):
+                raise
+
+    reader = csv.reader(io.StringIO(data.decode(encoding), newline=""))
+    next(reader)
+    fields = list(zip(*reader))
+    values = [_csv_column(column) for column in fields]
+    return insert_columns(cursor, table, dict(zip(names, values)), replace)
+
+
+def _csv_column(texts):
+    """Typed values for one CSV column: empty -> None, all-numeric columns -> int/float."""
+    for convert in (int, float):
+        try:
+            return [convert(text) if text else None for text in texts]
+        except ValueError:
+            pass
+    return [text if text else None for text in texts]
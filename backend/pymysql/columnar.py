@@ -0,0 +1,199 @@
+"""
+Column-oriented result sets for :class:`~pymysql.cursors.SSColumnarCursor`.
+"""
+from array import array
+from collections import deque
+
+from .constants import FIELD_TYPE, FLAG
+from ._rowdecoder import compile_column_factory
+
+try:
+    import numpy as np
+
+    _have_numpy = True
+except ImportError:
+    np = None
+    _have_numpy = False
+
+
+FLOAT_TYPES = {
+    FIELD_TYPE.DECIMAL,
+    FIELD_TYPE.NEWDECIMAL,
+    FIELD_TYPE.FLOAT,
+    FIELD_TYPE.DOUBLE,
+}
+
+TEXT_TYPES = {
+    FIELD_TYPE.STRING,
+    FIELD_TYPE.VAR_STRING,
+    FIELD_TYPE.VARCHAR,
+    FIELD_TYPE.ENUM,
+    FIELD_TYPE.BLOB,
+    FIELD_TYPE.TINY_BLOB,
+    FIELD_TYPE.MEDIUM_BLOB,
+    FIELD_TYPE.LONG_BLOB,
+}
+
+
+class Column:
+    """One result column.
+
+    ``kind`` is "int", "uint", "float", "category" or "object".
+
+    * ``values``: int64 / uint64 / float64 array for numeric kinds ("uint"
+      is BIGINT UNSIGNED, which can exceed int64), int32 codes into
+      ``categories`` for "category" (-1 is NULL), object array otherwise.
+      These are NumPy arrays when NumPy is installed, ``array.array`` /
+      ``list`` otherwise.
+    * ``mask``: boolean array, True where the value is NULL; None when the
+      column has no NULLs.
+    * ``categories``: list of distinct strings for "category" columns.
+    """
+
+    __slots__ = ("name", "kind", "values", "mask", "categories")
+
+    def __init__(self, name, kind, values, mask=None, categories=None):
+        self.name = name
+        self.kind = kind
+        self.values = values
+        self.mask = mask
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return f"<Column {self.name!r} kind={self.kind} rows={len(self)}>"
+
+    def to_list(self):
+        """Materialize as a list of Python values with None for NULL."""
+        if self.kind == "category":
+            categories = self.categories
+            return [categories[code] if code >= 0 else None for code in self.values]
+        values = list(self.values)
+        if self.mask is not None and self.kind != "object":
+            for index, null in enumerate(self.mask):
+                if null:
+                    values[index] = None
+        return values
+
+
+def column_kind(field, converter, categorical=True):
+    """Pick the columnar storage kind for a field and its text-protocol converter."""
+    if field.type_code in FLOAT_TYPES or converter is float:
+        return "float"
+    if converter is int:
+        if field.type_code == FIELD_TYPE.LONGLONG and field.flags & FLAG.UNSIGNED:
+            return "uint"
+        return "int"
+    if (
+        categorical
+        and field.type_code in TEXT_TYPES
+        and field.charsetnr != 63
+        and converter is None
+    ):
+        return "category"
+    return "object"
+
+
+class ColumnBuilder:
+    """Accumulates decoded cells column by column without per-row objects."""
+
+    def __init__(self, fields, converters, categorical=True):
+        self.names = _column_names(fields)
+        self.kinds = [
+            column_kind(field, converter, categorical)
+            for field, (_, converter) in zip(fields, converters)
+        ]
+        self._factory = compile_column_factory(self.kinds, converters)
+        self.sink = deque(maxlen=0)  # decode_into returns None; nothing to keep
+        self.reset()
+
+    def reset(self):
+        """Start a fresh batch of columns."""
+        self.values = []
+        self.masks = []
+        self.categories = []
+        for kind in self.kinds:
+            if kind == "int":
+                self.values.append(array("q"))
+            elif kind == "uint":
+                self.values.append(array("Q"))
+            elif kind == "float":
+                self.values.append(array("d"))
+            elif kind == "category":
+                self.values.append(array("i"))
+            else:
+                self.values.append([])
+            self.masks.append(bytearray() if kind != "object" else None)
+            self.categories.append({} if kind == "category" else None)
+
+        self.decode_into = self._factory(
+            [values.append for values in self.values],
+            [mask.append if mask is not None else None for mask in self.masks],
+            self.categories,
+            self._pad,
+        )
+
+    def _pad(self, start):
+        for index in range(start, len(self.kinds)):
+            kind = self.kinds[index]
+            if kind in ("int", "uint"):
+                self.values[index].append(0)
+            elif kind == "float":
+                self.values[index].append(float("nan"))
+            elif kind == "category":
+                self.values[index].append(-1)
+            else:
+                self.values[index].append(None)
+            if self.masks[index] is not None:
+                self.masks[index].append(1)
+
+    def __len__(self):
+        return len(self.values[0]) if self.values else 0
+
+    def build(self):
+        """Return {name: Column} for the current batch."""
+        columns = {}
+        for name, kind, values, mask, categories in zip(
+            self.names, self.kinds, self.values, self.masks, self.categories
+        ):
+            if kind == "object":
+                has_null = any(value is None for value in values)
+                mask = bytearray(value is None for value in values) if has_null else None
+            elif mask is not None and 1 not in mask:
+                mask = None
+            if categories is not None:
+                categories = list(categories)
+            columns[name] = Column(name, kind, *_finish(kind, values, mask), categories)
+        return columns
+
+
+def _finish(kind, values, mask):
+    if not _have_numpy:
+        return values, mask
+    if kind == "object":
+        array_values = np.empty(len(values), dtype=object)
+        array_values[:] = values
+    else:
+        # Zero-copy view over the array.array buffer
+        dtype = {
+            "int": np.int64,
+            "uint": np.uint64,
+            "float": np.float64,
+            "category": np.int32,
+        }[kind]
+        array_values = np.frombuffer(values, dtype=dtype) if len(values) else np.empty(0, dtype)
+    if mask is not None:
+        mask = np.frombuffer(mask, dtype=np.bool_)
+    return array_values, mask
+
+
+def _column_names(fields):
+    names = []
+    for field in fields:
+        name = field.name
+        if name in names:
+            name = field.table_name + "." + name
+        names.append(name)
+    return names
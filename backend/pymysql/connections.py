@@ -2,22 +2,31 @@
 # http://dev.mysql.com/doc/internals/en/client-server-protocol.html
 # Error codes:
 # https://dev.mysql.com/doc/refman/5.5/en/error-handling.html
+from collections import OrderedDict
 import errno
 import os
 import socket
 import struct
 import sys
+import time
 import traceback
 import warnings
 
 from . import _auth
+from . import _compression
+from . import querycache
+from ._rowdecoder import compile_binary_row_decoder, compile_row_decoder
 
 from .charset import charset_by_name, charset_by_id
 from .constants import CLIENT, COMMAND, CR, ER, FIELD_TYPE, SERVER_STATUS
 from . import converters
 from .cursors import Cursor
 from .optionfile import Parser
+from .prepared import PreparedStatement
 from .protocol import (
+    NULL_COLUMN,
+    UNSIGNED_SHORT_COLUMN,
+    UNSIGNED_INT24_COLUMN,
     dump_packet,
     MysqlPacket,
     FieldDescriptorPacket,
@@ -63,6 +72,9 @@ DEFAULT_CHARSET = "utf8mb4"
 
 MAX_PACKET_LEN = 2**24 - 1
 
+#: Initial size of the per-connection receive buffer.
+READ_BUFFER_SIZE = 256 * 1024
+
 
 def _pack_int24(n):
     return struct.pack("<I", n)[:3]
@@ -89,6 +101,112 @@ def _lenenc_int(i):
         )
 
 
+class _SocketReader:
+    """Reusable receive buffer over a socket.
+
+    Large chunks are read with ``recv_into`` into one bytearray and callers
+    get ``memoryview`` slices of it, so a packet payload is not copied until
+    someone needs a ``bytes`` object. A view returned by :meth:`read_view`
+    is only valid until the next read.
+
+    ``budget``, if given, is called before every ``recv_into`` and returns
+    the socket timeout for that receive (None to leave it unchanged), so a
+    deadline bounds a whole read however many receives it takes.
+    """
+
+    def __init__(self, sock, size=READ_BUFFER_SIZE, budget=None):
+        self._sock = sock
+        self._budget = budget
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+    def _fill(self, need):
+        """Make sure at least ``need`` bytes are buffered past the read position."""
+        self._reserve(need)
+        while self._end - self._start < need:
+            if not self._receive():
+                return False
+        return True
+
+    def _reserve(self, need):
+        """Make room for ``need`` bytes past the read position."""
+        available = self._end - self._start
+        if self._start + need > len(self._buf):
+            if need > len(self._buf):
+                # Older views keep the previous buffer alive; never resize in place.
+                buf = bytearray(max(need, len(self._buf) * 2))
+                buf[:available] = self._view[self._start : self._end]
+                self._buf = buf
+                self._view = memoryview(buf)
+            else:
+                # Same-size slice assignment is allowed while views are exported.
+                self._buf[:available] = self._buf[self._start : self._end]
+            self._start = 0
+            self._end = available
+
+    def _receive(self):
+        if self._budget is not None:
+            timeout = self._budget()
+            if timeout is not None:
+                self._sock.settimeout(timeout)
+        received = self._sock.recv_into(self._view[self._end :])
+        self._end += received
+        return received > 0
+
+    def read_view(self, size):
+        """Return a memoryview of the next ``size`` bytes, or None on EOF."""
+        if self._end - self._start < size and not self._fill(size):
+            return None
+        start = self._start
+        self._start = start + size
+        return self._view[start : start + size]
+
+    def read(self, size):
+        view = self.read_view(size)
+        return b"" if view is None else bytes(view)
+
+
+class _CompressedReader(_SocketReader):
+    """Receive buffer for the compressed protocol.
+
+    Frames are read from the raw socket reader and their payloads are
+    decompressed into this reader's buffer, so packet parsing (and batch
+    row decoding) works on plain protocol bytes as usual. ``sequence`` is
+    the next compressed-frame sequence number.
+    """
+
+    def __init__(self, raw, codec, size=READ_BUFFER_SIZE):
+        super().__init__(raw._sock, size)
+        self._raw = raw
+        self._codec = codec
+        self.sequence = 0
+
+    def _receive(self):
+        header = self._raw.read_view(7)
+        if header is None:
+            return False
+        length = header[0] | header[1] << 8 | header[2] << 16
+        uncompressed = header[4] | header[5] << 8 | header[6] << 16
+        if header[3] != self.sequence:
+            raise err.InternalError(
+                "Compressed packet sequence number wrong - got %d expected %d"
+                % (header[3], self.sequence)
+            )
+        self.sequence = (header[3] + 1) % 256
+        payload = self._raw.read_view(length)
+        if payload is None:
+            return False
+        if uncompressed:
+            payload = self._codec.decompress(payload, uncompressed)
+        size = len(payload)
+        self._reserve(self._end - self._start + size)
+        self._buf[self._end : self._end + size] = payload
+        self._end += size
+        return True
+
+
 class Connection:
     """
     Representation of a socket with a mysql server.
@@ -139,7 +257,9 @@ class Connection:
     :param ssl_verify_identity: Set to true to check the server's identity.
     :param read_default_group: Group to read from in the configuration file.
     :param autocommit: Autocommit mode. None means use server default. (default: False)
-    :param local_infile: Boolean to enable the use of LOAD DATA LOCAL command. (default: False)
+    :param local_infile: Boolean to enable the use of LOAD DATA LOCAL command, or "streams"
+        to allow it only for data sent from memory by :mod:`pymysql.bulk`, so the server
+        can't request files from disk. (default: False)
     :param max_allowed_packet: Max size of packet sent to server in bytes. (default: 16MB)
         Only used to limit size of "LOAD LOCAL INFILE" data packet smaller than default (16KB).
     :param defer_connect: Don't explicitly connect on construction - wait for connect call.
@@ -151,7 +271,16 @@ class Connection:
         (if no authenticate method) for returning a string from the user. (experimental)
     :param server_public_key: SHA256 authentication plugin public key value. (default: None)
     :param binary_prefix: Add _binary prefix on bytes and bytearray. (default: False)
-    :param compress: Not supported.
+    :param statement_cache_size: Number of server-side prepared statements kept open
+        per connection, least recently used first out. (default: 64)
+    :param compress: Use the compressed protocol: True or "zlib", or "zstd"
+        (needs the zstandard package and MySQL 8.0.18+; falls back to zlib).
+        Ignored when the server doesn't support compression. (default: None)
+    :param compression_level: zlib / zstd compression level. (default: codec default)
+    :param query_cache: A :class:`~pymysql.querycache.QueryCache` answering repeated
+        SELECTs without a round trip; may be shared between connections. (default: None)
+    :param deadline: A :func:`time.monotonic` time by which socket operations must
+        finish; see :meth:`set_deadline`. (default: None)
     :param named_pipe: Not supported.
     :param db: **DEPRECATED** Alias for database.
     :param passwd: **DEPRECATED** Alias for password.
@@ -203,7 +332,11 @@ class Connection:
         ssl_key=None,
         ssl_verify_cert=None,
         ssl_verify_identity=None,
-        compress=None,  # not supported
+        statement_cache_size=64,
+        compress=None,
+        compression_level=None,
+        query_cache=None,
+        deadline=None,
         named_pipe=None,  # not supported
         passwd=None,  # deprecated
         db=None,  # deprecated
@@ -221,12 +354,23 @@ class Connection:
             # )
             password = passwd
 
-        if compress or named_pipe:
-            raise NotImplementedError(
-                "compress and named_pipe arguments are not supported"
-            )
-
+        if named_pipe:
+            raise NotImplementedError("named_pipe argument is not supported")
+        if compress is True:
+            compress = "zlib"
+        if compress and compress not in ("zlib", "zstd"):
+            raise ValueError("compress should be True, 'zlib' or 'zstd'")
+        self.compress = compress or None
+        self.compression_level = compression_level
+        self._codec = None
+
+        if isinstance(local_infile, str) and local_infile != "streams":
+            raise ValueError("local_infile should be a boolean or 'streams'")
         self._local_infile = bool(local_infile)
+        # Whether the server may name a file on disk to read
+        self._local_files = self._local_infile and local_infile != "streams"
+        # LOAD DATA LOCAL file names served from memory (see pymysql.bulk)
+        self._local_streams = {}
         if self._local_infile:
             client_flag |= CLIENT.LOCAL_FILES
 
@@ -308,6 +452,7 @@ class Connection:
         if write_timeout is not None and write_timeout <= 0:
             raise ValueError("write_timeout should be > 0")
         self._write_timeout = write_timeout
+        self._deadline = deadline
 
         self.charset = charset or DEFAULT_CHARSET
         self.collation = collation
@@ -327,6 +472,12 @@ class Connection:
         self._affected_rows = 0
         self.host_info = "Not connected"
 
+        self._statement_cache_size = statement_cache_size
+        self._statements = OrderedDict()
+        self.query_cache = query_cache
+        # Database for query cache keys; follows select_db()
+        self._database = database
+
         # specified autocommit mode. None means use server default.
         self.autocommit_mode = autocommit
 
@@ -431,7 +582,7 @@ class Connection:
             except:  # noqa
                 pass
         self._sock = None
-        self._rfile = None
+        self._reader = None
 
     __del__ = _force_close
 
@@ -502,6 +653,7 @@ class Connection:
         """
         self._execute_command(COMMAND.COM_INIT_DB, db)
         self._read_ok_packet()
+        self._database = db
 
     def escape(self, obj, mapping=None):
         """Escape whatever value is passed.
@@ -524,6 +676,24 @@ class Connection:
         """
         return self.escape(obj, self.encoders)
 
+    def escape_column(self, values):
+        """Escape a sequence of values to SQL literals, like :meth:`literal` on each.
+
+        Homogeneous int/float/bool/str columns are escaped in one pass
+        (see :func:`converters.escape_column`).
+        """
+        if self.server_status & SERVER_STATUS.SERVER_STATUS_NO_BACKSLASH_ESCAPES:
+            string_escape = self.escape_string
+        else:
+            string_escape = converters.escape_string
+        literals = converters.escape_column(
+            values, self.charset, self.encoders, string_escape
+        )
+        if literals is None:
+            literal = self.literal
+            literals = [literal(value) for value in values]
+        return literals
+
     def escape_string(self, s):
         if self.server_status & SERVER_STATUS.SERVER_STATUS_NO_BACKSLASH_ESCAPES:
             return s.replace("'", "''")
@@ -554,14 +724,109 @@ class Connection:
         #     print("DEBUG: sending query:", sql)
         if isinstance(sql, str):
             sql = sql.encode(self.encoding, "surrogateescape")
+        if not unbuffered and self._cached_query(sql):
+            return self._affected_rows
         self._execute_command(COMMAND.COM_QUERY, sql)
         self._affected_rows = self._read_query_result(unbuffered=unbuffered)
+        if not unbuffered:
+            self._cache_result(sql)
         return self._affected_rows
 
+    def _cache_key(self, sql, binary=False, params=None):
+        if isinstance(sql, str):
+            sql = sql.encode(self.encoding, "surrogateescape")
+        if self.query_cache is None or not querycache.is_cacheable(sql):
+            return None
+        if params is not None:
+            # Typed, so 1, 1.0 and True (equal and equally hashed) stay apart
+            params = tuple((type(value), value) for value in params)
+            try:
+                hash(params)
+            except TypeError:
+                return None
+        # Prepared-statement results are binary-protocol results, keyed on
+        # the ``?`` statement and its parameters: kept apart from text queries
+        return (self.host, self.port, self._database, binary, sql, params)
+
+    def _cached_query(self, sql, binary=False, params=None):
+        """Make the cached result for ``sql`` current; returns False on a miss."""
+        key = self._cache_key(sql, binary, params)
+        if key is None or not self._sock:
+            return False
+        # Results still pending on the wire must be read by _execute_command
+        if self._result is not None and (
+            self._result.unbuffered_active or self._result.has_next
+        ):
+            return False
+        result = self.query_cache.get(key)
+        if result is None:
+            return False
+        self._result = result
+        self._affected_rows = result.affected_rows
+        return True
+
+    def _cache_result(self, sql, binary=False, params=None):
+        key = self._cache_key(sql, binary, params)
+        if key is not None:
+            self.query_cache.put(key, self._result)
+
     def next_result(self, unbuffered=False):
-        self._affected_rows = self._read_query_result(unbuffered=unbuffered)
+        binary = self._result is not None and self._result.binary
+        self._affected_rows = self._read_query_result(
+            unbuffered=unbuffered, binary=binary
+        )
         return self._affected_rows
 
+    def prepare(self, sql):
+        """
+        Prepare a statement with ``?`` markers on the server.
+
+        Statements are cached per connection by SQL text; the least recently
+        used one is closed on the server when the cache is full.
+
+        :rtype: PreparedStatement
+        """
+        statements = self._statements
+        statement = statements.get(sql)
+        if statement is not None:
+            statements.move_to_end(sql)
+            return statement
+
+        self._execute_command(COMMAND.COM_STMT_PREPARE, sql)
+        packet = self._read_packet()
+        packet.advance(1)  # OK header
+        statement_id, column_count, param_count = packet.read_struct("<IHH")
+        # Parameter and column definitions; result columns are described
+        # again by every execute, so they're skipped here.
+        for count in (param_count, column_count):
+            if count:
+                for _ in range(count):
+                    self._read_packet()
+                eof_packet = self._read_packet()
+                assert eof_packet.is_eof_packet(), "Protocol error, expecting EOF"
+
+        statement = PreparedStatement(sql, statement_id, param_count, column_count)
+        statements[sql] = statement
+        while len(statements) > self._statement_cache_size:
+            _, evicted = statements.popitem(last=False)
+            self._close_statement(evicted)
+        return statement
+
+    def execute_prepared(self, statement, args=(), unbuffered=False):
+        """Execute a prepared statement; rows are read in the binary protocol."""
+        payload = statement.execute_payload(args, self.encoding)
+        self._execute_command(COMMAND.COM_STMT_EXECUTE, payload)
+        self._affected_rows = self._read_query_result(
+            unbuffered=unbuffered, binary=True
+        )
+        return self._affected_rows
+
+    def _close_statement(self, statement):
+        # COM_STMT_CLOSE has no response
+        self._execute_command(
+            COMMAND.COM_STMT_CLOSE, struct.pack("<I", statement.statement_id)
+        )
+
     def affected_rows(self):
         return self._affected_rows
 
@@ -570,6 +835,37 @@ class Connection:
         self._execute_command(COMMAND.COM_PROCESS_KILL, arg)
         return self._read_ok_packet()
 
+    def set_deadline(self, deadline):
+        """
+        Limit socket operations to finish by ``deadline``, a :func:`time.monotonic`
+        time, or lift the limit with None.
+
+        Connecting, and every read and write, then waits at most for the time
+        left (or the configured timeout, if shorter). Past the deadline they
+        fail with :class:`~pymysql.err.OperationalError` and the connection is
+        closed, since the protocol state is lost.
+        """
+        self._deadline = deadline
+
+    def _budget(self, timeout):
+        """``timeout`` capped at the time left before the deadline."""
+        deadline = self._deadline
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout("deadline exceeded")
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def _receive_budget(self):
+        """Socket timeout for one receive under the deadline; None without one.
+
+        Raises :class:`socket.timeout` once the deadline has passed.
+        """
+        if self._deadline is None:
+            return None
+        return self._budget(self._read_timeout)
+
     def ping(self, reconnect=True):
         """
         Check if the server is alive.
@@ -625,11 +921,14 @@ class Connection:
 
     def connect(self, sock=None):
         self._closed = False
+        self._database = self.db
+        if isinstance(self._database, bytes):
+            self._database = self._database.decode(self.encoding)
         try:
             if sock is None:
                 if self.unix_socket:
                     sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-                    sock.settimeout(self.connect_timeout)
+                    sock.settimeout(self._budget(self.connect_timeout))
                     sock.connect(self.unix_socket)
                     self.host_info = "Localhost via UNIX socket"
                     self._secure = True
@@ -642,7 +941,9 @@ class Connection:
                     while True:
                         try:
                             sock = socket.create_connection(
-                                (self.host, self.port), self.connect_timeout, **kwargs
+                                (self.host, self.port),
+                                self._budget(self.connect_timeout),
+                                **kwargs,
                             )
                             break
                         except OSError as e:
@@ -657,11 +958,17 @@ class Connection:
                 sock.settimeout(None)
 
             self._sock = sock
-            self._rfile = sock.makefile("rb")
+            self._reader = _SocketReader(sock, budget=self._receive_budget)
+            self._codec = None
             self._next_seq_id = 0
+            # Statement ids belong to the server session
+            self._statements.clear()
 
             self._get_server_information()
             self._request_authentication()
+            if self._codec is not None:
+                # Everything after the handshake travels in compressed frames
+                self._reader = _CompressedReader(self._reader, self._codec)
 
             # Send "SET NAMES" query on init for:
             # - Ensure charaset (and collation) is set to the server.
@@ -691,7 +998,7 @@ class Connection:
             if self.autocommit_mode is not None:
                 self.autocommit(self.autocommit_mode)
         except BaseException as e:
-            self._rfile = None
+            self._reader = None
             if sock is not None:
                 try:
                     sock.close()
@@ -734,9 +1041,22 @@ class Connection:
         :raise OperationalError: If the connection to the MySQL server is lost.
         :raise InternalError: If the packet sequence number is wrong.
         """
-        buff = bytearray()
+        packet = packet_type(bytes(self._read_packet_view()), self.encoding)
+        if packet.is_error_packet():
+            if self._result is not None and self._result.unbuffered_active is True:
+                self._result.unbuffered_active = False
+            packet.raise_for_error()
+        return packet
+
+    def _read_packet_view(self):
+        """Read one packet payload as a memoryview without copying it.
+
+        The view points into the connection's receive buffer and is only
+        valid until the next read. Error packets are not checked here.
+        """
+        buff = None
         while True:
-            packet_header = self._read_bytes(4)
+            packet_header = self._read_bytes_view(4)
             # if DEBUG: dump_packet(packet_header)
 
             btrl, btrh, packet_number = struct.unpack("<HBB", packet_header)
@@ -755,28 +1075,72 @@ class Connection:
                 )
             self._next_seq_id = (self._next_seq_id + 1) % 256
 
-            recv_data = self._read_bytes(bytes_to_read)
+            recv_data = self._read_bytes_view(bytes_to_read)
             if DEBUG:
                 dump_packet(recv_data)
-            buff += recv_data
             # https://dev.mysql.com/doc/internals/en/sending-more-than-16mbyte.html
+            if bytes_to_read < MAX_PACKET_LEN and buff is None:
+                return recv_data
+            if buff is None:
+                buff = bytearray()
+            buff += recv_data
             if bytes_to_read == 0xFFFFFF:
                 continue
             if bytes_to_read < MAX_PACKET_LEN:
-                break
+                return memoryview(buff)
 
-        packet = packet_type(bytes(buff), self.encoding)
-        if packet.is_error_packet():
-            if self._result is not None and self._result.unbuffered_active is True:
-                self._result.unbuffered_active = False
-            packet.raise_for_error()
-        return packet
+    def _read_row_batch(self, decode_row, rows, limit=None):
+        """Decode row packets that are already in the receive buffer.
+
+        Walks consecutive complete packets without touching the socket and
+        appends ``decode_row(buffer, start, end)`` for each to ``rows``.
+        Stops (without consuming) at the first packet that is incomplete,
+        oversized, out of sequence, or an EOF/error packet, so the caller's
+        regular path handles it. Returns the number of rows decoded.
+        """
+        reader = self._reader
+        base = reader._start
+        # One copy per batch: int()/float() parse bytes slices faster than
+        # bytearray ones
+        data = bytes(memoryview(reader._buf)[base : reader._end])
+        pos = 0
+        end = len(data)
+        seq = self._next_seq_id
+        count = 0
+        while end - pos >= 4:
+            length = data[pos] | data[pos + 1] << 8 | data[pos + 2] << 16
+            start = pos + 4
+            if (
+                not length
+                or length >= MAX_PACKET_LEN
+                or start + length > end
+                or data[pos + 3] != seq
+            ):
+                break
+            if data[start] >= 0xFE and (data[start] == 0xFF or length < 9):
+                break
+            rows.append(decode_row(data, start, start + length))
+            pos = start + length
+            seq = (seq + 1) % 256
+            count += 1
+            if count == limit:
+                break
+        reader._start = base + pos
+        self._next_seq_id = seq
+        return count
 
     def _read_bytes(self, num_bytes):
-        self._sock.settimeout(self._read_timeout)
+        return bytes(self._read_bytes_view(num_bytes))
+
+    def _read_bytes_view(self, num_bytes):
+        reader = self._reader
+        if reader._end - reader._start >= num_bytes:
+            # Fast path: already buffered, no socket call needed
+            return reader.read_view(num_bytes)
         while True:
             try:
-                data = self._rfile.read(num_bytes)
+                self._sock.settimeout(self._budget(self._read_timeout))
+                data = reader.read_view(num_bytes)
                 break
             except OSError as e:
                 if e.errno == errno.EINTR:
@@ -790,7 +1154,7 @@ class Connection:
                 # Don't convert unknown exception to MySQLError.
                 self._force_close()
                 raise
-        if len(data) < num_bytes:
+        if data is None:
             self._force_close()
             raise err.OperationalError(
                 CR.CR_SERVER_LOST, "Lost connection to MySQL server during query"
@@ -798,8 +1162,16 @@ class Connection:
         return data
 
     def _write_bytes(self, data):
-        self._sock.settimeout(self._write_timeout)
+        if self._codec is not None:
+            reader = self._reader
+            if data[3] == 0:
+                # A new command restarts the compressed sequence too
+                reader.sequence = 0
+            data, reader.sequence = _compression.compress_frames(
+                data, self._codec, reader.sequence
+            )
         try:
+            self._sock.settimeout(self._budget(self._write_timeout))
             self._sock.sendall(data)
         except OSError as e:
             self._force_close()
@@ -807,18 +1179,18 @@ class Connection:
                 CR.CR_SERVER_GONE_ERROR, f"MySQL server has gone away ({e!r})"
             )
 
-    def _read_query_result(self, unbuffered=False):
+    def _read_query_result(self, unbuffered=False, binary=False):
         self._result = None
         if unbuffered:
             try:
-                result = MySQLResult(self)
+                result = MySQLResult(self, binary)
                 result.init_unbuffered_query()
             except:
                 result.unbuffered_active = False
                 result.connection = None
                 raise
         else:
-            result = MySQLResult(self)
+            result = MySQLResult(self, binary)
             result.read()
         self._result = result
         if result.server_status is not None:
@@ -882,6 +1254,8 @@ class Connection:
         if self.user is None:
             raise ValueError("Did not specify a username")
 
+        codec = self._negotiate_compression()
+
         charset_id = charset_by_name(self.charset).id
         if isinstance(self.user, str):
             self.user = self.user.encode(self.encoding)
@@ -894,7 +1268,7 @@ class Connection:
             self.write_packet(data_init)
 
             self._sock = self.ctx.wrap_socket(self._sock, server_hostname=self.host)
-            self._rfile = self._sock.makefile("rb")
+            self._reader = _SocketReader(self._sock, budget=self._receive_budget)
             self._secure = True
 
         data = data_init + self.user + b"\0"
@@ -950,6 +1324,9 @@ class Connection:
                 connect_attrs += _lenenc_int(len(v)) + v
             data += _lenenc_int(len(connect_attrs)) + connect_attrs
 
+        if self.client_flag & CLIENT.ZSTD_COMPRESSION_ALGORITHM:
+            data += struct.pack("B", codec.level)
+
         self.write_packet(data)
         auth_packet = self._read_packet()
 
@@ -983,6 +1360,24 @@ class Connection:
 
         if DEBUG:
             print("Succeed to auth")
+        self._codec = codec
+
+    def _negotiate_compression(self):
+        """Pick the compression codec and set the client flags for it."""
+        self.client_flag &= ~(CLIENT.COMPRESS | CLIENT.ZSTD_COMPRESSION_ALGORITHM)
+        if not self.compress:
+            return None
+        if (
+            self.compress == "zstd"
+            and _compression._have_zstd
+            and self.server_capabilities & CLIENT.ZSTD_COMPRESSION_ALGORITHM
+        ):
+            self.client_flag |= CLIENT.ZSTD_COMPRESSION_ALGORITHM
+            return _compression.ZstdCodec(self.compression_level)
+        if self.server_capabilities & CLIENT.COMPRESS:
+            self.client_flag |= CLIENT.COMPRESS
+            return _compression.ZlibCodec(self.compression_level)
+        return None
 
     def _process_auth(self, plugin_name, auth_packet):
         handler = self._get_auth_plugin_handler(plugin_name)
@@ -1175,11 +1570,13 @@ class Connection:
 
 
 class MySQLResult:
-    def __init__(self, connection):
+    def __init__(self, connection, binary=False):
         """
         :type connection: Connection
+        :param binary: Rows use the binary protocol (prepared statements).
         """
         self.connection = connection
+        self.binary = binary
         self.affected_rows = None
         self.insert_id = None
         self.server_status = None
@@ -1190,6 +1587,7 @@ class MySQLResult:
         self.rows = None
         self.has_next = None
         self.unbuffered_active = False
+        self._decode_row = None
 
     def __del__(self):
         if self.unbuffered_active:
@@ -1289,18 +1687,43 @@ class MySQLResult:
             return
 
         # EOF
-        packet = self.connection._read_packet()
-        if self._check_packet_is_eof(packet):
+        view = self.connection._read_packet_view()
+        if view[0] >= 0xFE and self._check_view_is_eof_or_error(view):
             self.unbuffered_active = False
             self.connection = None
             self.rows = None
             return
 
-        row = self._read_row_from_packet(packet)
+        row = self._read_row_from_view(view)
         self.affected_rows = 1
         self.rows = (row,)  # rows should tuple of row for MySQL-python compatibility.
         return row
 
+    def _read_rowdata_unbuffered_batch(self, decode_row, rows, limit):
+        """Read up to ``limit`` rows of an unbuffered result in one go.
+
+        Rows are produced by ``decode_row(data, start, end)`` and appended
+        to ``rows``; buffered packets are decoded in a batch before the
+        socket is touched again. Returns the number of rows read (0 at EOF).
+        """
+        if not self.unbuffered_active or limit <= 0:
+            return 0
+        conn = self.connection
+        count = conn._read_row_batch(decode_row, rows, limit)
+        while count < limit:
+            view = conn._read_packet_view()
+            if view[0] >= 0xFE and self._check_view_is_eof_or_error(view):
+                self.unbuffered_active = False
+                self.connection = None
+                self.rows = None
+                break
+            rows.append(decode_row(bytes(view), 0, len(view)))
+            count += 1
+            if count < limit:
+                count += conn._read_row_batch(decode_row, rows, limit - count)
+        self.affected_rows = count
+        return count
+
     def _finish_unbuffered_query(self):
         # After much reading on the MySQL protocol, it appears that there is,
         # in fact, no way to stop MySQL from sending all the data after
@@ -1324,35 +1747,82 @@ class MySQLResult:
                 self.unbuffered_active = False
                 self.connection = None  # release reference to kill cyclic reference.
 
+    def _check_view_is_eof_or_error(self, view):
+        """Handle an EOF or error packet seen on the row-view path.
+
+        Returns True for EOF; raises for an error packet; False otherwise
+        (a row whose first column has an 8-byte length header).
+        """
+        if view[0] == 0xFF:
+            if self.unbuffered_active:
+                self.unbuffered_active = False
+            MysqlPacket(bytes(view), self.connection.encoding).raise_for_error()
+        if len(view) < 9:
+            return self._check_packet_is_eof(
+                MysqlPacket(bytes(view), self.connection.encoding)
+            )
+        return False
+
     def _read_rowdata_packet(self):
         """Read a rowdata packet for each data row in the result set."""
         rows = []
+        conn = self.connection
+        read_view = conn._read_packet_view
+        read_row = self._read_row_from_view
+        read_batch = conn._read_row_batch
+        decode_row = self._decode_row
         while True:
-            packet = self.connection._read_packet()
-            if self._check_packet_is_eof(packet):
+            # Decode everything already buffered, then block for the next packet
+            if decode_row is not None:
+                read_batch(decode_row, rows)
+            view = read_view()
+            if view[0] >= 0xFE and self._check_view_is_eof_or_error(view):
                 self.connection = None  # release reference to kill cyclic reference.
                 break
-            rows.append(self._read_row_from_packet(packet))
+            rows.append(read_row(view))
 
         self.affected_rows = len(rows)
         self.rows = tuple(rows)
 
     def _read_row_from_packet(self, packet):
+        return self._read_row_from_view(memoryview(packet.get_all_data()))
+
+    def _read_row_from_view(self, view):
+        """Decode one text-protocol row straight from a packet memoryview."""
+        if self._decode_row is not None:
+            return self._decode_row(bytes(view), 0, len(view))
         row = []
+        pos = 0
+        end = len(view)
         for encoding, converter in self.converters:
-            try:
-                data = packet.read_length_coded_string()
-            except IndexError:
+            if pos >= end:
                 # No more columns in this row
                 # See https://github.com/PyMySQL/PyMySQL/pull/434
                 break
-            if data is not None:
-                if encoding is not None:
-                    data = data.decode(encoding)
-                if DEBUG:
-                    print("DEBUG: DATA = ", data)
-                if converter is not None:
-                    data = converter(data)
+            length = view[pos]
+            pos += 1
+            if length == NULL_COLUMN:
+                row.append(None)
+                continue
+            if length > NULL_COLUMN:
+                if length == UNSIGNED_SHORT_COLUMN:
+                    size = 2
+                elif length == UNSIGNED_INT24_COLUMN:
+                    size = 3
+                else:
+                    size = 8
+                length = int.from_bytes(view[pos : pos + size], "little")
+                pos += size
+            data = view[pos : pos + length]
+            pos += length
+            if encoding is not None:
+                data = str(data, encoding)
+            else:
+                data = bytes(data)
+            if DEBUG:
+                print("DEBUG: DATA = ", data)
+            if converter is not None:
+                data = converter(data)
             row.append(data)
         return tuple(row)
 
@@ -1398,6 +1868,11 @@ class MySQLResult:
         eof_packet = self.connection._read_packet()
         assert eof_packet.is_eof_packet(), "Protocol error, expecting EOF"
         self.description = tuple(description)
+        if self.binary:
+            self._decode_row = compile_binary_row_decoder(self.fields, self.converters)
+        else:
+            # Specialized decoder for this schema; the generic loop keeps DEBUG output
+            self._decode_row = None if DEBUG else compile_row_decoder(self.converters)
 
 
 class LoadLocalFile:
@@ -1411,8 +1886,16 @@ class LoadLocalFile:
             raise err.InterfaceError(0, "")
         conn: Connection = self.connection
 
+        stream = conn._local_streams.get(self.filename.decode(conn.encoding, "replace"))
         try:
-            with open(self.filename, "rb") as open_file:
+            if stream is None and (conn._local_streams or not conn._local_files):
+                # The file name comes from the server: while a stream is being
+                # loaded, or in "streams" mode, nothing else may be read.
+                raise err.OperationalError(
+                    CR.CR_LOAD_DATA_LOCAL_INFILE_REJECTED,
+                    f"LOAD DATA LOCAL INFILE file request rejected: '{self.filename}'",
+                )
+            with stream or open(self.filename, "rb") as open_file:
                 packet_size = min(
                     conn.max_allowed_packet, 16 * 1024
                 )  # 16KB is efficient enough
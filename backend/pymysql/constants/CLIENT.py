@@ -36,3 +36,6 @@ CAPABILITIES = (
 HANDLE_EXPIRED_PASSWORDS = 1 << 22
 SESSION_TRACK = 1 << 23
 DEPRECATE_EOF = 1 << 24
+
+# MySQL 8.0.18+: zstd compressed protocol, level sent after connect attrs
+ZSTD_COMPRESSION_ALGORITHM = 1 << 26
@@ -142,6 +142,56 @@ def Decimal2Literal(o, d):
     return format(o, "f")
 
 
+def _escape_float_column(values):
+    literals = []
+    append = literals.append
+    for value in values:
+        if value is None:
+            append("NULL")
+            continue
+        s = repr(value)
+        if s in ("inf", "-inf", "nan"):
+            raise ProgrammingError("%s can not be used with MySQL" % s)
+        append(s if "e" in s else s + "e0")
+    return literals
+
+
+def escape_column(values, charset, mapping=None, string_escape=None):
+    """Escape a column of values to SQL literals in one pass.
+
+    The column's type is checked once: all-int, all-float, all-bool and
+    all-str columns (``None`` allowed anywhere) skip the per-value encoder
+    lookup. Strings are escaped with *string_escape* (default
+    :func:`escape_string`).
+
+    Returns None for mixed columns, other types, or types with a custom
+    encoder in *mapping*; escape those one value at a time.
+    """
+    if mapping is None:
+        mapping = encoders
+    types = set(map(type, values))
+    types.discard(type(None))
+    if not types:
+        return ["NULL"] * len(values)
+    if len(types) != 1:
+        return None
+    (kind,) = types
+    if kind not in _column_encoders or mapping.get(kind) is not encoders[kind]:
+        return None
+    if kind is int:
+        return ["NULL" if value is None else str(value) for value in values]
+    if kind is float:
+        return _escape_float_column(values)
+    if kind is bool:
+        return ["NULL" if value is None else "1" if value else "0" for value in values]
+    if string_escape is None:
+        string_escape = escape_string
+    return [
+        "NULL" if value is None else "'" + string_escape(value) + "'"
+        for value in values
+    ]
+
+
 def _convert_second_fraction(s):
     if not s:
         return 0
@@ -360,6 +410,9 @@ decoders = {
 
 
 # for MySQLdb compatibility
+#: Types :func:`escape_column` formats without per-value dispatch.
+_column_encoders = (bool, int, float, str)
+
 conversions = encoders.copy()
 conversions.update(decoders)
 Thing2Literal = escape_str
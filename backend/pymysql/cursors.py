@@ -1,6 +1,11 @@
+from collections import deque
 import re
 import warnings
 from . import err
+from .columnar import ColumnBuilder
+from .constants import ER
+from .prepared import to_qmark
+from .records import record_class
 
 
 #: Regular expression for :meth:`Cursor.executemany`.
@@ -107,6 +112,23 @@ class Cursor:
             # Worst case it will throw a Value error
             return conn.escape(args)
 
+    def _escape_many(self, args, conn):
+        """Escape the rows of executemany() parameters.
+
+        A list or tuple of equal-length sequences is escaped a column at a
+        time with :meth:`Connection.escape_column`, so each column's type is
+        checked once. Other rows are escaped one at a time.
+        """
+        if isinstance(args, (tuple, list)) and isinstance(args[0], (tuple, list)):
+            width = len(args[0])
+            if width and all(
+                isinstance(row, (tuple, list)) and len(row) == width for row in args
+            ):
+                columns = [conn.escape_column(column) for column in zip(*args)]
+                return zip(*columns)
+        escape = self._escape_args
+        return (escape(arg, conn) for arg in args)
+
     def mogrify(self, query, args=None):
         """
         Returns the exact string that would be sent to the database by calling the
@@ -195,20 +217,19 @@ class Cursor:
         self, prefix, values, postfix, args, max_stmt_length, encoding
     ):
         conn = self._get_db()
-        escape = self._escape_args
         if isinstance(prefix, str):
             prefix = prefix.encode(encoding)
         if isinstance(postfix, str):
             postfix = postfix.encode(encoding)
         sql = bytearray(prefix)
-        args = iter(args)
-        v = values % escape(next(args), conn)
+        args = iter(self._escape_many(args, conn))
+        v = values % next(args)
         if isinstance(v, str):
             v = v.encode(encoding, "surrogateescape")
         sql += v
         rows = 0
         for arg in args:
-            v = values % escape(arg, conn)
+            v = values % arg
             if isinstance(v, str):
                 v = v.encode(encoding, "surrogateescape")
             if len(sql) + len(v) + len(postfix) + 1 > max_stmt_length:
@@ -323,6 +344,22 @@ class Cursor:
         self._do_get_result()
         return self.rowcount
 
+    def _prepared_query(self, statement, params):
+        conn = self._get_db()
+        self._clear_result()
+        conn.execute_prepared(statement, params)
+        self._do_get_result()
+        return self.rowcount
+
+    def _cached_query(self, sql, binary=False, params=None):
+        """Load the connection's query cache entry for ``sql``, if any."""
+        conn = self._get_db()
+        if not conn._cached_query(sql, binary, params):
+            return False
+        self._clear_result()
+        self._do_get_result()
+        return True
+
     def _clear_result(self):
         self.rownumber = 0
         self._result = None
@@ -406,6 +443,87 @@ class DictCursor(DictCursorMixin, Cursor):
     """A cursor which returns results as a dictionary"""
 
 
+class PreparedCursorMixin:
+    """
+    Runs parameterized queries as server-side prepared statements.
+
+    ``%s`` / ``%(name)s`` placeholders are rewritten to ``?`` markers, the
+    statement is prepared once per connection (see
+    :meth:`Connection.prepare`) and parameters and rows travel in the binary
+    protocol, so neither side parses or escapes values as text. Queries
+    without args, queries with a literal ``?`` or with placeholders inside
+    quotes or comments (see :func:`pymysql.prepared.to_qmark`), and
+    statements the server can't prepare use the text protocol as usual.
+    """
+
+    def execute(self, query, args=None):
+        if args is None:
+            return super().execute(query)
+
+        while self.nextset():
+            pass
+
+        rewritten = to_qmark(query, args)
+        if rewritten is None:
+            return super().execute(query, args)
+        sql, params = rewritten
+
+        conn = self._get_db()
+        # Keyed on the statement and parameters as they are; nothing is escaped
+        if conn.query_cache is not None and self._cached_query(sql, True, params):
+            self._executed = query
+            return self.rowcount
+
+        try:
+            statement = conn.prepare(sql)
+        except err.MySQLError as e:
+            if e.args[0] != ER.UNSUPPORTED_PS:
+                raise
+            return super().execute(query, args)
+
+        result = self._prepared_query(statement, params)
+        if conn.query_cache is not None:
+            conn._cache_result(sql, True, params)
+        self._executed = query
+        return result
+
+
+class RecordCursorMixin:
+    _record = None
+
+    def _do_get_result(self):
+        super()._do_get_result()
+        self._record = None
+        if self.description:
+            fields = []
+            for f in self._result.fields:
+                name = f.name
+                if name in fields:
+                    name = f.table_name + "." + name
+                fields.append(name)
+            self._record = record_class(fields)
+
+        if self._record is not None and self._rows:
+            new, record = tuple.__new__, self._record
+            self._rows = [new(record, r) for r in self._rows]
+
+    def _conv_row(self, row):
+        if row is None:
+            return None
+        return tuple.__new__(self._record, row)
+
+
+class RecordCursor(RecordCursorMixin, Cursor):
+    """
+    A cursor which returns results as compact records.
+
+    Each row is a tuple subclass generated per result schema, accessible by
+    position, attribute or column name (``row['col']``) like DictCursor rows,
+    at a fraction of the memory of a dict per row.
+    See :class:`pymysql.records.Record`.
+    """
+
+
 class SSCursor(Cursor):
     """
     Unbuffered Cursor, mainly useful for queries that return a lot of data,
@@ -420,11 +538,27 @@ class SSCursor(Cursor):
     returning the total number of rows, so the only way to tell how many rows
     there are is to iterate over every row returned. Also, it currently isn't
     possible to scroll backwards, as only the current row is held in memory.
+
+    Setting :attr:`prefetch_size` makes the cursor read ahead: rows are
+    decoded in batches of that size from the receive buffer and handed out
+    from a small queue, so memory stays bounded by the batch while the
+    per-row packet and call overhead is amortized.
     """
 
+    #: Rows read and decoded per batch; 0 reads one row at a time.
+    prefetch_size = 0
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._ahead = deque()
+
     def _conv_row(self, row):
         return row
 
+    def _clear_result(self):
+        super()._clear_result()
+        self._ahead.clear()
+
     def close(self):
         conn = self.connection
         if conn is None:
@@ -448,13 +582,43 @@ class SSCursor(Cursor):
         self._do_get_result()
         return self.rowcount
 
+    def _prepared_query(self, statement, params):
+        conn = self._get_db()
+        self._clear_result()
+        conn.execute_prepared(statement, params, unbuffered=True)
+        self._do_get_result()
+        return self.rowcount
+
+    def _cached_query(self, sql, binary=False, params=None):
+        return False
+
     def nextset(self):
         return self._nextset(unbuffered=True)
 
     def read_next(self):
         """Read next row."""
+        if self.prefetch_size > 0:
+            ahead = self._ahead
+            if not ahead:
+                self._read_ahead()
+            return ahead.popleft() if ahead else None
         return self._conv_row(self._result._read_rowdata_packet_unbuffered())
 
+    def _read_ahead(self):
+        result = self._result
+        if result is None:
+            return
+        decode_row = result._decode_row
+        if decode_row is None:
+            # DEBUG decoding goes through the per-row path
+            row = result._read_rowdata_packet_unbuffered()
+            if row is not None:
+                self._ahead.append(self._conv_row(row))
+            return
+        rows = []
+        result._read_rowdata_unbuffered_batch(decode_row, rows, self.prefetch_size)
+        self._ahead.extend(map(self._conv_row, rows))
+
     def fetchone(self):
         """Fetch next row."""
         self._check_executed()
@@ -529,3 +693,74 @@ class SSCursor(Cursor):
 
 class SSDictCursor(DictCursorMixin, SSCursor):
     """An unbuffered cursor, which returns results as a dictionary"""
+
+
+class SSRecordCursor(RecordCursorMixin, SSCursor):
+    """An unbuffered cursor, which returns results as compact records"""
+
+
+class PreparedCursor(PreparedCursorMixin, Cursor):
+    """A cursor which executes parameterized queries as prepared statements"""
+
+
+class PreparedRecordCursor(PreparedCursorMixin, RecordCursorMixin, Cursor):
+    """A prepared-statement cursor which returns results as compact records"""
+
+
+class SSColumnarCursor(SSCursor):
+    """
+    Unbuffered cursor that returns result sets as named columns.
+
+    Rows are streamed from the server in batches and decoded straight into
+    typed column buffers (int64 / uint64 / float64 / categorical codes /
+    objects)
+    with NULL masks, so no per-row tuple or dict is created. Columns are
+    NumPy arrays when NumPy is installed. See :class:`pymysql.columnar.Column`.
+    """
+
+    #: Rows decoded per socket batch.
+    batch_size = 4096
+    #: Store text columns as category codes instead of Python strings.
+    categorical = True
+    #: Columns are read in their own batches; see :meth:`fetch_columns`.
+    prefetch_size = 0
+
+    def _column_builder(self):
+        result = self._result
+        if result is None or not result.description:
+            return None
+        return ColumnBuilder(result.fields, result.converters, self.categorical)
+
+    def _read_columns(self, builder, limit):
+        result = self._result
+        count = 0
+        while count < limit:
+            read = result._read_rowdata_unbuffered_batch(
+                builder.decode_into, builder.sink, min(self.batch_size, limit - count)
+            )
+            if not read:
+                self.warning_count = result.warning_count
+                break
+            count += read
+        self.rownumber += count
+        return count
+
+    def fetch_columns(self):
+        """Fetch all remaining rows as {name: Column}."""
+        self._check_executed()
+        builder = self._column_builder()
+        if builder is None:
+            return {}
+        self._read_columns(builder, float("inf"))
+        return builder.build()
+
+    def iter_column_batches(self, size=None):
+        """Yield {name: Column} chunks of at most ``size`` rows (bounded memory)."""
+        self._check_executed()
+        builder = self._column_builder()
+        if builder is None:
+            return
+        size = size or self.batch_size
+        while self._read_columns(builder, size):
+            yield builder.build()
+            builder.reset()
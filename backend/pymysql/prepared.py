@@ -0,0 +1,200 @@
+"""
+Server-side prepared statements (binary protocol).
+"""
+import datetime
+import re
+import struct
+
+from . import err
+from .constants import FIELD_TYPE
+
+
+#: ``%s`` / ``%(name)s`` placeholders (and ``%%`` escapes) in DB-API queries.
+RE_PLACEHOLDER = re.compile(r"%(?:\((\w+)\))?s|%%")
+
+#: Quoted strings / identifiers and comments, where placeholders are not markers.
+RE_QUOTED = re.compile(
+    r"'(?:[^'\\]|\\.)*'"
+    r'|"(?:[^"\\]|\\.)*"'
+    r"|`[^`]*`"
+    r"|/\*.*?\*/"
+    r"|(?:#|--(?=\s))[^\n]*",
+    re.DOTALL,
+)
+
+_placeholder_cache = {}
+_CACHE_LIMIT = 256
+
+_UNSIGNED = 0x80
+
+
+class PreparedStatement:
+    """A statement prepared on one connection, identified by ``statement_id``."""
+
+    __slots__ = ("sql", "statement_id", "param_count", "column_count")
+
+    def __init__(self, sql, statement_id, param_count, column_count):
+        self.sql = sql
+        self.statement_id = statement_id
+        self.param_count = param_count
+        self.column_count = column_count
+
+    def __repr__(self):
+        return f"<PreparedStatement id={self.statement_id} params={self.param_count}>"
+
+    def execute_payload(self, args, encoding):
+        """Build the COM_STMT_EXECUTE payload (without the command byte)."""
+        if len(args) != self.param_count:
+            raise err.ProgrammingError(
+                f"Statement takes {self.param_count} parameters, {len(args)} given"
+            )
+        # flags=CURSOR_TYPE_NO_CURSOR, iteration_count=1
+        payload = bytearray(struct.pack("<IBI", self.statement_id, 0, 1))
+        if self.param_count:
+            payload += encode_params(args, encoding)
+        return bytes(payload)
+
+
+def to_qmark(query, args):
+    """Rewrite a ``%s`` / ``%(name)s`` query to ``?`` markers.
+
+    Returns ``(sql, params)`` with ``params`` as a tuple in marker order, or
+    None when the query can't be rewritten faithfully: it already contains
+    a ``?`` (which the server would take for a marker) or a placeholder
+    inside a quoted literal or comment. Such queries use the text protocol.
+    The rewrite is cached per query string.
+    """
+    try:
+        sql, names = _placeholder_cache[query]
+    except KeyError:
+        sql, names = _rewrite(query)
+        if len(_placeholder_cache) >= _CACHE_LIMIT:
+            _placeholder_cache.clear()
+        _placeholder_cache[query] = sql, names
+
+    if sql is None:
+        return None
+    if args is None:
+        return sql, ()
+    if isinstance(args, dict):
+        try:
+            return sql, tuple(args[name] for name in names)
+        except KeyError as e:
+            raise err.ProgrammingError(f"Missing parameter {e}") from None
+    if isinstance(args, (tuple, list)):
+        return sql, tuple(args)
+    return sql, (args,)
+
+
+def _rewrite(query):
+    if "?" in query:
+        return None, None
+    names = []
+
+    def replace(match):
+        if match.group(0) == "%%":
+            return "%"
+        names.append(match.group(1))
+        return "?"
+
+    parts = []
+    pos = 0
+    for quoted in RE_QUOTED.finditer(query):
+        parts.append(RE_PLACEHOLDER.sub(replace, query[pos : quoted.start()]))
+        literal = quoted.group(0)
+        if any(m.group(0) != "%%" for m in RE_PLACEHOLDER.finditer(literal)):
+            return None, None
+        # The text protocol's ``query % args`` unescapes %% everywhere
+        parts.append(literal.replace("%%", "%"))
+        pos = quoted.end()
+    parts.append(RE_PLACEHOLDER.sub(replace, query[pos:]))
+    return "".join(parts), tuple(names)
+
+
+def _lenenc_bytes(value):
+    length = len(value)
+    if length < 251:
+        return bytes((length,)) + value
+    if length < 1 << 16:
+        return b"\xfc" + struct.pack("<H", length) + value
+    if length < 1 << 24:
+        return b"\xfd" + struct.pack("<I", length)[:3] + value
+    return b"\xfe" + struct.pack("<Q", length) + value
+
+
+def _encode_timedelta(value):
+    negative = value < datetime.timedelta(0)
+    if negative:
+        value = -value
+    seconds = value.seconds
+    return struct.pack(
+        "<BBIBBBI",
+        12,
+        negative,
+        value.days,
+        seconds // 3600,
+        seconds // 60 % 60,
+        seconds % 60,
+        value.microseconds,
+    )
+
+
+def encode_params(args, encoding):
+    """Encode parameters as null bitmap + new-params-bound flag + types + values."""
+    nulls = bytearray((len(args) + 7) // 8)
+    types = bytearray()
+    values = bytearray()
+    for index, arg in enumerate(args):
+        if arg is None:
+            nulls[index >> 3] |= 1 << (index & 7)
+            types += bytes((FIELD_TYPE.NULL, 0))
+        elif isinstance(arg, bool):
+            types += bytes((FIELD_TYPE.TINY, 0))
+            values += struct.pack("<b", arg)
+        elif isinstance(arg, int) and -(1 << 63) <= arg < 1 << 64:
+            if arg < 1 << 63:
+                types += bytes((FIELD_TYPE.LONGLONG, 0))
+                values += struct.pack("<q", arg)
+            else:
+                types += bytes((FIELD_TYPE.LONGLONG, _UNSIGNED))
+                values += struct.pack("<Q", arg)
+        elif isinstance(arg, float):
+            types += bytes((FIELD_TYPE.DOUBLE, 0))
+            values += struct.pack("<d", arg)
+        elif isinstance(arg, (bytes, bytearray, memoryview)):
+            types += bytes((FIELD_TYPE.BLOB, 0))
+            values += _lenenc_bytes(bytes(arg))
+        elif isinstance(arg, datetime.datetime):
+            types += bytes((FIELD_TYPE.DATETIME, 0))
+            values += struct.pack(
+                "<BHBBBBBI",
+                11,
+                arg.year,
+                arg.month,
+                arg.day,
+                arg.hour,
+                arg.minute,
+                arg.second,
+                arg.microsecond,
+            )
+        elif isinstance(arg, datetime.date):
+            types += bytes((FIELD_TYPE.DATE, 0))
+            values += struct.pack("<BHBB", 4, arg.year, arg.month, arg.day)
+        elif isinstance(arg, datetime.timedelta):
+            types += bytes((FIELD_TYPE.TIME, 0))
+            values += _encode_timedelta(arg)
+        elif isinstance(arg, datetime.time):
+            types += bytes((FIELD_TYPE.TIME, 0))
+            values += _encode_timedelta(
+                datetime.timedelta(
+                    hours=arg.hour,
+                    minutes=arg.minute,
+                    seconds=arg.second,
+                    microseconds=arg.microsecond,
+                )
+            )
+        else:
+            # str, Decimal, huge ints, ...: sent as text, converted by the server
+            types += bytes((FIELD_TYPE.VAR_STRING, 0))
+            values += _lenenc_bytes(str(arg).encode(encoding))
+    return bytes(nulls) + b"\x01" + bytes(types) + bytes(values)
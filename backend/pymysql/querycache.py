@@ -0,0 +1,114 @@
+"""
+Result cache for read-only queries, shared between connections.
+"""
+from collections import OrderedDict
+import re
+import threading
+import time
+
+
+#: Statements whose results may be cached: SELECT / WITH, not locking reads.
+RE_CACHEABLE = re.compile(rb"\s*\(*\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+RE_LOCKING = re.compile(rb"\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b", re.I)
+
+
+def is_cacheable(sql):
+    """Whether ``sql`` (bytes) is a plain read the cache may serve."""
+    return RE_CACHEABLE.match(sql) is not None and RE_LOCKING.search(sql) is None
+
+
+class QueryCache:
+    """
+    LRU cache of buffered query results with a time-to-live.
+
+    Pass one instance as ``query_cache`` to any number of connections (it
+    is thread-safe); SELECT results are then keyed on the server, database,
+    protocol (text, or binary for prepared statements) and exact SQL bytes
+    (the output of ``Cursor.mogrify``, or the ``?`` statement and its
+    parameters for prepared statements), and a repeated query is answered
+    without a round trip. Connections sharing a
+    cache should use the same converters.
+
+    Nothing is invalidated automatically: call :meth:`invalidate` after
+    writing to a table, or :meth:`clear`.
+
+    :param maxsize: Most results kept; the least recently used goes first.
+    :param ttl: Seconds a result stays valid, or None for no expiry.
+    """
+
+    def __init__(self, maxsize=256, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached result for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, result = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        """Store a fully read result; results still streaming, with more
+        result sets pending or with warnings are not stored."""
+        if (
+            result is None
+            or result.rows is None
+            or result.unbuffered_active
+            or result.has_next
+            or result.warning_count
+        ):
+            return
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = expires, result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table):
+        """Drop results of queries whose SQL mentions ``table``; returns how many."""
+        name = table.encode("utf-8") if isinstance(table, str) else table
+        with self._lock:
+            stale = [key for key in self._entries if name in key[4]]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters since creation, plus the current size and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
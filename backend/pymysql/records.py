@@ -0,0 +1,78 @@
+"""
+Lightweight per-schema row records for :class:`~pymysql.cursors.RecordCursor`.
+"""
+from operator import itemgetter
+
+
+_cache = {}
+_CACHE_LIMIT = 256
+
+
+class Record(tuple):
+    """A result row: a tuple with named access.
+
+    Rows support positional access (``row[0]``), attribute access for
+    column names that are identifiers (``row.occupation``) and dict-style
+    access by column name (``row['Survey month']``), so code written for
+    :class:`~pymysql.cursors.DictCursor` keeps working. Only the values are
+    stored per row; names live on the class.
+    """
+
+    __slots__ = ()
+
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __repr__(self):
+        items = ", ".join(f"{name!r}: {value!r}" for name, value in self.items())
+        return f"{self.__class__.__name__}({{{items}}})"
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        if index is None:
+            return default
+        return tuple.__getitem__(self, index)
+
+    def keys(self):
+        return list(self._fields)
+
+    def values(self):
+        return list(self)
+
+    def items(self):
+        return list(zip(self._fields, self))
+
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+
+def record_class(names):
+    """Return the Record subclass for a sequence of column names (cached)."""
+    names = tuple(names)
+    try:
+        return _cache[names]
+    except KeyError:
+        pass
+
+    namespace = {
+        "__slots__": (),
+        "_fields": names,
+        "_index": {name: index for index, name in enumerate(names)},
+    }
+    for index, name in enumerate(names):
+        if name.isidentifier() and not name.startswith("_") and not hasattr(Record, name):
+            namespace[name] = property(itemgetter(index))
+    cls = type("Record", (Record,), namespace)
+
+    if len(_cache) >= _CACHE_LIMIT:
+        _cache.clear()
+    _cache[names] = cls
+    return cls
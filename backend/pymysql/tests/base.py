@@ -0,0 +1,24 @@
+import unittest
+
+from .fakeserver import FakeServer
+
+
+class FakeServerTestCase(unittest.TestCase):
+    """Test case connecting to :class:`~pymysql.tests.fakeserver.FakeServer` instances."""
+
+    def connect(self, server=None, **kwargs):
+        """Return ``(server, connection)``; both are closed after the test.
+
+        Closing the server re-raises any protocol error it detected.
+        """
+        if server is None:
+            server = FakeServer()
+        self.addCleanup(server.close)
+        conn = server.connect(**kwargs)
+        self.addCleanup(self._close, conn)
+        return server, conn
+
+    @staticmethod
+    def _close(conn):
+        if conn.open:
+            conn.close()
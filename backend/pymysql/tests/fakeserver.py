@@ -0,0 +1,651 @@
+"""
+A scripted MySQL server on one end of a socket pair.
+
+It speaks enough of the client/server protocol (handshake, text and binary
+result sets, prepared statements, LOAD DATA LOCAL and the zlib / zstd
+compressed protocol) to drive :class:`pymysql.connections.Connection`
+through synthetic packets without a real server. Responses are registered
+per SQL text; every packet and compressed frame the client sends is
+recorded and its sequence number checked.
+"""
+import datetime
+import re
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from pymysql.constants import CLIENT, COMMAND, FIELD_TYPE, FLAG
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+#: Capabilities offered by default; tests add COMPRESS / ZSTD as needed.
+DEFAULT_CAPABILITIES = (
+    CLIENT.CAPABILITIES
+    | CLIENT.CONNECT_WITH_DB
+    | CLIENT.LOCAL_FILES
+    | CLIENT.MULTI_STATEMENTS
+    | CLIENT.PS_MULTI_RESULTS
+)
+
+UTF8MB4_GENERAL_CI = 45
+BINARY_CHARSET = 63
+
+MAX_PACKET_LEN = 2**24 - 1
+
+#: Server payloads shorter than this go out uncompressed, like mysqld.
+MIN_COMPRESS_LENGTH = 50
+
+_TEXT_TYPES = {
+    FIELD_TYPE.VARCHAR,
+    FIELD_TYPE.VAR_STRING,
+    FIELD_TYPE.STRING,
+    FIELD_TYPE.ENUM,
+    FIELD_TYPE.SET,
+    FIELD_TYPE.JSON,
+    FIELD_TYPE.TINY_BLOB,
+    FIELD_TYPE.MEDIUM_BLOB,
+    FIELD_TYPE.LONG_BLOB,
+    FIELD_TYPE.BLOB,
+}
+
+_BINARY_FIXED = {
+    FIELD_TYPE.TINY: "b",
+    FIELD_TYPE.SHORT: "h",
+    FIELD_TYPE.YEAR: "h",
+    FIELD_TYPE.INT24: "i",
+    FIELD_TYPE.LONG: "i",
+    FIELD_TYPE.LONGLONG: "q",
+    FIELD_TYPE.FLOAT: "f",
+    FIELD_TYPE.DOUBLE: "d",
+}
+
+
+def lenenc_int(i):
+    if i < 251:
+        return bytes((i,))
+    if i < 1 << 16:
+        return b"\xfc" + struct.pack("<H", i)
+    if i < 1 << 24:
+        return b"\xfd" + struct.pack("<I", i)[:3]
+    return b"\xfe" + struct.pack("<Q", i)
+
+
+def lenenc_str(value):
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return lenenc_int(len(value)) + value
+
+
+def ok_packet(affected_rows=0, insert_id=0, status=0, warnings=0, message=b""):
+    return (
+        b"\x00"
+        + lenenc_int(affected_rows)
+        + lenenc_int(insert_id)
+        + struct.pack("<HH", status, warnings)
+        + message
+    )
+
+
+def eof_packet(warnings=0, status=0):
+    return b"\xfe" + struct.pack("<HH", warnings, status)
+
+
+def error_packet(errno, message, state=b"HY000"):
+    if isinstance(message, str):
+        message = message.encode("utf-8")
+    return b"\xff" + struct.pack("<H", errno) + b"#" + state + message
+
+
+class Field:
+    """A result column as described to the client."""
+
+    def __init__(
+        self, name, type_code, charsetnr=None, flags=0, length=255, decimals=0
+    ):
+        self.name = name
+        self.type_code = type_code
+        if charsetnr is None:
+            text = type_code in _TEXT_TYPES
+            charsetnr = UTF8MB4_GENERAL_CI if text else BINARY_CHARSET
+        self.charsetnr = charsetnr
+        self.flags = flags
+        self.length = length
+        self.decimals = decimals
+
+    def packet(self, table="t"):
+        return (
+            lenenc_str(b"def")
+            + lenenc_str(b"test")
+            + lenenc_str(table)
+            + lenenc_str(table)
+            + lenenc_str(self.name)
+            + lenenc_str(self.name)
+            + b"\x0c"
+            + struct.pack(
+                "<HIBHB",
+                self.charsetnr,
+                self.length,
+                self.type_code,
+                self.flags,
+                self.decimals,
+            )
+            + b"\x00\x00"
+        )
+
+
+def text_row(values):
+    """A text-protocol row: NULL is 0xFB, everything else a length-encoded string."""
+    row = bytearray()
+    for value in values:
+        if value is None:
+            row += b"\xfb"
+        else:
+            if not isinstance(value, (bytes, str)):
+                value = str(value)
+            row += lenenc_str(value)
+    return bytes(row)
+
+
+def _binary_temporal(type_code, value):
+    if type_code == FIELD_TYPE.TIME:
+        negative = value < datetime.timedelta(0)
+        if negative:
+            value = -value
+        seconds = value.seconds
+        return struct.pack(
+            "<BBIBBBI",
+            12,
+            negative,
+            value.days,
+            seconds // 3600,
+            seconds // 60 % 60,
+            seconds % 60,
+            value.microseconds,
+        )
+    if type_code == FIELD_TYPE.DATE:
+        return struct.pack("<BHBB", 4, value.year, value.month, value.day)
+    return struct.pack(
+        "<BHBBBBBI",
+        11,
+        value.year,
+        value.month,
+        value.day,
+        value.hour,
+        value.minute,
+        value.second,
+        value.microsecond,
+    )
+
+
+def binary_row(fields, values):
+    """A binary-protocol row (prepared statement results) for ``fields``."""
+    nulls = bytearray((len(fields) + 7 + 2) // 8)
+    body = bytearray()
+    for index, (field, value) in enumerate(zip(fields, values)):
+        if value is None:
+            bit = index + 2
+            nulls[bit >> 3] |= 1 << (bit & 7)
+            continue
+        type_code = field.type_code
+        if type_code in _BINARY_FIXED:
+            fmt = _BINARY_FIXED[type_code]
+            if field.flags & FLAG.UNSIGNED and fmt in "bhiq":
+                fmt = fmt.upper()
+            body += struct.pack("<" + fmt, value)
+        elif type_code in (
+            FIELD_TYPE.DATE,
+            FIELD_TYPE.DATETIME,
+            FIELD_TYPE.TIMESTAMP,
+            FIELD_TYPE.TIME,
+        ):
+            body += _binary_temporal(type_code, value)
+        else:
+            if not isinstance(value, (bytes, str)):
+                value = str(value)
+            body += lenenc_str(value)
+    return b"\x00" + bytes(nulls) + bytes(body)
+
+
+def result_set(fields, rows, binary=False, status=0, warnings=0):
+    """Payloads of a complete result set: column count, definitions, rows, EOF."""
+    packets = [lenenc_int(len(fields))]
+    packets += [field.packet() for field in fields]
+    packets.append(eof_packet())
+    for row in rows:
+        packets.append(binary_row(fields, row) if binary else text_row(row))
+    packets.append(eof_packet(warnings, status))
+    return packets
+
+
+def decode_params(payload, count):
+    """Decode COM_STMT_EXECUTE parameters (the types pymysql sends)."""
+    pos = 9  # statement id, flags, iteration count
+    nulls = payload[pos : pos + (count + 7) // 8]
+    pos += (count + 7) // 8 + 1
+    types = [payload[pos + 2 * i : pos + 2 * i + 2] for i in range(count)]
+    pos += 2 * count
+    params = []
+    for index, (type_code, flags) in enumerate(types):
+        if nulls[index >> 3] >> (index & 7) & 1:
+            params.append(None)
+            continue
+        if type_code == FIELD_TYPE.LONGLONG:
+            fmt = "<Q" if flags & 0x80 else "<q"
+            params.append(struct.unpack_from(fmt, payload, pos)[0])
+            pos += 8
+        elif type_code == FIELD_TYPE.DOUBLE:
+            params.append(struct.unpack_from("<d", payload, pos)[0])
+            pos += 8
+        elif type_code == FIELD_TYPE.TINY:
+            params.append(struct.unpack_from("<b", payload, pos)[0])
+            pos += 1
+        elif type_code in (FIELD_TYPE.DATE, FIELD_TYPE.DATETIME, FIELD_TYPE.TIME):
+            length = payload[pos]
+            params.append(bytes(payload[pos + 1 : pos + 1 + length]))
+            pos += 1 + length
+        else:
+            length = payload[pos]
+            pos += 1
+            if length == 0xFC:
+                length = struct.unpack_from("<H", payload, pos)[0]
+                pos += 2
+            elif length == 0xFD:
+                length = int.from_bytes(payload[pos : pos + 3], "little")
+                pos += 3
+            value = bytes(payload[pos : pos + length])
+            pos += length
+            params.append(value if type_code == FIELD_TYPE.BLOB else value.decode())
+    return params
+
+
+class Statement:
+    def __init__(self, statement_id, sql, param_count, fields, rows):
+        self.statement_id = statement_id
+        self.sql = sql
+        self.param_count = param_count
+        self.fields = fields
+        self.rows = rows
+
+
+class FakeServer:
+    """
+    MySQL server stand-in serving one connection on a socket pair.
+
+    Register responses before connecting: :meth:`on_query` for COM_QUERY
+    and :meth:`add_statement` for prepared statements. Unregistered queries
+    get an OK packet, and LOAD DATA LOCAL statements read the file from the
+    client into :attr:`loads`. :attr:`commands` records every command as
+    ``(command, payload)``, :attr:`client_frames` every compressed frame
+    the client sent as ``(sequence, length, uncompressed_length)``.
+
+    :param capabilities: Capability flags offered in the handshake.
+    :param frame_size: Largest payload the server puts in one compressed
+        frame, so a packet can be spread over several frames.
+    :param chunk_size: Send responses in pieces of this many bytes...
+    :param chunk_delay: ...sleeping this long between them (a slow link).
+    """
+
+    def __init__(
+        self,
+        capabilities=DEFAULT_CAPABILITIES,
+        frame_size=2**24 - 1,
+        chunk_size=None,
+        chunk_delay=0,
+        version="8.0.35-fake",
+    ):
+        self.capabilities = capabilities
+        self.frame_size = frame_size
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.version = version
+        self.results = {}
+        self.prefix_results = []
+        self.statements = {}
+        self._statements_by_sql = {}
+        self.commands = []
+        self.queries = []
+        self.executions = []
+        self.closed_statements = []
+        self.loads = []
+        self.client_frames = []
+        self.server_frames = []
+        self.handshake = None
+        self.codec = None
+        self.error = None
+        self._in = bytearray()
+        self._out = bytearray()
+        self._seq = 0
+        self._frame_seq = 0
+        self.client_sock, self._sock = socket.socketpair()
+        self._thread = None
+
+    # Registration
+
+    def on_query(self, sql, response):
+        """Answer COM_QUERY ``sql`` with a list of payloads, or call
+        ``response(server, sql)`` to run the exchange itself."""
+        self.results[sql] = response
+
+    def on_query_prefix(self, prefix, response):
+        """Like :meth:`on_query`, for every query starting with ``prefix``."""
+        self.prefix_results.append((prefix, response))
+
+    def add_statement(self, sql, fields=(), rows=(), param_count=None):
+        """Make ``sql`` preparable; each execute returns ``rows`` in the binary protocol.
+
+        ``rows`` may be a callable taking the decoded parameters.
+        """
+        if param_count is None:
+            param_count = sql.count("?")
+        statement = Statement(len(self.statements) + 1, sql, param_count, fields, rows)
+        self.statements[statement.statement_id] = statement
+        self._statements_by_sql[sql] = statement
+        return statement
+
+    # Connection
+
+    def connect(self, **kwargs):
+        """Start serving and return a Connection to this server."""
+        from pymysql.connections import Connection
+
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        kwargs.setdefault("user", "test")
+        kwargs.setdefault("password", "secret")
+        kwargs.setdefault("database", "test")
+        conn = Connection(defer_connect=True, **kwargs)
+        conn.connect(sock=self.client_sock)
+        return conn
+
+    def close(self):
+        """Stop serving; re-raises any protocol error the server hit."""
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(5)
+        self._sock.close()
+        self.client_sock.close()
+        if self.error is not None:
+            raise self.error
+
+    # Wire
+
+    def _recv_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return bytes(data)
+
+    def _fill(self, size):
+        """Buffer ``size`` bytes of plain protocol data."""
+        while len(self._in) < size:
+            if self.codec is None:
+                self._in += self._recv_exact(size - len(self._in))
+                continue
+            header = self._recv_exact(7)
+            length = int.from_bytes(header[:3], "little")
+            sequence = header[3]
+            uncompressed = int.from_bytes(header[4:], "little")
+            if sequence != self._frame_seq:
+                raise AssertionError(
+                    f"compressed sequence {sequence}, expected {self._frame_seq}"
+                )
+            self._frame_seq = (sequence + 1) % 256
+            self.client_frames.append((sequence, length, uncompressed))
+            body = self._recv_exact(length)
+            if uncompressed:
+                body = self._decompress(body)
+                if len(body) != uncompressed:
+                    raise AssertionError("uncompressed length mismatch")
+            self._in += body
+
+    def read_packet(self):
+        self._fill(4)
+        length = int.from_bytes(self._in[:3], "little")
+        sequence = self._in[3]
+        if sequence != self._seq:
+            raise AssertionError(f"packet sequence {sequence}, expected {self._seq}")
+        self._fill(4 + length)
+        payload = bytes(self._in[4 : 4 + length])
+        del self._in[: 4 + length]
+        self._seq = (sequence + 1) % 256
+        return payload
+
+    def send(self, *payloads):
+        """Queue packets; they go out on :meth:`flush`.
+
+        Payloads of 16MB or more are split into several packets.
+        """
+        for payload in payloads:
+            while True:
+                chunk = payload[:MAX_PACKET_LEN]
+                payload = payload[MAX_PACKET_LEN:]
+                self._out += struct.pack("<I", len(chunk))[:3]
+                self._out.append(self._seq)
+                self._out += chunk
+                self._seq = (self._seq + 1) % 256
+                if len(chunk) < MAX_PACKET_LEN:
+                    break
+
+    def flush(self):
+        data = bytes(self._out)
+        self._out.clear()
+        if self.codec is not None:
+            data = self._frames(data)
+        if self.chunk_size:
+            for pos in range(0, len(data), self.chunk_size):
+                if pos and self.chunk_delay:
+                    time.sleep(self.chunk_delay)
+                self._sock.sendall(data[pos : pos + self.chunk_size])
+        else:
+            self._sock.sendall(data)
+
+    def _frames(self, data):
+        frames = bytearray()
+        for pos in range(0, len(data), self.frame_size):
+            chunk = data[pos : pos + self.frame_size]
+            body, uncompressed = chunk, 0
+            if len(chunk) >= MIN_COMPRESS_LENGTH:
+                body, uncompressed = self._compress(chunk), len(chunk)
+            self.server_frames.append((self._frame_seq, len(body), uncompressed))
+            frames += struct.pack("<I", len(body))[:3]
+            frames.append(self._frame_seq)
+            frames += struct.pack("<I", uncompressed)[:3]
+            frames += body
+            self._frame_seq = (self._frame_seq + 1) % 256
+        return bytes(frames)
+
+    def _compress(self, data):
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor().compress(data)
+        return zlib.compress(data)
+
+    def _decompress(self, data):
+        if self.codec == "zstd":
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    # Protocol
+
+    def _serve(self):
+        try:
+            self._handshake()
+            while True:
+                # Every command starts both sequences over
+                self._seq = 0
+                self._frame_seq = 0
+                try:
+                    packet = self.read_packet()
+                except EOFError:
+                    return
+                command, payload = packet[0], packet[1:]
+                self.commands.append((command, payload))
+                if command == COMMAND.COM_QUIT:
+                    return
+                self._dispatch(command, payload)
+        except (EOFError, OSError):
+            pass
+        except BaseException as e:
+            self.error = e
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _handshake(self):
+        salt = b"abcdefghijklmnopqrst"
+        caps = self.capabilities | CLIENT.PLUGIN_AUTH | CLIENT.SECURE_CONNECTION
+        greeting = (
+            b"\x0a"
+            + self.version.encode() + b"\x00"
+            + struct.pack("<I", 42)
+            + salt[:8] + b"\x00"
+            + struct.pack("<H", caps & 0xFFFF)
+            + bytes((UTF8MB4_GENERAL_CI,))
+            + struct.pack("<H", 0)
+            + struct.pack("<H", caps >> 16)
+            + bytes((len(salt) + 1,))
+            + b"\x00" * 10
+            + salt[8:] + b"\x00"
+            + b"mysql_native_password\x00"
+        )
+        self.send(greeting)
+        self.flush()
+        response = self.read_packet()
+        self.handshake = self._parse_handshake(response)
+        self.send(ok_packet())
+        self.flush()
+        flags = self.handshake["client_flag"]
+        if flags & CLIENT.ZSTD_COMPRESSION_ALGORITHM:
+            self.codec = "zstd"
+        elif flags & CLIENT.COMPRESS:
+            self.codec = "zlib"
+
+    def _parse_handshake(self, data):
+        client_flag, max_packet, charset = struct.unpack_from("<IIB", data)
+        pos = 32
+        end = data.index(b"\x00", pos)
+        user = data[pos:end].decode()
+        pos = end + 1
+        auth_length = data[pos]
+        pos += 1 + auth_length
+        database = None
+        if client_flag & CLIENT.CONNECT_WITH_DB:
+            end = data.index(b"\x00", pos)
+            database = data[pos:end].decode()
+            pos = end + 1
+        plugin = None
+        if client_flag & CLIENT.PLUGIN_AUTH:
+            end = data.index(b"\x00", pos)
+            plugin = data[pos:end].decode()
+            pos = end + 1
+        if client_flag & CLIENT.CONNECT_ATTRS:
+            pos += 1 + data[pos]
+        zstd_level = None
+        if client_flag & CLIENT.ZSTD_COMPRESSION_ALGORITHM:
+            zstd_level = data[pos]
+            pos += 1
+        if pos != len(data):
+            raise AssertionError(f"{len(data) - pos} unparsed handshake bytes")
+        return {
+            "client_flag": client_flag,
+            "max_packet": max_packet,
+            "charset": charset,
+            "user": user,
+            "database": database,
+            "plugin": plugin,
+            "zstd_level": zstd_level,
+        }
+
+    def _dispatch(self, command, payload):
+        if command == COMMAND.COM_QUERY:
+            sql = payload.decode("utf-8", "surrogateescape")
+            self.queries.append(sql)
+            response = self.results.get(sql)
+            if response is None:
+                for prefix, prefix_response in self.prefix_results:
+                    if sql.startswith(prefix):
+                        response = prefix_response
+                        break
+            if response is None and sql.startswith("LOAD DATA LOCAL INFILE"):
+                self._load_data(sql)
+            elif callable(response):
+                response(self, sql)
+            else:
+                self.send(*(response or [ok_packet()]))
+        elif command == COMMAND.COM_STMT_PREPARE:
+            self._prepare(payload.decode("utf-8"))
+        elif command == COMMAND.COM_STMT_EXECUTE:
+            self._execute(payload)
+        elif command == COMMAND.COM_STMT_CLOSE:
+            self.closed_statements.append(struct.unpack("<I", payload)[0])
+            return  # no response
+        else:
+            self.send(ok_packet())
+        self.flush()
+
+    def _prepare(self, sql):
+        statement = self._statements_by_sql.get(sql)
+        if statement is None:
+            self.send(error_packet(1295, "This command is not supported", b"HY000"))
+            return
+        self.send(
+            b"\x00"
+            + struct.pack(
+                "<IHHxH",
+                statement.statement_id,
+                len(statement.fields),
+                statement.param_count,
+                0,
+            )
+        )
+        if statement.param_count:
+            self.send(*[Field("?", FIELD_TYPE.VAR_STRING).packet()] * statement.param_count)
+            self.send(eof_packet())
+        if statement.fields:
+            self.send(*[field.packet() for field in statement.fields])
+            self.send(eof_packet())
+
+    def _execute(self, payload):
+        (statement_id,) = struct.unpack_from("<I", payload)
+        statement = self.statements[statement_id]
+        params = decode_params(payload, statement.param_count)
+        self.executions.append((statement.sql, params))
+        if not statement.fields:
+            self.send(ok_packet())
+            return
+        rows = statement.rows(params) if callable(statement.rows) else statement.rows
+        self.send(*result_set(statement.fields, rows, binary=True))
+
+    def _load_data(self, sql):
+        filename = re.search(r"INFILE '((?:[^'\\]|\\.)*)'", sql).group(1)
+        data = self.serve_load_local(filename)
+        self.loads.append((filename, data))
+        lines = data.count(b"\n") - (" IGNORE 1 LINES " in sql)
+        self.send(ok_packet(affected_rows=max(lines, 0)))
+
+    def serve_load_local(self, filename):
+        """Ask the client for ``filename`` (LOAD DATA LOCAL); returns the data received.
+
+        The caller sends the final OK or error packet.
+        """
+        self.send(b"\xfb" + filename.encode())
+        self.flush()
+        data = bytearray()
+        while True:
+            packet = self.read_packet()
+            if not packet:
+                break
+            data += packet
+        return bytes(data)
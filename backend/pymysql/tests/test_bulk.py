@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+from pymysql import bulk, err
+from pymysql.constants import CR
+from pymysql.tests.base import FakeServerTestCase
+from pymysql.tests.fakeserver import FakeServer, error_packet, ok_packet
+
+
+def request_file(filename):
+    """A server that answers the query by asking the client for ``filename``."""
+
+    def respond(server, sql):
+        data = server.serve_load_local(filename)
+        server.loads.append((filename, data))
+        server.send(ok_packet())
+
+    return respond
+
+
+class TestLoadLocal(FakeServerTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, b"secret\n")
+        os.close(fd)
+        self.addCleanup(os.unlink, self.path)
+
+    def test_load_columns(self):
+        server, conn = self.connect(local_infile="streams")
+        columns = {"id": [1, 2, None], "name": ["a\tb", None, "c\\d"]}
+        with conn.cursor() as cursor:
+            self.assertEqual(bulk.load_columns(cursor, "t", columns), 3)
+        ((name, data),) = server.loads
+        self.assertTrue(name.startswith("pymysql-stream-"))
+        self.assertEqual(data, b"1\ta\\tb\n2\t\\N\n\\N\tc\\\\d\n")
+        self.assertEqual(conn._local_streams, {})
+
+    def test_load_csv(self):
+        server, conn = self.connect(local_infile="streams")
+        with conn.cursor() as cursor:
+            self.assertEqual(bulk.load_csv(cursor, "t", b"id,name\n1,a\n2,b\n"), 2)
+        ((_, data),) = server.loads
+        self.assertEqual(data, b"id,name\n1,a\n2,b\n")
+        self.assertIn(" IGNORE 1 LINES ", server.queries[-1])
+
+    def test_streams_mode_refuses_paths(self):
+        server = FakeServer()
+        server.on_query("SELECT 1", request_file(self.path))
+        server, conn = self.connect(server, local_infile="streams")
+        with conn.cursor() as cursor:
+            with self.assertRaises(err.OperationalError) as cm:
+                cursor.execute("SELECT 1")
+        self.assertEqual(cm.exception.args[0], CR.CR_LOAD_DATA_LOCAL_INFILE_REJECTED)
+        self.assertEqual(server.loads, [(self.path, b"")])
+        conn.ping(reconnect=False)
+
+    def test_other_file_refused_during_stream_load(self):
+        # The server answers the bulk load with a request for a different file
+        server = FakeServer()
+        server.on_query_prefix("LOAD DATA LOCAL INFILE", request_file(self.path))
+        server, conn = self.connect(server, local_infile=True)
+        with conn.cursor() as cursor:
+            with self.assertRaises(err.OperationalError) as cm:
+                bulk.load_columns(cursor, "t", {"id": [1]})
+        self.assertEqual(cm.exception.args[0], CR.CR_LOAD_DATA_LOCAL_INFILE_REJECTED)
+        self.assertEqual(server.loads, [(self.path, b"")])
+        self.assertEqual(conn._local_streams, {})
+
+    def test_local_infile_reads_paths(self):
+        # local_infile=True keeps upstream behaviour when no stream is registered
+        server = FakeServer()
+        server.on_query("SELECT 1", request_file(self.path))
+        server, conn = self.connect(server, local_infile=True)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertEqual(server.loads, [(self.path, b"secret\n")])
+
+    def test_refused_by_server_falls_back_to_insert(self):
+        server = FakeServer()
+        server.on_query_prefix(
+            "LOAD DATA LOCAL INFILE",
+            [error_packet(3948, "Loading local data is disabled", b"42000")],
+        )
+        server, conn = self.connect(server, local_infile="streams")
+        with conn.cursor() as cursor:
+            self.assertEqual(bulk.load_columns(cursor, "t", {"id": [1, 2]}), 0)
+        self.assertEqual(server.queries[-1], "INSERT INTO `t` (`id`) VALUES (1),(2)")
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            self.connect(local_infile="files")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import datetime
+import decimal
+import math
+import unittest
+from array import array
+from unittest import mock
+
+from pymysql import columnar
+from pymysql.constants import FIELD_TYPE, FLAG
+from pymysql.cursors import SSColumnarCursor
+from pymysql.tests.base import FakeServerTestCase
+from pymysql.tests.fakeserver import FakeServer, Field, result_set
+
+
+FIELDS = [
+    Field("id", FIELD_TYPE.LONGLONG),
+    Field("hourly", FIELD_TYPE.NEWDECIMAL),
+    Field("occupation", FIELD_TYPE.VAR_STRING),
+    Field("day", FIELD_TYPE.DATE),
+    Field("raw", FIELD_TYPE.BLOB, charsetnr=63),
+]
+OCCUPATIONS = ["nurse", "engineer", "teacher"]
+ROWS = [
+    (
+        i,
+        None if i % 7 == 0 else decimal.Decimal(i) / 4,
+        None if i % 11 == 0 else OCCUPATIONS[i % 3],
+        datetime.date(2024, 1, 1 + i % 28),
+        b"r%d" % i,
+    )
+    for i in range(1000)
+]
+SQL = "SELECT * FROM earnings"
+
+
+class TestColumnarCursor(FakeServerTestCase):
+    def execute(self, rows=ROWS, **attrs):
+        server = FakeServer()
+        server.on_query(SQL, result_set(FIELDS, rows))
+        server, conn = self.connect(server)
+        cursor = conn.cursor(SSColumnarCursor)
+        self.addCleanup(cursor.close)
+        for name, value in attrs.items():
+            setattr(cursor, name, value)
+        cursor.execute(SQL)
+        return cursor
+
+    def test_kinds(self):
+        columns = self.execute().fetch_columns()
+        self.assertEqual(list(columns), ["id", "hourly", "occupation", "day", "raw"])
+        kinds = [column.kind for column in columns.values()]
+        self.assertEqual(kinds, ["int", "float", "category", "object", "object"])
+        self.assertTrue(all(len(column) == len(ROWS) for column in columns.values()))
+
+    def test_values(self):
+        columns = self.execute().fetch_columns()
+        self.assertEqual(columns["id"].to_list(), [row[0] for row in ROWS])
+        self.assertEqual(
+            columns["hourly"].to_list(),
+            [None if row[1] is None else float(row[1]) for row in ROWS],
+        )
+        self.assertEqual(columns["occupation"].to_list(), [row[2] for row in ROWS])
+        self.assertEqual(columns["day"].to_list(), [row[3] for row in ROWS])
+        self.assertEqual(columns["raw"].to_list(), [row[4] for row in ROWS])
+
+    def test_nulls(self):
+        columns = self.execute().fetch_columns()
+        self.assertIsNone(columns["id"].mask)
+        hourly = columns["hourly"]
+        self.assertEqual(list(hourly.mask), [row[1] is None for row in ROWS])
+        self.assertTrue(math.isnan(hourly.values[0]))
+        occupation = columns["occupation"]
+        self.assertEqual(sorted(occupation.categories), sorted(OCCUPATIONS))
+        self.assertEqual(occupation.values[0], -1)
+
+    def test_not_categorical(self):
+        columns = self.execute(categorical=False).fetch_columns()
+        occupation = columns["occupation"]
+        self.assertEqual(occupation.kind, "object")
+        self.assertIsNone(occupation.categories)
+        self.assertEqual(occupation.to_list(), [row[2] for row in ROWS])
+
+    def test_batches(self):
+        cursor = self.execute(batch_size=64)
+        batches = list(cursor.iter_column_batches(300))
+        self.assertEqual([len(batch["id"]) for batch in batches], [300, 300, 300, 100])
+        ids = [i for batch in batches for i in batch["id"].to_list()]
+        self.assertEqual(ids, list(range(len(ROWS))))
+        # Category codes restart with each batch
+        self.assertEqual(len(batches[-1]["occupation"].categories), 3)
+        self.assertEqual(cursor.rownumber, len(ROWS))
+
+    def test_short_rows_padded(self):
+        server = FakeServer()
+        packets = result_set(FIELDS, ROWS[:1])
+        packets[-2] = b"\x015\x031.5"
+        server.on_query(SQL, packets)
+        server, conn = self.connect(server)
+        with conn.cursor(SSColumnarCursor) as cursor:
+            cursor.execute(SQL)
+            columns = cursor.fetch_columns()
+        self.assertEqual(
+            [column.to_list() for column in columns.values()],
+            [[5], [1.5], [None], [None], [None]],
+        )
+
+    def test_empty_result(self):
+        columns = self.execute(rows=[]).fetch_columns()
+        self.assertEqual(len(columns["id"]), 0)
+        self.assertEqual(columns["occupation"].to_list(), [])
+
+    def test_duplicate_names(self):
+        server = FakeServer()
+        fields = [Field("id", FIELD_TYPE.LONG), Field("id", FIELD_TYPE.LONG)]
+        server.on_query(SQL, result_set(fields, [(1, 2)]))
+        server, conn = self.connect(server)
+        with conn.cursor(SSColumnarCursor) as cursor:
+            cursor.execute(SQL)
+            self.assertEqual(list(cursor.fetch_columns()), ["id", "t.id"])
+
+    def test_unsigned_bigint(self):
+        fields = [
+            Field("total", FIELD_TYPE.LONGLONG, flags=FLAG.UNSIGNED),
+            Field("signed", FIELD_TYPE.LONGLONG),
+            Field("small", FIELD_TYPE.LONG, flags=FLAG.UNSIGNED),
+        ]
+        rows = [(2**64 - 1, -1, 2**32 - 1), (None, None, None), (2**63, 2**63 - 1, 0)]
+        for numpy in (True, False) if columnar._have_numpy else (False,):
+            with self.subTest(numpy=numpy), mock.patch.object(
+                columnar, "_have_numpy", numpy
+            ):
+                server = FakeServer()
+                server.on_query(SQL, result_set(fields, rows))
+                server, conn = self.connect(server)
+                with conn.cursor(SSColumnarCursor) as cursor:
+                    cursor.execute(SQL)
+                    columns = cursor.fetch_columns()
+                kinds = [column.kind for column in columns.values()]
+                self.assertEqual(kinds, ["uint", "int", "int"])
+                for index, column in enumerate(columns.values()):
+                    self.assertEqual(column.to_list(), [row[index] for row in rows])
+
+    def test_without_numpy(self):
+        with mock.patch.object(columnar, "_have_numpy", False):
+            columns = self.execute().fetch_columns()
+        self.assertIsInstance(columns["id"].values, array)
+        self.assertIsInstance(columns["day"].values, list)
+        self.assertEqual(columns["id"].to_list(), [row[0] for row in ROWS])
+        self.assertEqual(columns["occupation"].to_list(), [row[2] for row in ROWS])
+
+    @unittest.skipUnless(columnar._have_numpy, "numpy is not installed")
+    def test_numpy_arrays(self):
+        columns = self.execute().fetch_columns()
+        self.assertEqual(str(columns["id"].values.dtype), "int64")
+        self.assertEqual(str(columns["hourly"].values.dtype), "float64")
+        self.assertEqual(str(columns["occupation"].values.dtype), "int32")
+        self.assertEqual(str(columns["hourly"].mask.dtype), "bool")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+import random
+import unittest
+import zlib
+
+from pymysql import _compression, err
+from pymysql.constants import CLIENT, FIELD_TYPE
+from pymysql.tests import fakeserver
+from pymysql.tests.base import FakeServerTestCase
+from pymysql.tests.fakeserver import FakeServer, Field, ok_packet, result_set
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+FIELDS = [Field("id", FIELD_TYPE.LONGLONG), Field("name", FIELD_TYPE.VAR_STRING)]
+ROWS = [(i, f"row {i} " + "x" * (i % 40)) for i in range(2000)]
+SQL = "SELECT id, name FROM t"
+
+
+def expected_rows():
+    return tuple((i, name) for i, name in ROWS)
+
+
+class TestNegotiation(FakeServerTestCase):
+    def test_zlib(self):
+        server = FakeServer(fakeserver.DEFAULT_CAPABILITIES | CLIENT.COMPRESS)
+        server, conn = self.connect(server, compress=True)
+        flags = server.handshake["client_flag"]
+        self.assertTrue(flags & CLIENT.COMPRESS)
+        self.assertFalse(flags & CLIENT.ZSTD_COMPRESSION_ALGORITHM)
+        self.assertIsNone(server.handshake["zstd_level"])
+        self.assertEqual(conn._codec.name, "zlib")
+        self.assertEqual(server.codec, "zlib")
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        server = FakeServer(
+            fakeserver.DEFAULT_CAPABILITIES
+            | CLIENT.COMPRESS
+            | CLIENT.ZSTD_COMPRESSION_ALGORITHM
+        )
+        server, conn = self.connect(server, compress="zstd", compression_level=7)
+        flags = server.handshake["client_flag"]
+        self.assertTrue(flags & CLIENT.ZSTD_COMPRESSION_ALGORITHM)
+        self.assertFalse(flags & CLIENT.COMPRESS)
+        # The level follows the connect attributes in the handshake response
+        self.assertEqual(server.handshake["zstd_level"], 7)
+        self.assertEqual(conn._codec.name, "zstd")
+        self.assertEqual(server.codec, "zstd")
+
+    def test_zstd_falls_back_to_zlib(self):
+        # Server without zstd support
+        server = FakeServer(fakeserver.DEFAULT_CAPABILITIES | CLIENT.COMPRESS)
+        server, conn = self.connect(server, compress="zstd")
+        self.assertTrue(server.handshake["client_flag"] & CLIENT.COMPRESS)
+        self.assertEqual(conn._codec.name, "zlib")
+
+    def test_server_without_compression(self):
+        server, conn = self.connect(compress=True)
+        flags = server.handshake["client_flag"]
+        self.assertFalse(flags & (CLIENT.COMPRESS | CLIENT.ZSTD_COMPRESSION_ALGORITHM))
+        self.assertIsNone(conn._codec)
+        self.assertIsNone(server.codec)
+
+    def test_no_compression_requested(self):
+        server = FakeServer(fakeserver.DEFAULT_CAPABILITIES | CLIENT.COMPRESS)
+        server, conn = self.connect(server)
+        self.assertFalse(server.handshake["client_flag"] & CLIENT.COMPRESS)
+        self.assertIsNone(conn._codec)
+
+    def test_invalid_compress(self):
+        with self.assertRaises(ValueError):
+            FakeServer().connect(compress="lz4")
+
+
+class CompressedProtocolMixin:
+    """Queries over the compressed protocol; subclasses pick the codec."""
+
+    compress = None
+    capabilities = 0
+
+    def server(self, **kwargs):
+        server = FakeServer(fakeserver.DEFAULT_CAPABILITIES | self.capabilities, **kwargs)
+        server.on_query(SQL, result_set(FIELDS, ROWS))
+        return server
+
+    def test_result_set(self):
+        server, conn = self.connect(self.server(), compress=self.compress)
+        with conn.cursor() as cursor:
+            cursor.execute(SQL)
+            self.assertEqual(cursor.fetchall(), expected_rows())
+        self.assertEqual(server.queries[-1], SQL)
+
+    def test_packets_split_across_frames(self):
+        # Frames far smaller than the packets: every row packet straddles frames
+        server, conn = self.connect(self.server(frame_size=7), compress=self.compress)
+        with conn.cursor() as cursor:
+            cursor.execute(SQL)
+            self.assertEqual(cursor.fetchall(), expected_rows())
+        self.assertGreater(len(server.server_frames), 1000)
+
+    def test_packet_larger_than_frame(self):
+        big = "y" * 100000
+        server = self.server(frame_size=4096)
+        server.on_query("SELECT big", result_set([FIELDS[1]], [(big,)]))
+        server, conn = self.connect(server, compress=self.compress)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT big")
+            self.assertEqual(cursor.fetchall(), ((big,),))
+
+    def test_frame_sequence_numbers(self):
+        server, conn = self.connect(self.server(), compress=self.compress)
+        with conn.cursor() as cursor:
+            for _ in range(3):
+                del server.client_frames[:]
+                del server.server_frames[:]
+                cursor.execute(SQL)
+                cursor.fetchall()
+                # Each command starts at 0; the server's frames continue from there
+                self.assertEqual([frame[0] for frame in server.client_frames], [0])
+                self.assertEqual(server.server_frames[0][0], 1)
+                sequences = [frame[0] for frame in server.server_frames]
+                self.assertEqual(sequences, [(1 + i) % 256 for i in range(len(sequences))])
+
+    def test_sequence_wraps(self):
+        # More than 256 frames in one response
+        server, conn = self.connect(self.server(frame_size=64), compress=self.compress)
+        with conn.cursor() as cursor:
+            cursor.execute(SQL)
+            self.assertEqual(len(cursor.fetchall()), len(ROWS))
+        self.assertGreater(len(server.server_frames), 256)
+        # The connection is still in step afterwards
+        conn.ping(reconnect=False)
+
+    def test_small_packets_uncompressed(self):
+        server, conn = self.connect(self.server(), compress=self.compress)
+        del server.client_frames[:]
+        conn.ping(reconnect=False)
+        ((sequence, length, uncompressed),) = server.client_frames
+        # A 5 byte COM_PING packet is below the threshold: sent as-is
+        self.assertEqual((sequence, length, uncompressed), (0, 5, 0))
+        # And the server's OK came back uncompressed too
+        self.assertEqual(server.server_frames[-1][2], 0)
+
+    def test_large_query_compressed(self):
+        sql = "SELECT '" + "z" * 5000 + "'"
+        server = self.server()
+        server.on_query(sql, [ok_packet()])
+        server, conn = self.connect(server, compress=self.compress)
+        del server.client_frames[:]
+        with conn.cursor() as cursor:
+            cursor.execute(sql)
+        ((sequence, length, uncompressed),) = server.client_frames
+        self.assertEqual(sequence, 0)
+        self.assertEqual(uncompressed, 4 + 1 + len(sql))
+        self.assertLess(length, uncompressed)
+        self.assertEqual(server.queries[-1], sql)
+
+    def test_out_of_sequence_frame(self):
+        def skewed(server, sql):
+            server._frame_seq += 1
+            server.send(ok_packet())
+
+        server = self.server()
+        server.on_query("DO 1", skewed)
+        server, conn = self.connect(server, compress=self.compress)
+        with self.assertRaises(err.InternalError):
+            conn.query("DO 1")
+        self.assertFalse(conn.open)
+
+    def test_load_data_local(self):
+        from pymysql import bulk
+
+        columns = {"id": list(range(5000)), "name": [f"n{i}" for i in range(5000)]}
+        server, conn = self.connect(self.server(), compress=self.compress, local_infile=True)
+        with conn.cursor() as cursor:
+            # The data packets continue the command's compressed sequence
+            self.assertEqual(bulk.load_columns(cursor, "t", columns), 5000)
+        ((_, data),) = server.loads
+        self.assertEqual(data.count(b"\n"), 5000)
+        self.assertTrue(data.startswith(b"0\tn0\n1\tn1\n"))
+        conn.ping(reconnect=False)
+
+    def test_server_side_cursor_prefetch(self):
+        from pymysql.cursors import SSCursor
+
+        server, conn = self.connect(self.server(frame_size=333), compress=self.compress)
+        with conn.cursor(SSCursor) as cursor:
+            cursor.prefetch_size = 100
+            cursor.execute(SQL)
+            self.assertEqual(tuple(cursor), expected_rows())
+
+
+class TestZlibProtocol(CompressedProtocolMixin, FakeServerTestCase):
+    compress = "zlib"
+    capabilities = CLIENT.COMPRESS
+
+
+@unittest.skipIf(zstandard is None, "zstandard is not installed")
+class TestZstdProtocol(CompressedProtocolMixin, FakeServerTestCase):
+    compress = "zstd"
+    capabilities = CLIENT.COMPRESS | CLIENT.ZSTD_COMPRESSION_ALGORITHM
+
+
+class TestCompressFrames(unittest.TestCase):
+    def test_below_threshold(self):
+        data = b"\x05\x00\x00\x00\x0eping"
+        frames, sequence = _compression.compress_frames(
+            data, _compression.ZlibCodec(), 3
+        )
+        self.assertEqual(frames, b"\x09\x00\x00\x03\x00\x00\x00" + data)
+        self.assertEqual(sequence, 4)
+
+    def test_compressed(self):
+        data = b"a" * 1000
+        frames, sequence = _compression.compress_frames(
+            data, _compression.ZlibCodec(), 255
+        )
+        length = int.from_bytes(frames[:3], "little")
+        self.assertEqual(frames[3], 255)
+        self.assertEqual(int.from_bytes(frames[4:7], "little"), 1000)
+        self.assertEqual(zlib.decompress(frames[7 : 7 + length]), data)
+        self.assertEqual(sequence, 0)
+
+    def test_incompressible_sent_as_is(self):
+        data = random.Random(0).randbytes(600)
+        frames, _ = _compression.compress_frames(data, _compression.ZlibCodec(), 0)
+        self.assertEqual(int.from_bytes(frames[4:7], "little"), 0)
+        self.assertEqual(frames[7:], data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+import contextlib
+import datetime
+import decimal
+import io
+import struct
+import unittest
+from unittest import mock
+
+from pymysql import connections, err
+from pymysql.constants import FIELD_TYPE, SERVER_STATUS
+from pymysql.cursors import Cursor, DictCursor, SSCursor, SSDictCursor, SSRecordCursor
+from pymysql.tests.base import FakeServerTestCase
+from pymysql.tests.fakeserver import FakeServer, Field, error_packet, result_set
+
+
+FIELDS = [
+    Field("id", FIELD_TYPE.LONGLONG),
+    Field("name", FIELD_TYPE.VAR_STRING),
+    Field("price", FIELD_TYPE.NEWDECIMAL),
+    Field("score", FIELD_TYPE.DOUBLE),
+    Field("day", FIELD_TYPE.DATE),
+    Field("blob", FIELD_TYPE.BLOB, charsetnr=63),
+]
+ROWS = [
+    (1, "alpha", decimal.Decimal("1.50"), 0.5, datetime.date(2024, 1, 2), b"\x00\x01"),
+    (2, None, None, None, None, None),
+    # 0xFC and 0xFD length headers
+    (3, "é" * 200, decimal.Decimal("-7.25"), 1e10, datetime.date(1999, 12, 31), b"b" * 70000),
+]
+SQL = "SELECT * FROM t"
+NAMES = [field.name for field in FIELDS]
+
+
+class CursorTestMixin:
+    """Text-protocol rows through one cursor class; subclasses pick it."""
+
+    cursorclass = None
+    as_dict = False
+
+    def expected(self, rows):
+        if self.as_dict:
+            return [dict(zip(NAMES, row)) for row in rows]
+        return [tuple(row) for row in rows]
+
+    def fetch(self, cursor):
+        return list(cursor.fetchall())
+
+    def run_query(self, server, sql=SQL):
+        server, conn = self.connect(server)
+        with conn.cursor(self.cursorclass) as cursor:
+            cursor.execute(sql)
+            return cursor, self.fetch(cursor)
+
+    def server(self, rows=ROWS):
+        server = FakeServer()
+        server.on_query(SQL, result_set(FIELDS, rows))
+        return server
+
+    def test_rows(self):
+        cursor, rows = self.run_query(self.server())
+        self.assertEqual(rows, self.expected(ROWS))
+        self.assertEqual([d[0] for d in cursor.description], NAMES)
+
+    def test_many_rows(self):
+        rows = [(i, f"n{i}", decimal.Decimal(i), i / 4, None, b"") for i in range(5000)]
+        _, fetched = self.run_query(self.server(rows))
+        self.assertEqual(fetched, self.expected(rows))
+
+    def test_debug_matches_batch_path(self):
+        # DEBUG decoding skips the compiled decoder and reads row by row
+        _, batch = self.run_query(self.server())
+        with mock.patch.object(connections, "DEBUG", True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, debug = self.run_query(self.server())
+        self.assertEqual(debug, batch)
+
+    def test_short_row(self):
+        # Rows may omit trailing columns (PyMySQL#434)
+        server = FakeServer()
+        packets = result_set(FIELDS, [ROWS[0]])
+        packets[-2] = b"\x017\x04beta"
+        server.on_query(SQL, packets)
+        _, rows = self.run_query(server)
+        if self.as_dict:
+            self.assertEqual(rows, [{"id": 7, "name": "beta"}])
+        else:
+            self.assertEqual(rows, [(7, "beta")])
+
+    def test_eight_byte_length_header(self):
+        # A row whose first column has a 0xFE header is not an EOF packet
+        server = FakeServer()
+        packets = result_set(FIELDS[:2], [(1, "x")])
+        packets[-2] = b"\xfe" + struct.pack("<Q", 1) + b"9" + b"\x02ok"
+        server.on_query(SQL, packets)
+        server, conn = self.connect(server)
+        with conn.cursor(self.cursorclass) as cursor:
+            cursor.execute(SQL)
+            rows = self.fetch(cursor)
+        expected = (9, "ok")
+        self.assertEqual(rows, [dict(zip(NAMES, expected)) if self.as_dict else expected])
+
+    def test_multiple_result_sets(self):
+        first = result_set(FIELDS, ROWS[:1], status=SERVER_STATUS.SERVER_MORE_RESULTS_EXISTS)
+        second = result_set(FIELDS[:2], [(10, "ten"), (11, "eleven")])
+        server = FakeServer()
+        server.on_query("CALL p()", first + second)
+        server, conn = self.connect(server)
+        with conn.cursor(self.cursorclass) as cursor:
+            cursor.execute("CALL p()")
+            self.assertEqual(self.fetch(cursor), self.expected(ROWS[:1]))
+            self.assertTrue(cursor.nextset())
+            rows = self.fetch(cursor)
+            if self.as_dict:
+                self.assertEqual(rows, [{"id": 10, "name": "ten"}, {"id": 11, "name": "eleven"}])
+            else:
+                self.assertEqual(rows, [(10, "ten"), (11, "eleven")])
+            self.assertFalse(cursor.nextset())
+        conn.ping(reconnect=False)
+
+    def test_error_after_rows(self):
+        server = FakeServer()
+        packets = result_set(FIELDS, ROWS)
+        packets[-1] = error_packet(1317, "Query execution was interrupted", b"70100")
+        server.on_query(SQL, packets)
+        server, conn = self.connect(server)
+        with conn.cursor(self.cursorclass) as cursor:
+            with self.assertRaises(err.OperationalError):
+                cursor.execute(SQL)
+                self.fetch(cursor)
+
+
+class TestCursor(CursorTestMixin, FakeServerTestCase):
+    cursorclass = Cursor
+
+
+class TestDictCursor(CursorTestMixin, FakeServerTestCase):
+    cursorclass = DictCursor
+    as_dict = True
+
+
+class TestSSCursor(CursorTestMixin, FakeServerTestCase):
+    cursorclass = SSCursor
+
+    def test_fetchone_and_fetchmany(self):
+        server, conn = self.connect(self.server())
+        with conn.cursor(self.cursorclass) as cursor:
+            cursor.execute(SQL)
+            self.assertEqual(cursor.fetchone(), ROWS[0])
+            self.assertEqual(list(cursor.fetchmany(5)), [tuple(row) for row in ROWS[1:]])
+            self.assertIsNone(cursor.fetchone())
+
+
+class TestSSDictCursor(CursorTestMixin, FakeServerTestCase):
+    cursorclass = SSDictCursor
+    as_dict = True
+
+
+class TestSSCursorPrefetch(FakeServerTestCase):
+    rows = [(i, f"n{i}", decimal.Decimal(i), i / 2, None, b"x") for i in range(1000)]
+
+    def server(self, **kwargs):
+        server = FakeServer(**kwargs)
+        server.on_query(SQL, result_set(FIELDS, self.rows))
+        server.on_query("SELECT 1", result_set(FIELDS[:1], [(1,)]))
+        return server
+
+    def cursor(self, server, cursorclass=SSCursor, prefetch_size=64):
+        server, conn = self.connect(server)
+        cursor = conn.cursor(cursorclass)
+        self.addCleanup(cursor.close)
+        cursor.prefetch_size = prefetch_size
+        cursor.execute(SQL)
+        return conn, cursor
+
+    def test_rows(self):
+        _, cursor = self.cursor(self.server())
+        self.assertEqual(list(cursor), self.rows)
+        self.assertEqual(cursor.rownumber, len(self.rows))
+        self.assertIsNone(cursor.fetchone())
+
+    def test_trickled(self):
+        _, cursor = self.cursor(self.server(chunk_size=5))
+        self.assertEqual(list(cursor), self.rows)
+
+    def test_bounded_read_ahead(self):
+        _, cursor = self.cursor(self.server(), prefetch_size=16)
+        for expected in self.rows[:100]:
+            self.assertEqual(cursor.fetchone(), expected)
+            self.assertLessEqual(len(cursor._ahead), 16)
+
+    def test_fetchmany_and_scroll(self):
+        _, cursor = self.cursor(self.server(), prefetch_size=10)
+        self.assertEqual(cursor.fetchmany(25), self.rows[:25])
+        cursor.scroll(5)
+        self.assertEqual(cursor.fetchone(), self.rows[30])
+        cursor.scroll(500, mode="absolute")
+        self.assertEqual(cursor.fetchone(), self.rows[500])
+        self.assertEqual(cursor.rownumber, 501)
+
+    def test_row_classes(self):
+        _, cursor = self.cursor(self.server(), SSDictCursor)
+        self.assertEqual(cursor.fetchone(), dict(zip(NAMES, self.rows[0])))
+        _, cursor = self.cursor(self.server(), SSRecordCursor)
+        row = cursor.fetchone()
+        self.assertEqual(tuple(row), self.rows[0])
+        self.assertEqual(row.name, "n0")
+
+    def test_debug_path(self):
+        with mock.patch.object(connections, "DEBUG", True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, cursor = self.cursor(self.server())
+                self.assertEqual(list(cursor), self.rows)
+
+    def test_close_mid_result(self):
+        # Unread rows are drained so the connection can be used again
+        conn, cursor = self.cursor(self.server(), prefetch_size=7)
+        self.assertEqual(cursor.fetchone(), self.rows[0])
+        cursor.close()
+        with conn.cursor() as other:
+            other.execute("SELECT 1")
+            self.assertEqual(other.fetchall(), ((1,),))
+
+    def test_execute_again_discards_read_ahead(self):
+        conn, cursor = self.cursor(self.server(), prefetch_size=50)
+        cursor.fetchone()
+        self.assertTrue(cursor._ahead)
+        with self.assertWarns(UserWarning):
+            cursor.execute("SELECT 1")
+        self.assertEqual(list(cursor), [(1,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import time
+import unittest
+
+from pymysql import err
+from pymysql.constants import CR, FIELD_TYPE
+from pymysql.tests.base import FakeServerTestCase
+from pymysql.tests.fakeserver import FakeServer, Field, result_set
+
+
+FIELDS = [Field("id", FIELD_TYPE.LONG), Field("name", FIELD_TYPE.VAR_STRING)]
+ROWS = [(i, "x" * 20) for i in range(100)]
+
+
+class TestDeadline(FakeServerTestCase):
+    def trickling(self, chunk_size=16, chunk_delay=0.02):
+        # ~3KB in 16-byte pieces: about 4 seconds to send it all
+        server = FakeServer(chunk_size=chunk_size, chunk_delay=chunk_delay)
+        server.on_query("SELECT 1", result_set(FIELDS, ROWS))
+        server.on_query("SELECT big", result_set(FIELDS, [(1, "y" * 3000)]))
+        return server
+
+    def test_trickling_server_stopped_at_deadline(self):
+        # One packet arriving over ~200 receives, each well within
+        # read_timeout: only the deadline bounds the read as a whole
+        server, conn = self.connect(self.trickling(), read_timeout=1)
+        start = time.monotonic()
+        conn.set_deadline(start + 0.3)
+        with self.assertRaises(err.OperationalError) as cm:
+            conn.query("SELECT big")
+        elapsed = time.monotonic() - start
+        self.assertEqual(cm.exception.args[0], CR.CR_SERVER_LOST)
+        self.assertLess(elapsed, 1.0)
+        self.assertFalse(conn.open)
+
+    def test_expired_deadline(self):
+        server, conn = self.connect()
+        conn.set_deadline(time.monotonic() - 1)
+        with self.assertRaises(err.OperationalError):
+            conn.query("SELECT 1")
+        self.assertFalse(conn.open)
+
+    def test_within_deadline(self):
+        server, conn = self.connect(self.trickling(chunk_size=512, chunk_delay=0.01))
+        conn.set_deadline(time.monotonic() + 10)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchall(), tuple(ROWS))
+
+    def test_deadline_lifted(self):
+        server, conn = self.connect(self.trickling(chunk_size=512, chunk_delay=0.01))
+        conn.set_deadline(time.monotonic() - 1)
+        conn.set_deadline(None)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(len(cursor.fetchall()), len(ROWS))
+
+
+if __name__ == "__main__":
+    unittest.main()
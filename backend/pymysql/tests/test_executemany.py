@@ -0,0 +1,119 @@
+import datetime
+import decimal
+import unittest
+
+from pymysql import converters, err
+from pymysql.constants import SERVER_STATUS
+from pymysql.tests.base import FakeServerTestCase
+
+
+COLUMNS = [
+    [1, None, -5, 2**70],
+    [0.5, None, 1e100, -2.0],
+    [True, False, None, True],
+    ["plain", "it's", "back\\slash\nline", None],
+    [None, None, None, None],
+    # Mixed and other types go value by value
+    [1, 2.5, "x", None],
+    [decimal.Decimal("1.10"), None, decimal.Decimal("-0"), decimal.Decimal(3)],
+    [datetime.date(2024, 1, 2), None, datetime.date(1999, 12, 31), datetime.date(2000, 1, 1)],
+    [b"\x00'", None, b"", b"\\"],
+]
+
+
+class TestEscapeColumn(unittest.TestCase):
+    def test_matches_escape_item(self):
+        for column in COLUMNS:
+            with self.subTest(column=column):
+                expected = [converters.escape_item(v, "utf8mb4") for v in column]
+                literals = converters.escape_column(column, "utf8mb4")
+                if literals is not None:
+                    self.assertEqual(literals, expected)
+
+    def test_homogeneous_columns_handled(self):
+        for column in COLUMNS[:5]:
+            self.assertIsNotNone(converters.escape_column(column, "utf8mb4"))
+
+    def test_mixed_columns_declined(self):
+        for column in COLUMNS[5:]:
+            self.assertIsNone(converters.escape_column(column, "utf8mb4"))
+
+    def test_custom_encoder_declined(self):
+        mapping = dict(converters.encoders)
+        mapping[int] = lambda value, mapping=None: "'%d'" % value
+        self.assertIsNone(converters.escape_column([1, 2], "utf8mb4", mapping))
+
+    def test_non_finite_float(self):
+        for value in (float("inf"), float("-inf"), float("nan")):
+            with self.assertRaises(err.ProgrammingError):
+                converters.escape_column([1.0, value], "utf8mb4")
+
+
+class TestConnectionEscapeColumn(FakeServerTestCase):
+    def test_matches_literal(self):
+        _, conn = self.connect()
+        for column in COLUMNS:
+            with self.subTest(column=column):
+                self.assertEqual(
+                    conn.escape_column(column), [conn.literal(v) for v in column]
+                )
+
+    def test_no_backslash_escapes(self):
+        _, conn = self.connect()
+        conn.server_status |= SERVER_STATUS.SERVER_STATUS_NO_BACKSLASH_ESCAPES
+        column = ["it's", "back\\slash"]
+        self.assertEqual(conn.escape_column(column), ["'it''s'", "'back\\slash'"])
+        self.assertEqual(conn.escape_column(column), [conn.literal(v) for v in column])
+
+
+class TestExecuteMany(FakeServerTestCase):
+    rows = list(zip(*[column for column in COLUMNS if len(column) == 4]))
+    sql = "INSERT INTO t VALUES (" + ", ".join(["%s"] * len(COLUMNS)) + ")"
+
+    def expected_values(self, conn, rows):
+        return ",".join(
+            "(" + ", ".join(conn.literal(v) for v in row) + ")" for row in rows
+        )
+
+    def test_same_sql_as_row_by_row(self):
+        server, conn = self.connect()
+        with conn.cursor() as cursor:
+            cursor.executemany(self.sql, self.rows)
+        self.assertEqual(
+            server.queries[-1],
+            "INSERT INTO t VALUES " + self.expected_values(conn, self.rows),
+        )
+
+    def test_dict_rows(self):
+        server, conn = self.connect()
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO t (a, b) VALUES (%(a)s, %(b)s) ON DUPLICATE KEY UPDATE b = 1",
+                [{"a": 1, "b": "x"}, {"a": 2, "b": None}],
+            )
+        self.assertEqual(
+            server.queries[-1],
+            "INSERT INTO t (a, b) VALUES (1, 'x'),(2, NULL) ON DUPLICATE KEY UPDATE b = 1",
+        )
+
+    def test_ragged_rows_escaped_one_at_a_time(self):
+        server, conn = self.connect()
+        with conn.cursor() as cursor:
+            cursor.executemany("INSERT INTO t VALUES (%s, %s)", [(1, "a"), [2, "b"]])
+        self.assertEqual(server.queries[-1], "INSERT INTO t VALUES (1, 'a'),(2, 'b')")
+
+    def test_split_by_max_stmt_length(self):
+        server, conn = self.connect()
+        rows = [(i, "v" * 50) for i in range(100)]
+        with conn.cursor() as cursor:
+            cursor.max_stmt_length = 1000
+            cursor.executemany("INSERT INTO t VALUES (%s, %s)", rows)
+        inserts = [q for q in server.queries if q.startswith("INSERT")]
+        self.assertGreater(len(inserts), 1)
+        self.assertTrue(all(len(q) <= 1000 for q in inserts))
+        joined = ",".join(q[len("INSERT INTO t VALUES ") :] for q in inserts)
+        self.assertEqual(joined, ",".join(f"({i}, '{'v' * 50}')" for i in range(100)))
+
+
+if __name__ == "__main__":
+    unittest.main()
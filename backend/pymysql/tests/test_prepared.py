@@ -0,0 +1,197 @@
+import datetime
+import decimal
+import unittest
+
+from pymysql import err
+from pymysql.constants import COMMAND, FIELD_TYPE, FLAG
+from pymysql.cursors import PreparedCursor, PreparedRecordCursor
+from pymysql.prepared import to_qmark
+from pymysql.tests.base import FakeServerTestCase
+from pymysql.tests.fakeserver import FakeServer, Field, result_set
+
+
+FIELDS = [
+    Field("id", FIELD_TYPE.LONGLONG),
+    Field("small", FIELD_TYPE.TINY, flags=FLAG.UNSIGNED),
+    Field("ratio", FIELD_TYPE.DOUBLE),
+    Field("hourly", FIELD_TYPE.NEWDECIMAL),
+    Field("occupation", FIELD_TYPE.VAR_STRING),
+    Field("day", FIELD_TYPE.DATE),
+    Field("at", FIELD_TYPE.DATETIME),
+    Field("span", FIELD_TYPE.TIME),
+    Field("raw", FIELD_TYPE.BLOB, charsetnr=63),
+]
+ROWS = [
+    (
+        1,
+        200,
+        0.25,
+        decimal.Decimal("18.50"),
+        "nurse",
+        datetime.date(2024, 3, 1),
+        datetime.datetime(2024, 3, 1, 12, 30, 5, 250),
+        datetime.timedelta(hours=-1, minutes=-30),
+        b"\xff\x00",
+    ),
+    (2, None, None, None, None, None, None, None, None),
+]
+SQL = "SELECT * FROM earnings WHERE occupation = ? AND id > ?"
+
+
+class TestToQmark(unittest.TestCase):
+    def test_positional(self):
+        self.assertEqual(
+            to_qmark("SELECT %s, %s", (1, "a")), ("SELECT ?, ?", (1, "a"))
+        )
+
+    def test_named(self):
+        self.assertEqual(
+            to_qmark("SELECT %(b)s, %(a)s, %(b)s", {"a": 1, "b": 2}),
+            ("SELECT ?, ?, ?", (2, 1, 2)),
+        )
+
+    def test_missing_name(self):
+        with self.assertRaises(err.ProgrammingError):
+            to_qmark("SELECT %(a)s", {"b": 1})
+
+    def test_percent_escape(self):
+        self.assertEqual(
+            to_qmark("SELECT %s LIKE 'a%%' AND `x%%` = %s", (1, 2)),
+            ("SELECT ? LIKE 'a%' AND `x%` = ?", (1, 2)),
+        )
+
+    def test_quoted_strings(self):
+        sql = "SELECT 'it\\'s %%', \"say \"\"%%\"\"\", %s"
+        self.assertEqual(
+            to_qmark(sql, (1,)), ("SELECT 'it\\'s %', \"say \"\"%\"\"\", ?", (1,))
+        )
+
+    def test_literal_question_mark(self):
+        self.assertIsNone(to_qmark("SELECT 'why?' FROM t WHERE a = %s", (1,)))
+        self.assertIsNone(to_qmark("SELECT ? FROM t WHERE a = %s", (1,)))
+
+    def test_placeholder_in_literal(self):
+        self.assertIsNone(to_qmark("SELECT '%s' FROM t WHERE a = %s", (1, 2)))
+
+    def test_placeholder_in_comment(self):
+        self.assertIsNone(to_qmark("SELECT %s -- was %s\n", (1,)))
+        self.assertIsNone(to_qmark("SELECT /* %s */ %s", (1,)))
+        self.assertIsNone(to_qmark("SELECT %s # %s", (1,)))
+
+    def test_comments_without_placeholders(self):
+        self.assertEqual(
+            to_qmark("SELECT /* it's */ %s -- don't\n, %s", (1, 2)),
+            ("SELECT /* it's */ ? -- don't\n, ?", (1, 2)),
+        )
+
+
+class TestPreparedCursor(FakeServerTestCase):
+    def server(self):
+        server = FakeServer()
+        server.add_statement(SQL, FIELDS, lambda params: ROWS if params[0] == "nurse" else [])
+        return server
+
+    def test_binary_rows(self):
+        server, conn = self.connect(self.server())
+        with conn.cursor(PreparedCursor) as cursor:
+            self.assertEqual(
+                cursor.execute(
+                    "SELECT * FROM earnings WHERE occupation = %s AND id > %s", ("nurse", 0)
+                ),
+                2,
+            )
+            self.assertEqual(cursor.fetchall(), tuple(ROWS))
+            self.assertEqual([d[0] for d in cursor.description], [f.name for f in FIELDS])
+        self.assertEqual(server.executions, [(SQL, ["nurse", 0])])
+        # Only the connection setup went through COM_QUERY
+        self.assertEqual(server.queries, ["SET NAMES utf8mb4"])
+
+    def test_named_args(self):
+        server, conn = self.connect(self.server())
+        with conn.cursor(PreparedCursor) as cursor:
+            cursor.execute(
+                "SELECT * FROM earnings WHERE occupation = %(occ)s AND id > %(min)s",
+                {"min": 5, "occ": "teacher"},
+            )
+            self.assertEqual(cursor.fetchall(), ())
+        self.assertEqual(server.executions, [(SQL, ["teacher", 5])])
+
+    def test_records(self):
+        server, conn = self.connect(self.server())
+        with conn.cursor(PreparedRecordCursor) as cursor:
+            cursor.execute(
+                "SELECT * FROM earnings WHERE occupation = %s AND id > %s", ("nurse", 0)
+            )
+            first, second = cursor.fetchall()
+        self.assertEqual(first.occupation, "nurse")
+        self.assertEqual(first["hourly"], decimal.Decimal("18.50"))
+        self.assertEqual(tuple(first), ROWS[0])
+        self.assertIsNone(second.day)
+
+    def test_statement_reused(self):
+        server, conn = self.connect(self.server())
+        with conn.cursor(PreparedCursor) as cursor:
+            for occupation in ("nurse", "teacher", "nurse"):
+                cursor.execute(
+                    "SELECT * FROM earnings WHERE occupation = %s AND id > %s",
+                    (occupation, 0),
+                )
+        prepares = [c for c, _ in server.commands if c == COMMAND.COM_STMT_PREPARE]
+        self.assertEqual(len(prepares), 1)
+        self.assertEqual(len(server.executions), 3)
+
+    def test_statement_cache_eviction(self):
+        server = FakeServer()
+        for i in range(3):
+            server.add_statement(f"SELECT {i} + ?", [Field("x", FIELD_TYPE.LONGLONG)], [(i,)])
+        server, conn = self.connect(server, statement_cache_size=2)
+        with conn.cursor(PreparedCursor) as cursor:
+            for i in (0, 1, 0, 2):
+                cursor.execute(f"SELECT {i} + %s", (1,))
+                self.assertEqual(cursor.fetchall(), ((i,),))
+        # "SELECT 1" was least recently used when "SELECT 2" came in
+        self.assertEqual(server.closed_statements, [2])
+        self.assertEqual(list(conn._statements), ["SELECT 0 + ?", "SELECT 2 + ?"])
+        conn.ping(reconnect=False)
+
+    def test_unsupported_falls_back(self):
+        server = FakeServer()
+        server.on_query("SHOW TABLES LIKE 'e%'", result_set([FIELDS[4]], [("earnings",)]))
+        server, conn = self.connect(server)
+        with conn.cursor(PreparedCursor) as cursor:
+            cursor.execute("SHOW TABLES LIKE %s", ("e%",))
+            self.assertEqual(cursor.fetchall(), (("earnings",),))
+        self.assertEqual(server.queries[-1], "SHOW TABLES LIKE 'e%'")
+        self.assertEqual(server.executions, [])
+
+    def test_literal_question_mark_uses_text_protocol(self):
+        sql = "SELECT 'why?' FROM t WHERE id = 1"
+        server = FakeServer()
+        server.on_query(sql, result_set([FIELDS[4]], [("why?",)]))
+        server, conn = self.connect(server)
+        with conn.cursor(PreparedCursor) as cursor:
+            cursor.execute("SELECT 'why?' FROM t WHERE id = %s", (1,))
+            self.assertEqual(cursor.fetchall(), (("why?",),))
+        self.assertEqual(server.queries[-1], sql)
+        self.assertFalse([c for c, _ in server.commands if c == COMMAND.COM_STMT_PREPARE])
+
+    def test_no_args_uses_text_protocol(self):
+        server = FakeServer()
+        server.on_query("SELECT 1", result_set([FIELDS[0]], [(1,)]))
+        server, conn = self.connect(server)
+        with conn.cursor(PreparedCursor) as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchall(), ((1,),))
+        self.assertEqual(server.executions, [])
+
+    def test_wrong_param_count(self):
+        server, conn = self.connect(self.server())
+        with conn.cursor(PreparedCursor) as cursor:
+            with self.assertRaises(err.ProgrammingError):
+                cursor.execute(
+                    "SELECT * FROM earnings WHERE occupation = %s AND id > %s", ("nurse",)
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from unittest import mock
+
+from pymysql.constants import FIELD_TYPE
+from pymysql.cursors import PreparedCursor
+from pymysql.querycache import QueryCache
+from pymysql.tests.base import FakeServerTestCase
+from pymysql.tests.fakeserver import FakeServer, Field, result_set
+
+
+FIELDS = [Field("id", FIELD_TYPE.LONGLONG), Field("name", FIELD_TYPE.VAR_STRING)]
+TEXT_SQL = "SELECT id, name FROM staff WHERE id = 1"
+
+
+class TestQueryCache(FakeServerTestCase):
+    def server(self):
+        server = FakeServer()
+        server.on_query(TEXT_SQL, result_set(FIELDS, [(1, "text")]))
+        server.on_query(TEXT_SQL + " FOR UPDATE", result_set(FIELDS, [(1, "locked")]))
+        server.add_statement(
+            "SELECT id, name FROM staff WHERE id = ?", FIELDS, [(1, "binary")]
+        )
+        server.add_statement(
+            "SELECT id, name FROM staff WHERE name = ?",
+            FIELDS,
+            lambda params: [(len(server.executions), str(params[0]))],
+        )
+        return server
+
+    def fetch(self, conn, sql, args=None, cursorclass=None):
+        with conn.cursor(cursorclass) as cursor:
+            cursor.execute(sql, args)
+            return cursor.fetchall()
+
+    def test_repeated_query_served_from_cache(self):
+        cache = QueryCache()
+        server, conn = self.connect(self.server(), query_cache=cache)
+        for _ in range(3):
+            self.assertEqual(self.fetch(conn, TEXT_SQL), ((1, "text"),))
+        self.assertEqual(server.queries.count(TEXT_SQL), 1)
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_shared_between_connections(self):
+        cache = QueryCache()
+        first, conn1 = self.connect(self.server(), query_cache=cache)
+        second, conn2 = self.connect(self.server(), query_cache=cache)
+        self.fetch(conn1, TEXT_SQL)
+        self.assertEqual(self.fetch(conn2, TEXT_SQL), ((1, "text"),))
+        self.assertNotIn(TEXT_SQL, second.queries)
+
+    def test_protocols_cached_apart(self):
+        cache = QueryCache()
+        server, conn = self.connect(self.server(), query_cache=cache)
+        sql = "SELECT id, name FROM staff WHERE id = %s"
+        # The same query in either protocol; neither may answer the other
+        self.assertEqual(self.fetch(conn, sql, (1,), PreparedCursor), ((1, "binary"),))
+        self.assertEqual(self.fetch(conn, TEXT_SQL), ((1, "text"),))
+        self.assertEqual(self.fetch(conn, sql, (1,), PreparedCursor), ((1, "binary"),))
+        self.assertEqual(self.fetch(conn, TEXT_SQL), ((1, "text"),))
+        self.assertEqual(len(server.executions), 1)
+        self.assertEqual(server.queries.count(TEXT_SQL), 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_prepared_keyed_on_params_without_mogrify(self):
+        cache = QueryCache()
+        server, conn = self.connect(self.server(), query_cache=cache)
+        sql = "SELECT id, name FROM staff WHERE name = %s"
+        with mock.patch.object(PreparedCursor, "mogrify", side_effect=AssertionError):
+            self.assertEqual(self.fetch(conn, sql, ("ann",), PreparedCursor), ((1, "ann"),))
+            self.assertEqual(self.fetch(conn, sql, ("bob",), PreparedCursor), ((2, "bob"),))
+            self.assertEqual(self.fetch(conn, sql, ("ann",), PreparedCursor), ((1, "ann"),))
+        self.assertEqual(len(server.executions), 2)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_prepared_params_keyed_by_type(self):
+        cache = QueryCache()
+        server, conn = self.connect(self.server(), query_cache=cache)
+        sql = "SELECT id, name FROM staff WHERE name = %s"
+        for value in (1, 1.0, True, 1):
+            self.fetch(conn, sql, (value,), PreparedCursor)
+        self.assertEqual(len(server.executions), 3)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_prepared_unhashable_params_not_cached(self):
+        cache = QueryCache()
+        server, conn = self.connect(self.server(), query_cache=cache)
+        sql = "SELECT id, name FROM staff WHERE name = %(name)s"
+        for _ in range(2):
+            self.fetch(conn, sql, {"name": bytearray(b"ann")}, PreparedCursor)
+        self.assertEqual(len(server.executions), 2)
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        cache = QueryCache()
+        server, conn = self.connect(self.server(), query_cache=cache)
+        self.fetch(conn, TEXT_SQL)
+        self.fetch(conn, "SELECT id, name FROM staff WHERE id = %s", (1,), PreparedCursor)
+        self.assertEqual(cache.invalidate("other"), 0)
+        self.assertEqual(cache.invalidate("staff"), 2)
+        self.fetch(conn, TEXT_SQL)
+        self.assertEqual(server.queries.count(TEXT_SQL), 2)
+
+    def test_locking_reads_not_cached(self):
+        cache = QueryCache()
+        server, conn = self.connect(self.server(), query_cache=cache)
+        for _ in range(2):
+            self.fetch(conn, TEXT_SQL + " FOR UPDATE")
+        self.assertEqual(server.queries.count(TEXT_SQL + " FOR UPDATE"), 2)
+        self.assertEqual(len(cache), 0)
+
+    def test_expiry(self):
+        cache = QueryCache(ttl=0)
+        server, conn = self.connect(self.server(), query_cache=cache)
+        self.fetch(conn, TEXT_SQL)
+        self.fetch(conn, TEXT_SQL)
+        self.assertEqual(server.queries.count(TEXT_SQL), 2)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import socket
+import unittest
+
+from pymysql import connections, err
+from pymysql.constants import CR, FIELD_TYPE
+from pymysql.cursors import SSCursor
+from pymysql.tests.base import FakeServerTestCase
+from pymysql.tests.fakeserver import FakeServer, Field, ok_packet, result_set
+
+
+FIELDS = [Field("id", FIELD_TYPE.LONG), Field("name", FIELD_TYPE.VAR_STRING)]
+
+
+class TestSocketReader(unittest.TestCase):
+    def setUp(self):
+        self.sock, self.peer = socket.socketpair()
+        self.addCleanup(self.sock.close)
+        self.addCleanup(self.peer.close)
+
+    def test_read_view(self):
+        reader = connections._SocketReader(self.sock, size=16)
+        self.peer.sendall(b"0123456789")
+        self.assertEqual(bytes(reader.read_view(4)), b"0123")
+        self.assertEqual(reader.read(6), b"456789")
+
+    def test_eof(self):
+        reader = connections._SocketReader(self.sock, size=16)
+        self.peer.sendall(b"abc")
+        self.peer.shutdown(socket.SHUT_WR)
+        self.assertIsNone(reader.read_view(4))
+
+    def test_compacts_in_place(self):
+        reader = connections._SocketReader(self.sock, size=8)
+        buf = reader._buf
+        self.peer.sendall(b"abcdef")
+        self.assertEqual(reader.read(5), b"abcde")
+        self.peer.sendall(b"ghijk")
+        # 6 bytes needed, 8 available after moving "f" to the front
+        self.assertEqual(reader.read(6), b"fghijk")
+        self.assertIs(reader._buf, buf)
+
+    def test_old_views_survive_growth(self):
+        reader = connections._SocketReader(self.sock, size=8)
+        self.peer.sendall(b"head")
+        view = reader.read_view(4)
+        self.peer.sendall(b"x" * 100)
+        # Larger than the buffer: a new buffer is allocated
+        self.assertEqual(reader.read(100), b"x" * 100)
+        self.assertEqual(bytes(view), b"head")
+        self.assertGreaterEqual(len(reader._buf), 100)
+
+
+class TestPacketReading(FakeServerTestCase):
+    def test_trickled_bytes(self):
+        # Every packet arrives in several recv() calls
+        rows = [(i, "n" * i) for i in range(300)]
+        server = FakeServer(chunk_size=7)
+        server.on_query("SELECT 1", result_set(FIELDS, rows))
+        server, conn = self.connect(server)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchall(), tuple(rows))
+
+    def test_row_larger_than_buffer(self):
+        big = "b" * (connections.READ_BUFFER_SIZE * 3 + 5)
+        rows = [(1, "small"), (2, big), (3, "small")]
+        server = FakeServer()
+        server.on_query("SELECT 1", result_set(FIELDS, rows))
+        server, conn = self.connect(server)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchall(), tuple(rows))
+        with conn.cursor(SSCursor) as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(tuple(cursor), tuple(rows))
+
+    def test_multi_packet_row(self):
+        # Payloads of 16MB or more are split into several packets
+        big = "m" * connections.MAX_PACKET_LEN
+        server = FakeServer()
+        server.on_query("SELECT 1", result_set(FIELDS, [(1, big), (2, "after")]))
+        server, conn = self.connect(server)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            rows = cursor.fetchall()
+        self.assertEqual(len(rows[0][1]), len(big))
+        self.assertEqual(rows[1], (2, "after"))
+
+    def test_lost_mid_packet(self):
+        def truncated(server, sql):
+            server._sock.sendall(b"\x10\x00\x00\x01abc")
+            server._sock.shutdown(socket.SHUT_WR)
+
+        server = FakeServer()
+        server.on_query("SELECT 1", truncated)
+        server, conn = self.connect(server)
+        with self.assertRaises(err.OperationalError) as cm:
+            conn.query("SELECT 1")
+        self.assertEqual(cm.exception.args[0], CR.CR_SERVER_LOST)
+        self.assertFalse(conn.open)
+
+    def test_wrong_sequence(self):
+        def skewed(server, sql):
+            server._seq = 5
+            server.send(ok_packet())
+
+        server = FakeServer()
+        server.on_query("DO 1", skewed)
+        server, conn = self.connect(server)
+        with self.assertRaises(err.InternalError):
+            conn.query("DO 1")
+        self.assertFalse(conn.open)
+
+    def test_error_packet(self):
+        server = FakeServer()
+        server.on_query(
+            "SELECT nope",
+            [b"\xff" + (1146).to_bytes(2, "little") + b"#42S02Table 'nope' doesn't exist"],
+        )
+        server, conn = self.connect(server)
+        with self.assertRaises(err.ProgrammingError) as cm:
+            conn.query("SELECT nope")
+        self.assertEqual(cm.exception.args[0], 1146)
+        # The connection stays usable
+        conn.ping(reconnect=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
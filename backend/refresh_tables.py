@@ -0,0 +1,61 @@
+"""Reload database tables from the CSV exports (one table per CSV, named after the file).
+
+Usage: python refresh_tables.py [--truncate] [--replace] [--snapshot PATH] [FILE.csv ...]
+
+--snapshot then writes the wage data loaded from the tables to PATH; ship it
+as data/wage_data.snapshot and the handler serves it when the database is
+down at cold start.
+"""
+import argparse
+import os
+import time
+
+import pymysql
+from pymysql import bulk
+
+import handler
+from data_snapshot import dump_snapshot
+from db import DB_CONFIG
+from structured_logging import get_logger
+
+logger = get_logger('refresh_tables')
+
+
+def refresh_table(connection, path, truncate=False, replace=False):
+    """Bulk-load one CSV into the table named after it; returns the row count"""
+    table = os.path.splitext(os.path.basename(path))[0]
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        if truncate:
+            cursor.execute(f"TRUNCATE TABLE `{table}`")
+        rows = bulk.load_csv(cursor, table, path, replace=replace)
+    connection.commit()
+    logger.info("Loaded %d rows into %s in %.2fs", rows, table, time.perf_counter() - start)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reload tables from CSV exports')
+    parser.add_argument('files', nargs='*', help='CSV files; the file name is the table name')
+    parser.add_argument('--truncate', action='store_true', help='empty each table before loading')
+    parser.add_argument('--replace', action='store_true', help='replace rows with duplicate keys')
+    parser.add_argument('--snapshot', help='write the wage data snapshot to this file afterwards')
+    args = parser.parse_args()
+    if not args.files and not args.snapshot:
+        parser.error('nothing to do: give CSV files and/or --snapshot')
+
+    if args.files:
+        config = dict(DB_CONFIG, cursorclass=pymysql.cursors.Cursor, local_infile='streams')
+        connection = pymysql.connect(**config)
+        try:
+            for path in args.files:
+                refresh_table(connection, path, truncate=args.truncate, replace=args.replace)
+        finally:
+            connection.close()
+
+    if args.snapshot:
+        dump_snapshot(handler.DATA_CACHE.refresh(full=True), args.snapshot)
+
+
+if __name__ == '__main__':
+    main()
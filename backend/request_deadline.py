@@ -0,0 +1,36 @@
+import os
+import time
+
+# Time budget for one request when there is no Lambda context (local servers)
+REQUEST_BUDGET_MS = float(os.environ.get('REQUEST_BUDGET_MS', '10000'))
+
+# Time kept back from the Lambda timeout to serve a fallback and return
+DEADLINE_MARGIN_MS = float(os.environ.get('DEADLINE_MARGIN_MS', '1000'))
+
+
+class Deadline:
+    """The time.monotonic() instant by which a request's database work must be done.
+
+    Handed to the driver (Connection.set_deadline), so every connect, read
+    and write waits only for what is left and a slow database fails the
+    call in time for the caller to fall back or answer with an error.
+    """
+    __slots__ = ('expires',)
+
+    def __init__(self, expires):
+        self.expires = expires
+
+    @classmethod
+    def for_request(cls, context=None, budget_ms=REQUEST_BUDGET_MS):
+        """Deadline for a request: the Lambda's remaining time less the margin, and at most budget_ms"""
+        ms = budget_ms
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            ms = min(ms, context.get_remaining_time_in_millis() - DEADLINE_MARGIN_MS)
+        return cls(time.monotonic() + max(ms, 0) / 1000)
+
+    def remaining(self):
+        """Seconds left (0 once expired)"""
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def expired(self):
+        return time.monotonic() >= self.expires
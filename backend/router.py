@@ -0,0 +1,85 @@
+"""Single Lambda entry point for every endpoint.
+
+All routes run in one function, so they share one warm container: one
+wage-data and industry-data snapshot, one query cache and one database
+connection, loaded once instead of once per function.
+"""
+import json
+import db
+import gender_gap_handler
+import handler
+from structured_logging import get_logger
+
+logger = get_logger('router')
+
+# (method, path) -> handler(event, context)
+ROUTES = {
+    ('POST', '/fairness/calculate'): handler.lambda_handler,
+    ('POST', '/gender-gap/calculate'): gender_gap_handler.calculate_gender_gap,
+    ('GET', '/gender-gap/options'): gender_gap_handler.get_available_options
+}
+
+# Snapshots rebuilt on a refreshData signal
+DATA_CACHES = (handler.DATA_CACHE, gender_gap_handler.INDUSTRY_CACHE)
+
+
+def request_method(event):
+    """HTTP method of a REST API (v1) or HTTP API (v2) proxy event"""
+    method = event.get('httpMethod') or event.get('requestContext', {}).get('http', {}).get('method')
+    return (method or '').upper()
+
+
+def request_path(event):
+    """Route path of a proxy event, without the stage prefix or a trailing slash"""
+    path = event.get('resource') or event.get('rawPath') or event.get('path') or ''
+    stage = event.get('requestContext', {}).get('stage')
+    if stage and stage != '$default' and path.startswith(f'/{stage}/'):
+        path = path[len(stage) + 1:]
+    return path.rstrip('/') or '/'
+
+
+def route(method, path):
+    """Return the handler for method and path, or an error response if there is none"""
+    target = ROUTES.get((method, path))
+    if target is not None:
+        return target, None
+    allowed = [m for (m, p) in ROUTES if p == path]
+    if not allowed:
+        return None, gender_gap_handler.error_response(404, 'NOT_FOUND', f'No route for {path}')
+    response = gender_gap_handler.error_response(405, 'METHOD_NOT_ALLOWED', f'{method} is not allowed on {path}')
+    response['headers']['Allow'] = ', '.join(allowed + ['OPTIONS'])
+    return None, response
+
+
+def resolve(event):
+    """Return (handler, event to pass it) for a proxy event, or (None, error response)"""
+    method = request_method(event)
+    path = request_path(event)
+
+    if method == 'OPTIONS':
+        # CORS preflight: answered by the endpoint that owns the path
+        for (m, p), target in ROUTES.items():
+            if p == path:
+                return target, dict(event, httpMethod='OPTIONS')
+
+    target, response = route(method, path)
+    if target is None:
+        logger.info("Unrouted request: %s %s", method, path)
+        return None, response
+    return target, event
+
+
+def lambda_handler(event, context):
+    """Dispatch an API Gateway event to its endpoint by method and path"""
+    # Change signal (e.g. invoked after the tables are reloaded): drop cached query
+    # results, which would outlive the tables for their TTL, and rebuild every snapshot in the background
+    if event.get('refreshData'):
+        db.QUERY_CACHE.clear()
+        for cache in DATA_CACHES:
+            cache.request_refresh()
+        return {'statusCode': 202, 'body': json.dumps({'success': True, 'message': 'Data refresh requested'})}
+
+    target, result = resolve(event)
+    if target is None:
+        return result
+    return target(result, context)
@@ -0,0 +1,290 @@
+"""Standalone prefork HTTP server for the API, for running outside Lambda.
+
+Usage: python server.py [--port 8000] [--workers N] [--snapshot PATH] [--reuse-snapshot]
+
+The master process loads the data once, writes it to a snapshot file and
+maps it (data_snapshot.map_snapshot), then forks the workers. The workers
+inherit the mapped snapshot, so the earnings cells are one physical copy in
+the page cache however many workers there are. The other tables are heap
+objects shared copy-on-write and partly copied into each worker as requests
+touch them (see data_snapshot.map_snapshot). Every worker accepts on the
+same listening socket and turns each request into an API Gateway proxy event
+for router.lambda_handler, keeping connections alive between requests.
+
+Signals to the master:
+  SIGHUP           reload: rebuild the snapshot, start a new generation of
+                   workers, then retire the old ones once they finish their
+                   in-flight requests (no connection is refused meanwhile)
+  SIGTERM, SIGINT  graceful shutdown
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qsl
+
+import gender_gap_handler
+import handler
+import router
+from data_snapshot import dump_snapshot, map_snapshot
+from structured_logging import get_logger
+
+logger = get_logger('server')
+
+# Request threads per worker; each holds one keep-alive connection at a time,
+# so this bounds the open connections a worker serves at once
+WORKER_THREADS = int(os.environ.get('WORKER_THREADS', '64'))
+
+# Seconds an idle keep-alive connection is kept open
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', '5'))
+
+# Seconds retiring workers get to finish before they are killed
+GRACEFUL_TIMEOUT = float(os.environ.get('GRACEFUL_TIMEOUT', '30'))
+
+# Where the master writes the mapped data snapshot
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', '/tmp/wage-fairness.snapshot')
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """Adapts one HTTP request to an API Gateway (REST, v1) proxy event"""
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_OPTIONS(self):
+        self.dispatch()
+
+    def build_event(self):
+        path, _, query = self.path.partition('?')
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else None
+        return {
+            'httpMethod': self.command,
+            'path': path,
+            'headers': dict(self.headers.items()),
+            'queryStringParameters': dict(parse_qsl(query)) or None,
+            'body': body,
+            'isBase64Encoded': False
+        }
+
+    def dispatch(self):
+        try:
+            response = router.lambda_handler(self.build_event(), None)
+        except Exception as e:
+            logger.error("Unhandled error for %s %s: %s", self.command, self.path, e)
+            response = {'statusCode': 500, 'body': json.dumps({'success': False, 'error': {'code': 'INTERNAL_ERROR'}})}
+
+        body = (response.get('body') or '').encode('utf-8')
+        self.send_response(response.get('statusCode', 200))
+        for name, value in (response.get('headers') or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        if self.server.draining:
+            # Retiring: finish this request, then let the client reconnect to a new worker
+            self.close_connection = True
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+class WorkerServer(HTTPServer):
+    """HTTP server on an inherited listening socket, handling requests on a fixed thread pool.
+
+    The pool threads outlive connections, so each keeps its warm database
+    connection (db.shared_connection) across clients.
+    """
+
+    def __init__(self, listener, threads=WORKER_THREADS):
+        super().__init__(listener.getsockname()[:2], APIRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listener
+        self.draining = False
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self):
+        """Stop accepting; in-flight requests finish and idle connections time out"""
+        self.draining = True
+        self.shutdown()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def run_worker(listener):
+    """Worker process body: serve until SIGTERM, then drain and exit"""
+    server = WorkerServer(listener)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.drain).start())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def load_snapshots(path, reuse=False):
+    """Build (or with reuse, just map) the data and publish it in the handlers' caches"""
+    if not (reuse and os.path.exists(path)):
+        dump_snapshot(handler.DATA_CACHE.refresh(), path)
+    # The master's own copy is dropped; it and every worker use the mapped one
+    handler.DATA_CACHE.adopt(map_snapshot(path))
+    gender_gap_handler.INDUSTRY_CACHE.refresh()
+
+
+class Master:
+    """Forks and supervises generations of workers sharing one listening socket"""
+
+    def __init__(self, listener, workers, snapshot_path):
+        self.listener = listener
+        self.workers = workers
+        self.snapshot_path = snapshot_path
+        self.children = {}  # pid -> generation
+        self.generation = 0
+        self.retiring = {}  # pid -> deadline
+        self.reload_requested = False
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.listener)
+            except Exception as e:
+                logger.error("Worker %d failed: %s", os.getpid(), e)
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = self.generation
+        return pid
+
+    def spawn_generation(self):
+        # Keep the inherited data out of the workers' garbage collections, which
+        # would otherwise write to (and so copy) every page holding it
+        gc.freeze()
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info("Started generation %d: %d workers", self.generation, self.workers)
+
+    def retire(self, pids):
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        for pid in pids:
+            self.retiring[pid] = deadline
+            self.signal(pid, signal.SIGTERM)
+
+    def signal(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reload(self):
+        """Rebuild the data, then replace every worker without dropping a connection"""
+        gc.unfreeze()
+        try:
+            load_snapshots(self.snapshot_path)
+        except Exception as e:
+            logger.error("Reload failed, keeping the current workers: %s", e)
+            return
+        old = [pid for pid, generation in self.children.items() if generation == self.generation]
+        self.spawn_generation()
+        self.retire(old)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.children.pop(pid, None)
+            if self.retiring.pop(pid, None) is None and generation == self.generation and not self.stopping:
+                logger.warning("Worker %d exited unexpectedly (status %d), restarting", pid, status)
+                self.spawn()
+
+    def run(self):
+        signal.signal(signal.SIGHUP, lambda signum, frame: setattr(self, 'reload_requested', True))
+        signal.signal(signal.SIGTERM, lambda signum, frame: setattr(self, 'stopping', True))
+        signal.signal(signal.SIGINT, lambda signum, frame: setattr(self, 'stopping', True))
+        self.spawn_generation()
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            self.reap()
+            now = time.monotonic()
+            for pid, deadline in list(self.retiring.items()):
+                if now > deadline:
+                    self.signal(pid, signal.SIGKILL)
+            time.sleep(0.2)
+        self.shutdown()
+
+    def shutdown(self):
+        logger.info("Shutting down %d workers", len(self.children))
+        self.retire(list(self.children))
+        while self.children:
+            self.reap()
+            now = time.monotonic()
+            for pid, deadline in list(self.retiring.items()):
+                if now > deadline:
+                    self.signal(pid, signal.SIGKILL)
+            time.sleep(0.1)
+        self.listener.close()
+
+
+def create_listener(host, port, backlog=1024):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    # Every worker polls this socket; whoever loses the race for a connection must not block in accept()
+    listener.setblocking(False)
+    return listener
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the API with a pool of worker processes')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH, help='data snapshot file shared by the workers')
+    parser.add_argument('--reuse-snapshot', action='store_true',
+                        help='serve an existing snapshot file instead of loading from the database')
+    args = parser.parse_args()
+
+    load_snapshots(args.snapshot, reuse=args.reuse_snapshot)
+    listener = create_listener(args.host, args.port)
+    logger.info("Listening on %s:%d with %d workers", args.host, args.port, args.workers)
+    Master(listener, args.workers, args.snapshot).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+# Every group, for stats()
+_GROUPS = []
+
+
+class _Call:
+    """One in-flight computation and the outcome its waiters share"""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class FlightTimeout(TimeoutError):
+    """A caller stopped waiting for a shared computation; the computation carries on"""
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one computation.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception) instead of
+    repeating the work. Nothing is kept afterwards: a later call for the key
+    runs again. Results are shared, so callers must not modify them.
+
+    do() is for threads (the prefork server, the database pool); do_async()
+    is for coroutines on one event loop (the ASGI app).
+
+    With an `executor`, do() runs the computation there instead of on the
+    first caller's thread, so every caller, the first one included, can stop
+    waiting at its own timeout while the computation finishes for the rest.
+    """
+
+    def __init__(self, name, executor=None):
+        self.name = name
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.calls = 0
+        self.executions = 0
+        self.timeouts = 0
+        _GROUPS.append(self)
+
+    def do(self, key, fn, *args, timeout=None):
+        """Return fn(*args), sharing the call with any concurrent call for key.
+
+        timeout bounds only this caller's wait: FlightTimeout is raised and
+        the call carries on. Without an executor the first caller runs fn
+        itself, so only the callers joining it can time out.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if leader:
+            if self._executor is None:
+                return self._run(key, call, fn, args)
+            self._executor.submit(self._run, key, call, fn, args)
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise FlightTimeout(f"{self.name} still running after {timeout:.3f}s")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _run(self, key, call, fn, args):
+        try:
+            call.result = fn(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, fn, *args):
+        """Await fn(*args), sharing the call with any concurrent call for key on this loop"""
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(key)
+            if task is None:
+                self.executions += 1
+                task = self._tasks[key] = asyncio.ensure_future(fn(*args))
+                task.add_done_callback(lambda done: self._tasks.pop(key, None))
+        # shield(): a waiter that is cancelled (client gone) must not cancel the others
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """Calls made, computations actually run, and calls collapsed into another"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'collapsed': self.calls - self.executions,
+                'timeouts': self.timeouts,
+                'in_flight': len(self._calls) + len(self._tasks)
+            }
+
+
+def stats():
+    """{group name: counters} for every SingleFlight"""
+    return {group.name: group.stats() for group in _GROUPS}
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import random
+import time
+
+# Default level for every module logger, e.g. LOG_LEVEL=WARNING
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+# Per-module overrides, e.g. LOG_LEVELS="handler=DEBUG,pymysql=WARNING"
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+
+# Fraction of sampled (high-volume) records that are actually written
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+
+# Pass as ``extra=SAMPLED`` on hot-path messages so only a fraction is emitted
+SAMPLED = {'sample_rate': LOG_SAMPLE_RATE}
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RESERVED_ATTRS = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {
+    'message', 'asctime', 'sample_rate', 'aws_request_id'
+}
+
+_CONFIGURED = False
+
+
+class JsonFormatter(logging.Formatter):
+    """Render log records as one JSON object per line"""
+
+    def format(self, record):
+        document = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                         + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        request_id = getattr(record, 'aws_request_id', None)
+        if request_id:
+            document['requestId'] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS:
+                document[key] = value
+        if record.exc_info:
+            document['exception'] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Drop records carrying a ``sample_rate`` attribute with that probability's complement"""
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        if rate is None:
+            return True
+        return rate > 0 and random.random() < rate
+
+
+def parse_levels(spec):
+    """Parse "name=LEVEL,name=LEVEL" into a dict"""
+    levels = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """Install the JSON formatter and sampling filter on the root handlers (idempotent)"""
+    global _CONFIGURED
+
+    if _CONFIGURED:
+        return
+
+    root = logging.getLogger()
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+
+    formatter = JsonFormatter()
+    sampling = SamplingFilter()
+    for handler in root.handlers:
+        handler.setFormatter(formatter)
+        handler.addFilter(sampling)
+
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _CONFIGURED = True
+
+
+def get_logger(name):
+    """Return a module logger after making sure structured logging is configured"""
+    configure_logging()
+    return logging.getLogger(name)
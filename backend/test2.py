@@ -1,11 +1,11 @@
 import json
-from handler import lambda_handler, load_all_data, EMPLOYEES_DATA, WEEKLY_EARNINGS_DATA, HOURLY_EARNINGS_DATA
+from handler import lambda_handler, DATA_CACHE
 
 # 强制重新加载数据
-import handler
-handler.DATA_LOADED = False
-
-load_all_data()
+snapshot = DATA_CACHE.refresh()
+EMPLOYEES_DATA = snapshot.data['employees']
+WEEKLY_EARNINGS_DATA = snapshot.data['weekly_earnings']
+HOURLY_EARNINGS_DATA = snapshot.data['hourly_earnings']
 
 print("=== 调试信息 ===")
 print(f"员工数据: {len(EMPLOYEES_DATA)} 年")
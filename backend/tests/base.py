@@ -0,0 +1,11 @@
+from request_deadline import DEADLINE_MARGIN_MS
+
+
+class LambdaContext:
+    """A Lambda context leaving `ms` milliseconds of request budget"""
+
+    def __init__(self, ms):
+        self.ms = ms
+
+    def get_remaining_time_in_millis(self):
+        return DEADLINE_MARGIN_MS + self.ms
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import asgi
+import router
+
+
+async def request(method, path, body=b'', headers=()):
+    """Run one HTTP request through the app; returns (status, headers, body)"""
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app(scope, receive, send)
+    start, content = sent
+    return start['status'], dict(start['headers']), content['body']
+
+
+class AppTestCase(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.threads = []
+        self.ready = mock.Mock()
+        self.ready.ready.return_value = True
+        patchers = [
+            mock.patch.dict(router.ROUTES, {('POST', '/score'): self.score, ('POST', '/query'): self.query},
+                            clear=True),
+            mock.patch.object(asgi, 'BLOCKING_HANDLERS', {self.query}),
+            mock.patch.object(router, 'DATA_CACHES', (self.ready,)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def score(self, event, context):
+        self.threads.append(threading.current_thread())
+        return {'statusCode': 200, 'body': event['body']}
+
+    def query(self, event, context):
+        self.threads.append(threading.current_thread())
+        self.release.wait(5)
+        return {'statusCode': 200, 'headers': {'Server-Timing': 'query;dur=1'}, 'body': str(len(self.threads))}
+
+
+class TestHTTP(AppTestCase):
+    def test_scoring_runs_on_the_loop(self):
+        status, headers, body = asyncio.run(request('POST', '/score', b'{"a": 1}'))
+        self.assertEqual((status, body), (200, b'{"a": 1}'))
+        self.assertEqual(headers[b'content-length'], b'8')
+        self.assertIs(self.threads[0], threading.current_thread())
+
+    def test_scoring_waits_on_the_pool_until_the_data_is_loaded(self):
+        self.ready.ready.return_value = False
+        asyncio.run(request('POST', '/score', b'{}'))
+        self.assertTrue(self.threads[0].name.startswith('db'))
+
+    def test_unrouted(self):
+        status, _, body = asyncio.run(request('GET', '/nowhere'))
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(body)['error']['code'], 'NOT_FOUND')
+
+    def test_handler_error_is_500(self):
+        router.ROUTES[('POST', '/score')] = mock.Mock(side_effect=RuntimeError('boom'))
+        status, _, body = asyncio.run(request('POST', '/score'))
+        self.assertEqual(status, 500)
+        self.assertEqual(json.loads(body)['error']['code'], 'INTERNAL_ERROR')
+
+
+class TestPooledRequests(AppTestCase):
+    async def burst(self, *requests):
+        tasks = [asyncio.ensure_future(request('POST', '/query', body, headers)) for body, headers in requests]
+        await asyncio.sleep(0.05)
+        self.release.set()
+        return await asyncio.gather(*tasks)
+
+    def test_identical_requests_share_one_call(self):
+        responses = asyncio.run(self.burst((b'{}', ()), (b'{}', ()), (b'{}', ())))
+        self.assertEqual(len(self.threads), 1)
+        self.assertEqual({body for _, _, body in responses}, {b'1'})
+        self.assertTrue(self.threads[0].name.startswith('db'))
+
+    def test_different_bodies_are_not_shared(self):
+        asyncio.run(self.burst((b'{"a": 1}', ()), (b'{"a": 2}', ())))
+        self.assertEqual(len(self.threads), 2)
+
+    def test_server_timing_only_when_asked_for(self):
+        untimed, timed = asyncio.run(self.burst((b'{}', ()), (b'{}', (('X-Timing', '1'),))))
+        # Timed and untimed requests are separate calls
+        self.assertEqual(len(self.threads), 2)
+        self.assertNotIn(b'server-timing', untimed[1])
+        self.assertEqual(timed[1][b'server-timing'], b'query;dur=1')
+
+
+class TestLifespan(unittest.TestCase):
+    def test_startup_preloads_and_shutdown_stops_the_pool(self):
+        cache = mock.Mock()
+        executor = ThreadPoolExecutor(max_workers=1)
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        with mock.patch.object(router, 'DATA_CACHES', (cache,)), mock.patch.object(asgi, 'DB_EXECUTOR', executor):
+            asyncio.run(asgi.app({'type': 'lifespan'}, receive, send))
+        cache.preload.assert_called_once_with('background')
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        with self.assertRaises(RuntimeError):
+            executor.submit(print)
+
+
+if __name__ == '__main__':
+    unittest.main()
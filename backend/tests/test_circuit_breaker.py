@@ -0,0 +1,116 @@
+import threading
+import time
+import unittest
+
+from circuit_breaker import CLOSED, OPEN, CircuitBreaker, CircuitOpen
+
+
+def fail():
+    raise ConnectionError('database down')
+
+
+class Probe:
+    """Fails until healthy is set, counting its attempts"""
+
+    def __init__(self):
+        self.healthy = threading.Event()
+        self.attempts = 0
+
+    def __call__(self):
+        self.attempts += 1
+        if not self.healthy.is_set():
+            raise ConnectionError('still down')
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def breaker(self, **kwargs):
+        self.probe = Probe()
+        kwargs.setdefault('open_seconds', 0.01)
+        breaker = CircuitBreaker('test', self.probe, failure_rate=0.5, min_calls=4, window=10, **kwargs)
+        # Let the probe thread close the breaker and finish once the test is over
+        self.addCleanup(self.wait_for, lambda: not breaker.is_open())
+        self.addCleanup(self.probe.healthy.set)
+        return breaker
+
+    def trip(self, breaker):
+        for _ in range(4):
+            with self.assertRaises(ConnectionError):
+                breaker.call(fail)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertTrue(condition())
+
+    def test_passes_results_through(self):
+        breaker = self.breaker()
+        self.assertEqual(breaker.call(max, 1, 2), 2)
+        self.assertEqual(breaker.stats()['recent_calls'], 1)
+
+    def test_opens_at_the_failure_rate(self):
+        breaker = self.breaker()
+        breaker.call(int)
+        breaker.call(int)
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, CLOSED)
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        # Two of four failed
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.trips, 1)
+
+    def test_not_before_min_calls(self):
+        breaker = self.breaker()
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                breaker.call(fail)
+        self.assertFalse(breaker.is_open())
+
+    def test_open_fails_fast_without_calling(self):
+        breaker = self.breaker()
+        self.trip(breaker)
+        calls = []
+        with self.assertRaises(CircuitOpen):
+            breaker.call(calls.append, 1)
+        self.assertEqual(calls, [])
+        self.assertEqual(breaker.stats()['rejected'], 1)
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = self.breaker(slow_ms=1)
+        for _ in range(4):
+            breaker.call(time.sleep, 0.005, check_latency=False)
+        self.assertFalse(breaker.is_open())
+        for _ in range(4):
+            breaker.call(time.sleep, 0.005)
+        self.assertTrue(breaker.is_open())
+
+    def test_probe_closes_and_notifies(self):
+        breaker = self.breaker()
+        recovered = []
+        breaker.on_recover(fail)
+        breaker.on_recover(lambda: recovered.append(breaker.state))
+        self.trip(breaker)
+        # Still down: the probe keeps trying and the breaker stays open
+        self.wait_for(lambda: self.probe.attempts >= 2)
+        self.assertTrue(breaker.is_open())
+        self.probe.healthy.set()
+        self.wait_for(lambda: recovered)
+        # A failing listener does not stop the others
+        self.assertEqual(recovered, [CLOSED])
+        self.assertEqual(breaker.call(max, 1, 2), 2)
+        self.assertEqual(breaker.stats()['recent_failures'], 0)
+
+    def test_trips_again_after_closing(self):
+        breaker = self.breaker()
+        self.trip(breaker)
+        self.probe.healthy.set()
+        self.wait_for(lambda: not breaker.is_open())
+        self.probe.healthy.clear()
+        self.trip(breaker)
+        self.assertEqual(breaker.trips, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
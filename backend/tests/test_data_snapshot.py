@@ -0,0 +1,218 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from data_snapshot import DataNotReady, Snapshot, SnapshotCache, dump_snapshot, map_snapshot
+from earnings_cube import build_cube
+
+
+class SlowBuild:
+    """A build that blocks until released, recording the threads it ran on"""
+
+    def __init__(self, error=None):
+        self.release = threading.Event()
+        self.threads = []
+        self.error = error
+
+    def __call__(self, previous):
+        self.threads.append(threading.current_thread())
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {'previous': previous, 'builds': len(self.threads)}
+
+
+class TestFirstLoad(unittest.TestCase):
+    def cache(self, build, **kwargs):
+        self.addCleanup(getattr(build, 'release', threading.Event()).set)
+        return SnapshotCache('test', build, interval=0, **kwargs)
+
+    def test_loaded_off_the_callers_thread(self):
+        build = SlowBuild()
+        build.release.set()
+        cache = self.cache(build)
+        snapshot = cache.get(timeout=5)
+        self.assertEqual(snapshot.data['builds'], 1)
+        self.assertIsNot(build.threads[0], threading.current_thread())
+        self.assertIs(cache.get(timeout=0), snapshot)
+
+    def test_not_ready_by_deadline(self):
+        build = SlowBuild()
+        cache = self.cache(build)
+        start = time.monotonic()
+        with self.assertRaises(DataNotReady):
+            cache.get(timeout=0.05)
+        self.assertLess(time.monotonic() - start, 1)
+        with self.assertRaises(DataNotReady):
+            cache.get(timeout=0)
+        # The load carries on and both callers joined the same one
+        build.release.set()
+        self.assertEqual(cache.get(timeout=5).data['builds'], 1)
+
+    def test_preload_joined_by_requests(self):
+        build = SlowBuild()
+        cache = self.cache(build)
+        cache.preload('background')
+        with self.assertRaises(DataNotReady):
+            cache.get(timeout=0.05)
+        build.release.set()
+        self.assertEqual(cache.get(timeout=5).data['builds'], 1)
+
+    def test_preload_sync(self):
+        build = SlowBuild()
+        build.release.set()
+        cache = self.cache(build)
+        cache.preload('sync')
+        self.assertTrue(cache.ready())
+
+    def test_preload_off(self):
+        cache = self.cache(SlowBuild())
+        cache.preload('off')
+        self.assertFalse(cache.ready())
+
+    def test_failure_raised_then_retried(self):
+        build = SlowBuild(error=ValueError('database down'))
+        build.release.set()
+        cache = self.cache(build)
+        with self.assertRaises(ValueError):
+            cache.get(timeout=5)
+        build.error = None
+        self.assertEqual(cache.get(timeout=5).data['builds'], 2)
+
+    def test_fallback_when_first_load_fails(self):
+        build = SlowBuild(error=ValueError('database down'))
+        build.release.set()
+        cache = self.cache(build, fallback=lambda: Snapshot({'bundled': True}, 7))
+        snapshot = cache.get(timeout=5)
+        self.assertEqual(snapshot.data, {'bundled': True})
+        self.assertTrue(snapshot.describe()['stale'])
+        # The next successful load supersedes it
+        build.error = None
+        self.assertEqual(cache.refresh().version, 8)
+        self.assertFalse(cache.current.describe()['stale'])
+
+
+class TestRefresh(unittest.TestCase):
+    def loaded(self, build, **kwargs):
+        cache = SnapshotCache('test', build, interval=0, **kwargs)
+        cache.refresh()
+        return cache
+
+    def test_builds_on_the_published_data(self):
+        seen = []
+        cache = self.loaded(lambda previous: seen.append(previous) or {'n': len(seen)})
+        first = cache.current
+        second = cache.refresh()
+        self.assertEqual(seen, [None, first.data])
+        self.assertEqual((second.version, second.data), (2, {'n': 2}))
+        cache.refresh(full=True)
+        self.assertIsNone(seen[-1])
+
+    def test_readers_keep_the_old_snapshot_during_a_rebuild(self):
+        build = SlowBuild()
+        build.release.set()
+        cache = self.loaded(build)
+        old = cache.current
+        build.release.clear()
+        refresher = threading.Thread(target=cache.refresh)
+        refresher.start()
+        self.addCleanup(refresher.join)
+        self.addCleanup(build.release.set)
+        while len(build.threads) < 2:
+            time.sleep(0.001)
+        # Mid-build: no waiting and no half-built data
+        self.assertIs(cache.get(timeout=0), old)
+        build.release.set()
+        refresher.join()
+        self.assertEqual(cache.get(timeout=0).version, 2)
+        self.assertEqual(old.data['builds'], 1)
+
+    def test_failed_refresh_keeps_serving(self):
+        build = SlowBuild()
+        build.release.set()
+        cache = self.loaded(build)
+        old = cache.current
+        build.error = ValueError('database down')
+        with self.assertRaises(ValueError):
+            cache.refresh()
+        self.assertIs(cache.current, old)
+
+    def test_unchanged_stamp_skips_scheduled_refresh(self):
+        stamp = ['a']
+        builds = []
+        cache = self.loaded(lambda previous: builds.append(stamp[0]), stamp=lambda: stamp[0])
+        cache.refresh(force=False)
+        self.assertEqual(builds, ['a'])
+        stamp[0] = 'b'
+        cache.refresh(force=False)
+        self.assertEqual(builds, ['a', 'b'])
+
+    def test_request_refresh_rebuilds_in_the_background(self):
+        published = threading.Event()
+        builds = []
+
+        def build(previous):
+            builds.append(threading.current_thread())
+            if len(builds) == 2:
+                published.set()
+            return {}
+
+        cache = self.loaded(build)
+        cache.request_refresh()
+        self.assertTrue(published.wait(5))
+        self.assertIsNot(builds[1], threading.current_thread())
+        deadline = time.monotonic() + 5
+        while cache.current.version < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(cache.current.version, 2)
+
+
+class TestSnapshotFile(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'data.snapshot')
+        rows = [(('2024', 'NSW'), {'mean': 41.5}), (('2024', 'VIC'), {'mean': 39.0}),
+                (('2023', 'NSW'), {'mean': 40.0})]
+        self.cube = build_cube(rows, ['year', 'state'], ['mean'])
+        self.snapshot = Snapshot({'cube': self.cube, 'years': {'2024': {('NSW', 'C'): 3.0}}}, 4, stamp='s')
+
+    def test_round_trip(self):
+        dump_snapshot(self.snapshot, self.path)
+        mapped = map_snapshot(self.path)
+        self.assertEqual((mapped.version, mapped.stamp), (4, 's'))
+        self.assertEqual(mapped.data['years'], self.snapshot.data['years'])
+        cube = mapped.data['cube']
+        self.assertEqual(cube.get(('2024', 'NSW'), 'mean'), 41.5)
+        self.assertEqual(cube.get(('2024', 'VIC'), 'mean'), 39.0)
+        self.assertIsNone(cube.get(('2023', 'VIC'), 'mean'))
+        self.assertEqual(bytes(cube.values), bytes(self.cube.values))
+
+    def test_cells_backed_by_the_file(self):
+        dump_snapshot(self.snapshot, self.path)
+        values = map_snapshot(self.path).data['cube'].values
+        # A read-only view over the mapping, not a copy
+        self.assertIsInstance(values, memoryview)
+        self.assertTrue(values.readonly)
+        self.assertEqual(values.nbytes % 8, 0)
+
+    def test_replaced_file_leaves_mapped_snapshots_intact(self):
+        dump_snapshot(self.snapshot, self.path)
+        mapped = map_snapshot(self.path)
+        self.cube.set(('2024', 'NSW'), 'mean', 50.0)
+        dump_snapshot(Snapshot({'cube': self.cube}, 5), self.path)
+        self.assertEqual(mapped.data['cube'].get(('2024', 'NSW'), 'mean'), 41.5)
+        self.assertEqual(map_snapshot(self.path).data['cube'].get(('2024', 'NSW'), 'mean'), 50.0)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['data.snapshot'])
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a snapshot file')
+        with self.assertRaises(ValueError):
+            map_snapshot(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import pickle
+import random
+import unittest
+
+import earnings_cube
+import handler
+from earnings_cube import build_cube, merge_cube
+
+DIMENSIONS = ['year', 'state', 'industry', 'status']
+MEASURES = ['persons_weekly', 'persons_hourly', 'males_hourly', 'females_hourly']
+STATES = ['NSW', 'VIC', 'QLD', 'Australia']
+INDUSTRIES = list('ABCQ')
+STATUSES = ['Full-time', 'Part-time', 'Total']
+
+
+def survey_rows(years, seed=1):
+    """Rows as the loader builds them, with some suppressed (None) estimates and missing cells"""
+    rng = random.Random(seed)
+    rows = []
+    for year in years:
+        for state in STATES:
+            for industry in INDUSTRIES:
+                for status in STATUSES:
+                    if rng.random() < 0.1:
+                        continue
+                    values = {measure: None if rng.random() < 0.2 else round(rng.uniform(20, 3000), 2)
+                              for measure in MEASURES}
+                    rows.append(((year, state, industry, status), values))
+    return rows
+
+
+def as_dict(rows):
+    """The dict-of-tuples table the cube replaced"""
+    table = {}
+    for coords, values in rows:
+        for measure, value in values.items():
+            table[coords, measure] = value
+    return table
+
+
+def all_coords(years):
+    return [(year, state, industry, status)
+            for year in years for state in STATES + ['WA'] for industry in INDUSTRIES for status in STATUSES]
+
+
+class TestEarningsCube(unittest.TestCase):
+    def setUp(self):
+        self.rows = survey_rows(['2021', '2022', '2023'])
+        self.table = as_dict(self.rows)
+        self.cube = build_cube(self.rows, DIMENSIONS, MEASURES)
+
+    def assertMatches(self, cube, table, years):
+        for coords in all_coords(years):
+            many = cube.get_many(coords, MEASURES)
+            for measure in MEASURES:
+                expected = table.get((coords, measure))
+                self.assertEqual(cube.get(coords, measure), expected, (coords, measure))
+                self.assertEqual(many[measure], expected, (coords, measure))
+
+    def test_lookups_match_the_dict(self):
+        self.assertMatches(self.cube, self.table, ['2020', '2021', '2022', '2023'])
+
+    def test_slice_matches_the_dict(self):
+        selection = {'state': ['NSW', 'VIC', 'WA'], 'status': 'Total'}
+        expected = sorted((coords, value) for (coords, measure), value in self.table.items()
+                          if measure == 'males_hourly' and value is not None
+                          and coords[1] in ('NSW', 'VIC') and coords[3] == 'Total')
+        self.assertEqual(sorted(self.cube.slice('males_hourly', **selection)), expected)
+        self.assertEqual(list(self.cube.slice('males_hourly', year='1999')), [])
+
+    def test_latest(self):
+        self.assertEqual(self.cube.latest('year'), '2023')
+
+    def test_merge_new_year(self):
+        # Re-read the latest year (revised) and add a new one: the block-copy path
+        reloaded = survey_rows(['2023', '2024'], seed=2)
+        merged = merge_cube(self.cube, reloaded)
+        # Cells the reload names are replaced; the rest are kept
+        table = dict(self.table)
+        table.update(as_dict(reloaded))
+        self.assertMatches(merged, table, ['2021', '2022', '2023', '2024'])
+        self.assertEqual(merged.latest('year'), '2024')
+        # The published cube is left as it was
+        self.assertMatches(self.cube, self.table, ['2023', '2024'])
+
+    def test_merge_new_label_in_another_dimension(self):
+        reloaded = [(('2023', 'WA', 'A', 'Total'), {'persons_weekly': 1500.0})]
+        merged = merge_cube(self.cube, reloaded)
+        table = dict(self.table)
+        table.update(as_dict(reloaded))
+        self.assertMatches(merged, table, ['2021', '2022', '2023'])
+
+    def test_pickle_round_trip(self):
+        for protocol in (4, 5):
+            with self.subTest(protocol=protocol):
+                restored = pickle.loads(pickle.dumps(self.cube, protocol=protocol))
+                self.assertMatches(restored, self.table, ['2022', '2023'])
+
+    @unittest.skipUnless(earnings_cube._have_numpy, 'numpy is not installed')
+    def test_as_array(self):
+        view = self.cube.as_array('persons_weekly')
+        self.assertEqual(view.shape, self.cube.shape[:-1])
+        for (coords, measure), value in self.table.items():
+            if measure == 'persons_weekly' and value is not None:
+                index = tuple(self.cube.positions[name][label] for name, label in zip(DIMENSIONS, coords))
+                self.assertEqual(view[index], value)
+
+
+class TestIndustryBenchmark(unittest.TestCase):
+    def test_matches_the_rows(self):
+        measures = ['persons_hourly', 'males_hourly', 'females_hourly']
+        status = handler.EMPLOYMENT_STATUS_CATEGORIES['fullTime']
+        rows = [
+            (('2023', 'NSW', 'Q', status), {'persons_hourly': 50.0, 'males_hourly': 55.0, 'females_hourly': 44.0}),
+            (('2024', 'NSW', 'Q', status), {'persons_hourly': 52.0, 'males_hourly': 60.0, 'females_hourly': 45.0}),
+            (('2024', 'VIC', 'Q', status), {'persons_hourly': 51.0, 'males_hourly': None, 'females_hourly': 46.0}),
+        ]
+        data = {
+            'industry_mean_cube': build_cube(rows, DIMENSIONS, measures),
+            'hourly_earnings': {'2024': {('NSW', 'Q', 'Total'): {'value': 48.0, 'rse': 2.0}}},
+        }
+        benchmark = handler.get_industry_benchmark(data, 'Q', 'NSW', 'hourly', 'fullTime', 39.0)
+        self.assertEqual(benchmark['year'], '2024')
+        self.assertEqual((benchmark['meanEarnings'], benchmark['medianEarnings']), (52.0, 48.0))
+        self.assertEqual(benchmark['meanToMedianRatio'], round(52.0 / 48.0, 3))
+        self.assertEqual(benchmark['yourRateToMean'], 0.75)
+        self.assertEqual(benchmark['genderBreakdown'],
+                         {'malesMean': 60.0, 'femalesMean': 45.0, 'meanGapPercentage': 25.0})
+
+        vic = handler.get_industry_benchmark(data, 'Q', 'VIC', 'hourly', 'fullTime', 39.0)
+        self.assertIsNone(vic['medianEarnings'])
+        self.assertIsNone(vic['genderBreakdown']['meanGapPercentage'])
+        self.assertIsNone(handler.get_industry_benchmark(data, 'Q', 'TAS', 'hourly', 'fullTime', 39.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
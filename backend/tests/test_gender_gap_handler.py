@@ -0,0 +1,109 @@
+import json
+import threading
+import unittest
+from unittest import mock
+
+import gender_gap_handler
+from circuit_breaker import CircuitOpen
+from request_deadline import Deadline
+from singleflight import FlightTimeout
+from tests.base import LambdaContext
+
+ROWS = [{'year': '2024', 'male_weekly_earnings': 2000.0, 'female_weekly_earnings': 1800.0}]
+
+
+class HistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.addCleanup(gender_gap_handler.LAST_GOOD_HISTORY.clear)
+        self.deadlines = []
+        patcher = mock.patch.object(gender_gap_handler, 'query_historical_earnings_data', self.query)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def query(self, state, industry_code, deadline):
+        self.deadlines.append(deadline)
+        self.release.wait(5)
+        return ROWS, None
+
+    @staticmethod
+    def deadline(seconds):
+        return Deadline.for_request(budget_ms=seconds * 1000)
+
+
+class TestHistoricalEarnings(HistoryTestCase):
+    def test_result(self):
+        self.release.set()
+        data, error, stale = gender_gap_handler.get_historical_earnings_data('NSW', 'A', self.deadline(5))
+        self.assertEqual((data, error, stale), (ROWS, None, False))
+        self.assertEqual(gender_gap_handler.LAST_GOOD_HISTORY[('NSW', 'A')], ROWS)
+
+    def test_query_budget_is_not_the_callers(self):
+        self.release.set()
+        caller = self.deadline(0.5)
+        gender_gap_handler.get_historical_earnings_data('NSW', 'A', caller)
+        (used,) = self.deadlines
+        self.assertIsNot(used, caller)
+        self.assertGreater(used.expires, caller.expires)
+
+    def test_timeout_without_last_good(self):
+        with self.assertRaises(FlightTimeout):
+            gender_gap_handler.get_historical_earnings_data('NSW', 'B', self.deadline(0.05))
+
+    def test_timeout_serves_last_good(self):
+        gender_gap_handler.LAST_GOOD_HISTORY[('NSW', 'C')] = ['old']
+        data, error, stale = gender_gap_handler.get_historical_earnings_data('NSW', 'C', self.deadline(0.05))
+        self.assertEqual((data, error, stale), (['old'], None, True))
+
+    def test_late_result_still_recorded(self):
+        with self.assertRaises(FlightTimeout):
+            gender_gap_handler.get_historical_earnings_data('NSW', 'D', self.deadline(0.05))
+        self.release.set()
+        for _ in range(100):
+            if ('NSW', 'D') in gender_gap_handler.LAST_GOOD_HISTORY:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(gender_gap_handler.LAST_GOOD_HISTORY[('NSW', 'D')], ROWS)
+
+    def test_each_waiter_keeps_its_own_deadline(self):
+        results = {}
+
+        def long_waiter():
+            results['long'] = gender_gap_handler.get_historical_earnings_data('NSW', 'E', self.deadline(5))
+
+        waiter = threading.Thread(target=long_waiter)
+        waiter.start()
+        with self.assertRaises(FlightTimeout):
+            gender_gap_handler.get_historical_earnings_data('NSW', 'E', self.deadline(0.05))
+        self.release.set()
+        waiter.join(5)
+        self.assertEqual(results['long'], (ROWS, None, False))
+        self.assertEqual(len(self.deadlines), 1)
+
+    def test_circuit_open_serves_last_good(self):
+        gender_gap_handler.LAST_GOOD_HISTORY[('NSW', 'F')] = ['old']
+        with mock.patch.object(gender_gap_handler.db.DB_BREAKER, 'call', side_effect=CircuitOpen('down')):
+            data, _, stale = gender_gap_handler.get_historical_earnings_data('NSW', 'F', self.deadline(5))
+        self.assertEqual((data, stale), (['old'], True))
+
+
+class TestCalculateGenderGap(HistoryTestCase):
+    def call(self, industry):
+        event = {'httpMethod': 'POST', 'body': json.dumps({'state': 'NSW', 'industry': industry})}
+        return gender_gap_handler.calculate_gender_gap(event, LambdaContext(50))
+
+    def test_timeout_returns_503(self):
+        response = self.call('G')
+        self.assertEqual(response['statusCode'], 503)
+        self.assertEqual(json.loads(response['body'])['error']['code'], 'DATABASE_UNAVAILABLE')
+
+    def test_timeout_with_last_good_is_stale(self):
+        gender_gap_handler.LAST_GOOD_HISTORY[('NSW', 'H')] = ROWS
+        response = self.call('H')
+        self.assertEqual(response['statusCode'], 200)
+        self.assertTrue(json.loads(response['body'])['data']['data_version']['stale'])
+
+
+if __name__ == '__main__':
+    unittest.main()
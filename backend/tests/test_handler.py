@@ -0,0 +1,307 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import db
+import handler
+from circuit_breaker import CircuitBreaker
+from data_snapshot import Snapshot, SnapshotCache, dump_snapshot
+from instrumentation import RequestTrace
+from tests.base import LambdaContext
+
+
+def earnings(value):
+    return {'value': value, 'rse': 5.0}
+
+
+def wage_data():
+    """A minimal snapshot for one industry (C) and two years"""
+    hourly = {
+        '2023': {('NSW', 'C', 'Bachelor Degree'): earnings(40.0),
+                 ('Australia', 'C', 'Certificate III or IV'): earnings(38.0)},
+        '2024': {('NSW', 'C', 'Bachelor Degree'): earnings(44.0),
+                 ('Australia', 'C', 'Certificate III or IV'): earnings(40.0)},
+    }
+    return {
+        'occupation': {'2211': {'occupation': 'Accountants', 'hourly_earnings': 45.0, 'weekly_earnings': 1800.0}},
+        'hourly_earnings': hourly,
+        'weekly_earnings': {},
+        'anchor_education': {'C': 'Certificate III or IV'},
+        'baselines': {'hourly': {'C': earnings(40.0)}, 'weekly': {}},
+        'industry_mean_cube': None,
+        'percentile_curves': {},
+        'percentile_year': None,
+    }
+
+
+INPUT = {
+    'occupation': 'Accountants',
+    'industry': 'C',
+    'education': 'Bachelor Degree',
+    'location': 'NSW',
+    'currentHourlyRate': 50,
+    'yearsExperience': 5,
+    'workIntensity': 100,
+    'earningsType': 'hourly',
+    'scoringMode': 'ratio',
+    'sex': 'Persons',
+    'employmentStatus': 'fullTime',
+}
+
+
+class TestCalculateFairnessScore(unittest.TestCase):
+    def test_stages_timed(self):
+        trace = RequestTrace()
+        response = handler.calculate_fairness_score(INPUT, wage_data(), trace)
+        stages = [stage for stage, _ in trace.timings]
+        self.assertEqual(stages, ['normalize_industry', 'get_occupation_base_salary', 'get_anchor_education',
+                                  'calculate_10_year_factors', 'response_assembly', 'industry_benchmark'])
+        self.assertEqual(response['anchorEducation'], 'Certificate III or IV')
+
+    def test_missing_anchor_fails_before_the_factors(self):
+        data = wage_data()
+        data['anchor_education'] = {}
+        trace = RequestTrace()
+        with self.assertRaisesRegex(ValueError, "industry code 'C'"):
+            handler.calculate_fairness_score(INPUT, data, trace)
+        self.assertEqual([stage for stage, _ in trace.timings][-1], 'get_anchor_education')
+
+
+class FakeConnection:
+    """Serves employee rows, honouring the `Survey month` >= %s filter"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=None):
+        self.connection.executed.append((query, args))
+        since = args[0] if args else None
+        self.rows = [row for row in self.connection.rows if since is None or row['Survey month'] >= since]
+
+    def fetchall(self):
+        return self.rows
+
+
+def employees_row(month, state, industry, bachelors):
+    row = dict.fromkeys(['Postgraduate Degree', 'Graduate Diploma or Certificate', 'Advanced Diploma or Diploma',
+                         'Certificate III or IV', 'Other qualification', 'Without qualification'], 0)
+    row.update({'Survey month': month, 'State and territory': state, 'industry_code': industry,
+                'Bachelor Degree': bachelors})
+    return row
+
+
+class TestIncrementalReload(unittest.TestCase):
+    def test_survey_query(self):
+        self.assertEqual(handler.survey_query('SELECT 1', None), ('SELECT 1',))
+        query, args = handler.survey_query('SELECT 1', '2024')
+        self.assertIn('`Survey month` >= %s', query)
+        self.assertEqual(args, ('2024',))
+
+    def test_merge_years(self):
+        base = {'2022': {'a': 1}, '2023': {'a': 2}}
+        merged = handler.merge_years(base, {'2023': {'a': 3}, '2024': {'a': 4}})
+        self.assertEqual(merged, {'2022': {'a': 1}, '2023': {'a': 3}, '2024': {'a': 4}})
+        self.assertEqual(base['2023'], {'a': 2})
+        loaded = {'2024': {}}
+        self.assertIs(handler.merge_years(None, loaded), loaded)
+
+    def test_reload_reads_from_the_latest_month(self):
+        connection = FakeConnection([
+            employees_row('2022', 'Australia', 'C', 100),
+            employees_row('2023', 'Australia', 'C', 110),
+        ])
+        base = handler.load_employees_data(connection)
+        self.assertEqual(connection.executed[0][1], None)
+        self.assertEqual(sorted(base), ['2022', '2023'])
+
+        # The latest month is revised and a new one published
+        connection.rows = [
+            employees_row('2022', 'Australia', 'C', 100),
+            employees_row('2023', 'Australia', 'C', 115),
+            employees_row('2024', 'Australia', 'C', 120),
+        ]
+        reloaded = handler.load_employees_data(connection, base)
+        self.assertEqual(connection.executed[1][1], ('2023',))
+        key = ('Australia', 'C', 'Bachelor Degree')
+        self.assertEqual({year: counts[key] for year, counts in reloaded.items()},
+                         {'2022': 100.0, '2023': 115.0, '2024': 120.0})
+        # The published snapshot's table is left as it was
+        self.assertEqual(base['2023'][key], 110.0)
+        self.assertIs(reloaded['2022'], base['2022'])
+
+    def test_latest_year_artifacts_follow_the_reload(self):
+        data = {
+            'employees': {'2024': {('Australia', 'C', 'Bachelor Degree'): 5.0,
+                                   ('Australia', 'C', 'Certificate III or IV'): 9.0}},
+            'weekly_earnings': {'2024': {('Australia', 'C', 'Certificate III or IV'): earnings(1500.0)}},
+            'hourly_earnings': {},
+        }
+        derived = handler.derive_latest_year(data)
+        self.assertEqual(derived['anchor_education'], {'C': 'Certificate III or IV'})
+        self.assertEqual(derived['baselines'], {'weekly': {'C': earnings(1500.0)}, 'hourly': {}})
+
+
+class TestRunLoaders(unittest.TestCase):
+    def setUp(self):
+        self.connections = []
+        patchers = [
+            mock.patch.object(handler, 'get_db_connection', self.connect),
+            # Failures here must not trip the shared breaker for other tests
+            mock.patch.object(db, 'DB_BREAKER', CircuitBreaker('test', probe=None, min_calls=100)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def connect(self):
+        connection = mock.Mock()
+        self.connections.append(connection)
+        return connection
+
+    def test_concurrent_on_own_connections(self):
+        # Both loaders must be running at once to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def loader(connection, value):
+            barrier.wait()
+            return connection, value
+
+        results = handler.run_loaders([('a', loader, (1,)), ('b', loader, (2,))])
+        self.assertEqual(list(results), ['a', 'b'])
+        self.assertEqual([value for _, value in results.values()], [1, 2])
+        self.assertIsNot(results['a'][0], results['b'][0])
+        for connection in self.connections:
+            connection.close.assert_called_once_with()
+
+    def test_every_failure_raised_together(self):
+        finished = []
+
+        def fail(connection, message):
+            raise ValueError(message)
+
+        def slow(connection):
+            time.sleep(0.05)
+            finished.append(True)
+            return 'ok'
+
+        with self.assertRaises(handler.DataLoadError) as raised:
+            handler.run_loaders([('a', fail, ('no a',)), ('b', slow, ()), ('c', fail, ('no c',))])
+        errors = raised.exception.errors
+        self.assertEqual(list(errors), ['a', 'c'])
+        self.assertEqual(str(errors['c']), 'no c')
+        self.assertIn('2 loader(s) failed', str(raised.exception))
+        # The others still ran to completion, and every connection was closed
+        self.assertEqual(finished, [True])
+        self.assertEqual(len(self.connections), 3)
+        for connection in self.connections:
+            connection.close.assert_called_once_with()
+
+    def test_connection_failure_reported_per_loader(self):
+        with mock.patch.object(handler, 'get_db_connection', side_effect=OSError('refused')):
+            with self.assertRaises(handler.DataLoadError) as raised:
+                handler.run_loaders([('a', lambda connection: None, ())])
+        self.assertIsInstance(raised.exception.errors['a'], OSError)
+
+
+class TestLambdaHandler(unittest.TestCase):
+    def setUp(self):
+        self.loaded = threading.Event()
+        self.addCleanup(self.loaded.set)
+        cache = SnapshotCache('test wage data', self.build, interval=0)
+        patcher = mock.patch.object(handler, 'DATA_CACHE', cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def build(self, previous):
+        self.loaded.wait(5)
+        return wage_data()
+
+    def call(self, ms=2000):
+        event = {'httpMethod': 'POST', 'body': json.dumps(INPUT)}
+        response = handler.lambda_handler(event, LambdaContext(ms))
+        return response['statusCode'], json.loads(response['body'])
+
+    def test_not_ready_within_the_deadline_is_503(self):
+        start = time.monotonic()
+        status, body = self.call(ms=50)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(status, 503)
+        self.assertEqual(body['error']['code'], 'DATA_NOT_READY')
+
+    def test_served_once_loaded(self):
+        self.assertEqual(self.call(ms=50)[0], 503)
+        self.loaded.set()
+        status, body = self.call()
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data']['dataVersion']['version'], 1)
+        self.assertFalse(body['data']['dataVersion']['stale'])
+
+
+def fail_load():
+    raise handler.DataLoadError({'employees': ConnectionError('database down')})
+
+
+class TestBundledSnapshot(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'wage_data.snapshot')
+        patcher = mock.patch.object(handler, 'BUNDLED_SNAPSHOT', self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serve(self, build):
+        cache = SnapshotCache('test wage data', build, interval=0, fallback=handler.load_bundled_snapshot)
+        with mock.patch.object(handler, 'DATA_CACHE', cache):
+            response = handler.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(INPUT)}, LambdaContext(2000))
+        return response['statusCode'], json.loads(response['body'])
+
+    def test_none_without_a_file(self):
+        self.assertIsNone(handler.load_bundled_snapshot())
+
+    def test_served_stale_when_the_database_is_down(self):
+        dump_snapshot(Snapshot(wage_data(), 3), self.path)
+        status, body = self.serve(lambda previous: fail_load())
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data']['dataVersion']['version'], 3)
+        self.assertTrue(body['data']['dataVersion']['stale'])
+
+    def test_loaded_data_served_stale_while_the_breaker_is_open(self):
+        breaker = mock.Mock()
+        breaker.is_open.return_value = True
+        with mock.patch.object(db, 'DB_BREAKER', breaker):
+            status, body = self.serve(lambda previous: wage_data())
+        self.assertEqual(status, 200)
+        self.assertTrue(body['data']['dataVersion']['stale'])
+
+    def test_error_without_a_fallback(self):
+        status, body = self.serve(lambda previous: fail_load())
+        self.assertEqual(status, 500)
+        self.assertFalse(body['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
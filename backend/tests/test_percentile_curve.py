@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+import percentile_curve
+from percentile_curve import PercentileCurve, build_percentile_curves
+
+POINTS = [(10.0, 25.0), (20.0, 28.0), (25.0, 29.5), (30.0, 31.0), (40.0, 34.0), (50.0, 38.0),
+          (60.0, 42.0), (70.0, 47.0), (75.0, 50.0), (80.0, 54.0), (90.0, 65.0)]
+
+
+def grid(start, stop, steps):
+    return [start + (stop - start) * i / steps for i in range(steps + 1)]
+
+
+class TestPercentileCurve(unittest.TestCase):
+    def setUp(self):
+        self.curve = PercentileCurve(POINTS)
+
+    def test_passes_through_the_knots(self):
+        for percentile, value in POINTS:
+            with self.subTest(percentile=percentile):
+                self.assertAlmostEqual(self.curve.rank(value), percentile)
+        self.assertEqual(self.curve.knots(), {int(p): v for p, v in POINTS})
+
+    def test_monotone(self):
+        ranks = [self.curve.rank(rate) for rate in grid(0, 200, 4000)]
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertTrue(all(0 <= rank <= 100 for rank in ranks))
+
+    def test_monotone_with_flat_and_steep_segments(self):
+        # A plateau and a jump; a plain cubic spline overshoots around both
+        curve = PercentileCurve([(10, 20.0), (25, 20.5), (50, 21.0), (75, 60.0), (90, 61.0)])
+        ranks = [curve.rank(rate) for rate in grid(15, 70, 5000)]
+        self.assertEqual(ranks, sorted(ranks))
+        for low, high in zip(curve.xs, curve.xs[1:]):
+            inside = [curve.rank(rate) for rate in grid(low, high, 200)]
+            self.assertGreaterEqual(min(inside), curve.rank(low) - 1e-9)
+            self.assertLessEqual(max(inside), curve.rank(high) + 1e-9)
+
+    def test_below_the_first_knot(self):
+        self.assertEqual(self.curve.rank(0), 0.0)
+        self.assertEqual(self.curve.rank(-5), 0.0)
+        self.assertAlmostEqual(self.curve.rank(12.5), 5.0)
+        self.assertAlmostEqual(self.curve.rank(25.0 - 1e-9), 10.0)
+
+    def test_beyond_the_last_knot(self):
+        self.assertAlmostEqual(self.curve.rank(65.0 + 1e-9), 90.0)
+        self.assertAlmostEqual(self.curve.rank(130.0), 95.0)
+        self.assertLess(self.curve.rank(1e9), 100.0)
+        self.assertAlmostEqual(self.curve.rank(1e12), 100.0)
+
+    def test_rank_many_matches_rank(self):
+        rates = [-1, 0, 10, 25, 26.7, 38, 44.4, 65, 80, 1e6]
+        expected = [self.curve.rank(rate) for rate in rates]
+        modes = (True, False) if percentile_curve._have_numpy else (False,)
+        for numpy in modes:
+            with self.subTest(numpy=numpy), mock.patch.object(percentile_curve, '_have_numpy', numpy):
+                ranks = self.curve.rank_many(rates)
+                self.assertEqual(len(ranks), len(rates))
+                for rank, value in zip(ranks, expected):
+                    self.assertAlmostEqual(rank, value)
+
+    def test_noisy_points_dropped(self):
+        curve = PercentileCurve([(10, 25.0), (20, None), (25, 24.0), (50, 38.0), (75, 0), (90, 65.0)])
+        self.assertEqual(curve.knots(), {10: 25.0, 50: 38.0, 90: 65.0})
+
+    def test_two_points(self):
+        curve = PercentileCurve([(10, 20.0), (90, 60.0)])
+        self.assertAlmostEqual(curve.rank(40.0), 50.0)
+
+    def test_too_few_points(self):
+        with self.assertRaises(ValueError):
+            PercentileCurve([(50, 38.0), (90, 30.0)])
+        curves = build_percentile_curves({'ok': POINTS, 'short': [(50, 38.0)]})
+        self.assertEqual(list(curves), ['ok'])
+
+
+if __name__ == '__main__':
+    unittest.main()
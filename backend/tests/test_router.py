@@ -0,0 +1,82 @@
+import json
+import unittest
+from unittest import mock
+
+import db
+import router
+
+
+class TestRefreshData(unittest.TestCase):
+    def test_clears_query_cache_and_refreshes_every_snapshot(self):
+        caches = (mock.Mock(), mock.Mock())
+        with mock.patch.object(router, 'DATA_CACHES', caches), \
+                mock.patch.object(db.QUERY_CACHE, 'clear') as clear:
+            response = router.lambda_handler({'refreshData': True}, None)
+        self.assertEqual(response['statusCode'], 202)
+        self.assertTrue(json.loads(response['body'])['success'])
+        clear.assert_called_once_with()
+        for cache in caches:
+            cache.request_refresh.assert_called_once_with()
+
+
+class TestDispatch(unittest.TestCase):
+    def setUp(self):
+        self.fairness = mock.Mock(return_value={'statusCode': 200})
+        self.options = mock.Mock(return_value={'statusCode': 200})
+        routes = {('POST', '/fairness/calculate'): self.fairness, ('GET', '/gender-gap/options'): self.options}
+        patcher = mock.patch.dict(router.ROUTES, routes, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rest_api_event(self):
+        event = {'httpMethod': 'POST', 'path': '/fairness/calculate', 'body': '{}'}
+        context = object()
+        self.assertEqual(router.lambda_handler(event, context), {'statusCode': 200})
+        self.fairness.assert_called_once_with(event, context)
+        self.options.assert_not_called()
+
+    def test_http_api_event(self):
+        event = {'rawPath': '/gender-gap/options', 'requestContext': {'http': {'method': 'get'}}}
+        router.lambda_handler(event, None)
+        self.options.assert_called_once_with(event, None)
+
+    def test_stage_prefix_and_trailing_slash(self):
+        event = {'httpMethod': 'GET', 'path': '/prod/gender-gap/options/', 'requestContext': {'stage': 'prod'}}
+        self.assertEqual(router.request_path(event), '/gender-gap/options')
+        router.lambda_handler(event, None)
+        self.options.assert_called_once()
+
+    def test_resource_preferred_over_path(self):
+        event = {'httpMethod': 'GET', 'resource': '/gender-gap/options', 'path': '/prod/gender-gap/options'}
+        self.assertEqual(router.request_path(event), '/gender-gap/options')
+
+    def test_unknown_path_is_404(self):
+        response = router.lambda_handler({'httpMethod': 'GET', 'path': '/nowhere'}, None)
+        self.assertEqual(response['statusCode'], 404)
+        self.assertEqual(json.loads(response['body'])['error']['code'], 'NOT_FOUND')
+
+    def test_wrong_method_is_405(self):
+        response = router.lambda_handler({'httpMethod': 'GET', 'path': '/fairness/calculate'}, None)
+        self.assertEqual(response['statusCode'], 405)
+        self.assertEqual(response['headers']['Allow'], 'POST, OPTIONS')
+        self.fairness.assert_not_called()
+
+    def test_preflight_answered_by_the_owning_endpoint(self):
+        event = {'requestContext': {'http': {'method': 'OPTIONS'}}, 'rawPath': '/fairness/calculate'}
+        router.lambda_handler(event, None)
+        (forwarded, _), _ = self.fairness.call_args
+        self.assertEqual(forwarded['httpMethod'], 'OPTIONS')
+        self.assertNotIn('httpMethod', event)
+
+
+class TestRoutes(unittest.TestCase):
+    def test_preflight(self):
+        for path in ('/fairness/calculate', '/gender-gap/calculate', '/gender-gap/options'):
+            with self.subTest(path=path):
+                response = router.lambda_handler({'httpMethod': 'OPTIONS', 'path': path}, None)
+                self.assertEqual(response['statusCode'], 200)
+                self.assertEqual(response['headers']['Access-Control-Allow-Origin'], '*')
+
+
+if __name__ == '__main__':
+    unittest.main()
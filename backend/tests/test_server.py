@@ -0,0 +1,114 @@
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import gender_gap_handler
+import handler
+import router
+import server
+from data_snapshot import SnapshotCache
+from earnings_cube import build_cube
+
+
+class TestWorkerServer(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        routes = {('POST', '/echo'): self.echo}
+        patcher = mock.patch.dict(router.ROUTES, routes, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        listener = server.create_listener('127.0.0.1', 0)
+        self.worker = server.WorkerServer(listener, threads=2)
+        thread = threading.Thread(target=self.worker.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.worker.server_close)
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.worker.shutdown)
+        self.port = listener.getsockname()[1]
+
+    def echo(self, event, context):
+        self.events.append(event)
+        return {'statusCode': 201, 'headers': {'X-Echo': 'yes'}, 'body': event['body']}
+
+    def connection(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        self.addCleanup(connection.close)
+        return connection
+
+    def post(self, connection, body):
+        connection.request('POST', '/echo?x=1', body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response, response.read().decode('utf-8')
+
+    def test_request_becomes_a_proxy_event(self):
+        response, body = self.post(self.connection(), '{"a": 1}')
+        self.assertEqual((response.status, body), (201, '{"a": 1}'))
+        self.assertEqual(response.getheader('X-Echo'), 'yes')
+        (event,) = self.events
+        self.assertEqual((event['httpMethod'], event['path']), ('POST', '/echo'))
+        self.assertEqual(event['queryStringParameters'], {'x': '1'})
+
+    def test_keep_alive(self):
+        connection = self.connection()
+        for index in range(3):
+            response, body = self.post(connection, str(index))
+            self.assertEqual(body, str(index))
+            self.assertIsNone(response.getheader('Connection'))
+
+    def test_draining_closes_connections_after_the_response(self):
+        connection = self.connection()
+        self.post(connection, '1')
+        self.worker.draining = True
+        response, body = self.post(connection, '2')
+        self.assertEqual(body, '2')
+        self.assertEqual(response.getheader('Connection'), 'close')
+
+    def test_unrouted(self):
+        connection = self.connection()
+        connection.request('GET', '/nowhere')
+        response = connection.getresponse()
+        self.assertEqual(response.status, 404)
+        self.assertEqual(json.loads(response.read())['error']['code'], 'NOT_FOUND')
+
+
+class TestLoadSnapshots(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'data.snapshot')
+        self.builds = 0
+        caches = [
+            mock.patch.object(handler, 'DATA_CACHE', SnapshotCache('wage data', self.build, interval=0)),
+            mock.patch.object(gender_gap_handler, 'INDUSTRY_CACHE',
+                              SnapshotCache('industry data', lambda previous: {}, interval=0)),
+        ]
+        for patcher in caches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def build(self, previous):
+        self.builds += 1
+        return {'cube': build_cube([(('2024',), {'mean': 40.0 + self.builds})], ['year'], ['mean'])}
+
+    def test_serves_the_mapped_copy(self):
+        server.load_snapshots(self.path)
+        snapshot = handler.DATA_CACHE.current
+        self.assertIsInstance(snapshot.data['cube'].values, memoryview)
+        self.assertEqual(snapshot.data['cube'].get(('2024',), 'mean'), 41.0)
+        self.assertTrue(gender_gap_handler.INDUSTRY_CACHE.ready())
+
+    def test_reuse_skips_the_load(self):
+        server.load_snapshots(self.path)
+        server.load_snapshots(self.path, reuse=True)
+        self.assertEqual(self.builds, 1)
+        server.load_snapshots(self.path)
+        self.assertEqual(handler.DATA_CACHE.current.data['cube'].get(('2024',), 'mean'), 42.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from singleflight import FlightTimeout, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def run_concurrently(self, count, target):
+        results = [None] * count
+
+        def run(index):
+            try:
+                results[index] = target(index)
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight('test')
+        release = threading.Event()
+        runs = []
+
+        def compute(value):
+            runs.append(value)
+            release.wait(5)
+            return [value]
+
+        def call(index):
+            if index == 0:
+                # Let the others join the first call before it finishes
+                threading.Timer(0.1, release.set).start()
+            return flights.do('key', compute, 42)
+
+        results = self.run_concurrently(8, call)
+        self.assertEqual(runs, [42])
+        self.assertEqual(results, [[42]] * 8)
+        self.assertTrue(all(result is results[0] for result in results))
+        stats = flights.stats()
+        self.assertEqual((stats['calls'], stats['executions'], stats['in_flight']), (8, 1, 0))
+
+    def test_error_shared_then_forgotten(self):
+        flights = SingleFlight('test')
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            raise ValueError('boom')
+
+        threading.Timer(0.1, release.set).start()
+        results = self.run_concurrently(4, lambda i: flights.do('key', compute))
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(len(calls), 1)
+        # Nothing is kept: the next call runs again
+        release.set()
+        with self.assertRaises(ValueError):
+            flights.do('key', compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_keys_run_separately(self):
+        flights = SingleFlight('test')
+        self.assertEqual(flights.do('a', lambda: 1), 1)
+        self.assertEqual(flights.do('b', lambda: 2), 2)
+        self.assertEqual(flights.stats()['executions'], 2)
+
+    def test_follower_times_out_without_executor(self):
+        flights = SingleFlight('test')
+        started, release = threading.Event(), threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        leader = threading.Thread(target=flights.do, args=('key', compute))
+        leader.start()
+        started.wait(5)
+        with self.assertRaises(FlightTimeout):
+            flights.do('key', compute, timeout=0.05)
+        release.set()
+        leader.join(5)
+        self.assertEqual(flights.stats()['timeouts'], 1)
+
+    def test_each_caller_waits_its_own_timeout(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        flights = SingleFlight('test', executor=executor)
+        release = threading.Event()
+
+        def compute():
+            release.wait(5)
+            return 'done'
+
+        # The first caller gives up at its own timeout too
+        start = time.monotonic()
+        with self.assertRaises(FlightTimeout):
+            flights.do('key', compute, timeout=0.05)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(flights.stats()['in_flight'], 1)
+
+        results = {}
+        waiter = threading.Thread(
+            target=lambda: results.setdefault('late', flights.do('key', compute, timeout=5))
+        )
+        waiter.start()
+        release.set()
+        waiter.join(5)
+        self.assertEqual(results, {'late': 'done'})
+        self.assertEqual(flights.stats()['executions'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
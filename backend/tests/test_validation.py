@@ -0,0 +1,162 @@
+import unittest
+
+import handler
+from validation import compile_schema
+
+
+SCHEMA = {
+    'name': {'type': 'str', 'allow_empty': False},
+    'count': {'type': 'int', 'min': 0, 'max': 10},
+    'rate': {'type': 'number', 'exclusive_min': 0},
+    'mode': {'type': 'str', 'required': False, 'default': 'a', 'choices': ['a', 'b']}
+}
+
+VALID = {
+    'occupation': 'Nurses',
+    'industry': 'Q',
+    'education': 'Bachelor Degree',
+    'location': 'NSW',
+    'currentHourlyRate': 45.5,
+    'yearsExperience': 5,
+    'workIntensity': 75
+}
+
+
+class TestCoercion(unittest.TestCase):
+    def setUp(self):
+        self.validator = compile_schema(SCHEMA)
+
+    def check(self, field, value):
+        record = {'name': 'x', 'count': 1, 'rate': 1}
+        record[field] = value
+        result = self.validator.validate(record)
+        if result.valid:
+            return result.data[field], None
+        (error,) = result.errors
+        return None, error['code']
+
+    def test_numbers_and_numeric_strings(self):
+        cases = [
+            ('count', '3', 3), ('count', ' 7 ', 7), ('count', 4.0, 4), ('count', '4.0', 4),
+            ('rate', '2.5', 2.5), ('rate', ' 1e2 ', 100.0), ('rate', 3, 3), ('rate', '3', 3.0),
+        ]
+        for field, value, expected in cases:
+            with self.subTest(field=field, value=value):
+                coerced, code = self.check(field, value)
+                self.assertIsNone(code)
+                self.assertEqual(coerced, expected)
+                self.assertIs(type(coerced), type(expected))
+
+    def test_rejected_types(self):
+        cases = [
+            ('count', True), ('count', False), ('count', 2.5), ('count', '2.5'), ('count', 'three'),
+            ('count', [1]), ('rate', True), ('rate', float('nan')), ('rate', 'nan'), ('rate', float('inf')),
+            ('rate', '-inf'), ('rate', ''), ('rate', {}), ('name', 5), ('name', True),
+        ]
+        for field, value in cases:
+            with self.subTest(field=field, value=value):
+                self.assertEqual(self.check(field, value), (None, 'type'))
+
+    def test_bounds(self):
+        cases = [('count', -1, 'range'), ('count', '11', 'range'), ('count', 10, None),
+                 ('rate', 0, 'range'), ('rate', '-0.5', 'range'), ('rate', 1e-9, None)]
+        for field, value, code in cases:
+            with self.subTest(field=field, value=value):
+                self.assertEqual(self.check(field, value)[1], code)
+
+    def test_missing_and_defaults(self):
+        result = self.validator.validate({'name': '  ', 'count': None})
+        self.assertEqual([(e['field'], e['code']) for e in result.errors],
+                         [('name', 'missing'), ('count', 'missing'), ('rate', 'missing')])
+        result = self.validator.validate({'name': 'x', 'count': 0, 'rate': 1, 'extra': [1]})
+        self.assertEqual(result.data, {'name': 'x', 'count': 0, 'rate': 1, 'mode': 'a', 'extra': [1]})
+
+    def test_not_an_object(self):
+        result = self.validator.validate(['name'])
+        self.assertFalse(result.valid)
+        self.assertEqual(result.errors[0]['code'], 'type')
+
+    def test_input_not_modified(self):
+        record = {'name': 'x', 'count': '3', 'rate': '1'}
+        self.validator.validate(record)
+        self.assertEqual(record, {'name': 'x', 'count': '3', 'rate': '1'})
+
+    def test_handler_schema(self):
+        result = handler.validate_input(dict(VALID, currentHourlyRate='45.5', yearsExperience='5'))
+        self.assertTrue(result['valid'])
+        self.assertEqual(result['data']['currentHourlyRate'], 45.5)
+        self.assertEqual(result['data']['yearsExperience'], 5)
+        self.assertEqual((result['data']['earningsType'], result['data']['scoringMode']), ('hourly', 'ratio'))
+        result = handler.validate_input(dict(VALID, workIntensity=float('nan'), yearsExperience=True))
+        self.assertEqual([e['field'] for e in result['errors']], ['yearsExperience', 'workIntensity'])
+
+
+class TestValidateBatch(unittest.TestCase):
+    def setUp(self):
+        self.validator = compile_schema(SCHEMA)
+
+    def test_mixed_batch(self):
+        records = [
+            {'name': 'x', 'count': '3', 'rate': 1.5},
+            {'name': ' ', 'count': 11, 'rate': 0},
+            'not a record',
+            {'name': 'y', 'count': 2.0, 'rate': '2', 'mode': 'b'},
+            {'count': True, 'rate': 'nan', 'mode': 'c'}
+        ]
+        cleaned, errors = self.validator.validate_batch(records)
+        self.assertEqual(cleaned[0], {'name': 'x', 'count': 3, 'rate': 1.5, 'mode': 'a'})
+        self.assertEqual(cleaned[3], {'name': 'y', 'count': 2, 'rate': 2.0, 'mode': 'b'})
+        self.assertEqual(sorted(errors), [1, 2, 4])
+        self.assertEqual([cleaned[i] for i in errors], [None, None, None])
+        self.assertEqual([(e['field'], e['code']) for e in errors[1]],
+                         [('name', 'missing'), ('count', 'range'), ('rate', 'range')])
+        self.assertEqual([e['code'] for e in errors[2]], ['type'])
+        self.assertEqual([(e['field'], e['code']) for e in errors[4]],
+                         [('name', 'missing'), ('count', 'type'), ('rate', 'type'), ('mode', 'choice')])
+
+    def test_matches_single_record_validation(self):
+        records = [
+            {'name': 'x', 'count': c, 'rate': r}
+            for c in (0, '5', 10, 11, -1, '2.5', None, [1])
+            for r in (1, '0.5', 0, 'inf', False, {})
+        ]
+        cleaned, errors = self.validator.validate_batch(records)
+        for index, record in enumerate(records):
+            with self.subTest(record=record):
+                result = self.validator.validate(record)
+                self.assertEqual(cleaned[index], result.data)
+                self.assertEqual(errors.get(index, []), result.errors)
+
+    def test_input_not_modified(self):
+        record = {'name': 'x', 'count': '3', 'rate': '1'}
+        self.validator.validate_batch([record])
+        self.assertEqual(record, {'name': 'x', 'count': '3', 'rate': '1'})
+
+    def test_empty_batch(self):
+        self.assertEqual(self.validator.validate_batch([]), ([], {}))
+
+
+class TestValidateBatchInput(unittest.TestCase):
+    def test_mixed_batch(self):
+        records = [
+            VALID,
+            dict(VALID, education='PhD'),
+            dict(VALID, scoringMode='percentile'),
+            dict(VALID, scoringMode='percentile', earningsType='weekly'),
+            dict(VALID, yearsExperience='51', workIntensity='high')
+        ] * 1000
+        cleaned, errors = handler.validate_batch_input(records)
+        self.assertEqual(len(cleaned), len(records))
+        self.assertEqual(sorted(errors), [i for i in range(len(records)) if i % 5 in (1, 3, 4)])
+        self.assertEqual(cleaned[0]['earningsType'], 'hourly')
+        self.assertEqual(cleaned[2]['scoringMode'], 'percentile')
+        self.assertEqual([e['field'] for e in errors[1]], ['education'])
+        self.assertEqual([e['field'] for e in errors[3]], ['scoringMode'])
+        self.assertEqual([e['field'] for e in errors[4]], ['yearsExperience', 'workIntensity'])
+        # Each record's errors are its own, not shared through the memoised checks
+        self.assertIsNot(errors[1], errors[6])
+        self.assertEqual(errors[1], errors[6])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+"""Declarative request schemas compiled once into fast validators.
+
+A schema is a dict mapping field name to a spec::
+
+    {
+        'type': 'str' | 'int' | 'number',
+        'required': True,          # default True
+        'default': 'hourly',       # used when the field is absent
+        'choices': [...],          # allowed values (checked with a frozenset)
+        'min': 0, 'max': 50,       # inclusive numeric bounds
+        'exclusive_min': 0,        # strict lower bound
+        'allow_empty': True,       # False treats '' / whitespace as missing
+        'message': '...'           # error message for type/range/choice failures
+    }
+
+Validators never mutate the input; they return a cleaned copy with defaults
+applied and numeric strings coerced.
+"""
+import math
+
+_MISSING = object()
+
+class ValidationResult:
+    """Outcome of validating one record"""
+    __slots__ = ('data', 'errors')
+
+    def __init__(self, data, errors):
+        self.data = data
+        self.errors = errors
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    @property
+    def message(self):
+        if not self.errors:
+            return 'Valid input'
+        return '; '.join(error['message'] for error in self.errors)
+
+    def as_dict(self):
+        return {'valid': self.valid, 'message': self.message, 'errors': self.errors, 'data': self.data}
+
+
+def _error(field, code, message):
+    return {'field': field, 'code': code, 'message': message}
+
+
+def _coerce_number(value, kind):
+    """Coerce value to int/float, returning _MISSING when it is not a finite number"""
+    value_type = type(value)
+    if value_type is bool:
+        return _MISSING
+    if value_type is str:
+        text = value.strip()
+        try:
+            value = int(text) if kind == 'int' else float(text)
+        except ValueError:
+            if kind != 'int':
+                return _MISSING
+            try:
+                value = float(text)
+            except ValueError:
+                return _MISSING
+        value_type = type(value)
+    if kind == 'int':
+        if value_type is float:
+            if not value.is_integer():
+                return _MISSING
+            return int(value)
+        return value if value_type is int else _MISSING
+    if value_type is int:
+        return value
+    # NaN passes every bound check and inf/NaN cannot be written back as JSON
+    if value_type is float and math.isfinite(value):
+        return value
+    return _MISSING
+
+
+class CompiledField:
+    """One schema field with its checks resolved up front"""
+    __slots__ = ('name', 'kind', 'required', 'default', 'choices', 'choice_list',
+                 'min', 'max', 'exclusive_min', 'allow_empty', 'message')
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.kind = spec.get('type', 'str')
+        if self.kind not in ('str', 'int', 'number'):
+            raise ValueError(f"Unsupported type '{self.kind}' for field '{name}'")
+        self.required = spec.get('required', True)
+        self.default = spec.get('default', _MISSING)
+        choices = spec.get('choices')
+        self.choice_list = list(choices) if choices is not None else None
+        self.choices = frozenset(choices) if choices is not None else None
+        self.min = spec.get('min')
+        self.max = spec.get('max')
+        self.exclusive_min = spec.get('exclusive_min')
+        self.allow_empty = spec.get('allow_empty', True)
+        self.message = spec.get('message') or self._default_message()
+
+    def _default_message(self):
+        if self.choice_list is not None:
+            return f'Invalid {self.name}. Must be one of: {self.choice_list}'
+        if self.kind == 'str':
+            return f'{self.name} must be a string'
+        return f'{self.name} must be a valid number'
+
+    def is_missing(self, value):
+        if value is _MISSING or value is None:
+            return True
+        return not self.allow_empty and type(value) is str and not value.strip()
+
+    def check(self, value):
+        """Return (coerced_value, error) for a present value"""
+        if self.kind != 'str':
+            value = _coerce_number(value, self.kind)
+            if value is _MISSING:
+                return None, _error(self.name, 'type', self.message)
+            if ((self.exclusive_min is not None and value <= self.exclusive_min)
+                    or (self.min is not None and value < self.min)
+                    or (self.max is not None and value > self.max)):
+                return None, _error(self.name, 'range', self.message)
+        elif type(value) is not str:
+            return None, _error(self.name, 'type', self.message)
+
+        if self.choices is not None and value not in self.choices:
+            return None, _error(self.name, 'choice', self.message)
+        return value, None
+
+
+class Validator:
+    """Validator compiled from a declarative schema"""
+
+    def __init__(self, schema):
+        self.fields = tuple(CompiledField(name, spec) for name, spec in schema.items())
+        self.field_names = frozenset(field.name for field in self.fields)
+
+    def validate(self, data):
+        """Validate one record, accumulating every error in a single pass"""
+        if not isinstance(data, dict):
+            return ValidationResult(None, [_error(None, 'type', 'Request body must be a JSON object')])
+
+        cleaned = dict(data)
+        errors = []
+        for field in self.fields:
+            value = data.get(field.name, _MISSING)
+            if field.is_missing(value):
+                if field.default is not _MISSING:
+                    cleaned[field.name] = field.default
+                elif field.required:
+                    errors.append(_error(field.name, 'missing', f'Missing required field: {field.name}'))
+                continue
+            value, error = field.check(value)
+            if error:
+                errors.append(error)
+            else:
+                cleaned[field.name] = value
+        return ValidationResult(cleaned if not errors else None, errors)
+
+    def validate_batch(self, records):
+        """Validate many records column by column.
+
+        Returns (cleaned, errors) where cleaned is a list aligned with records
+        (None for invalid rows) and errors maps row index to its error list.
+        """
+        cleaned = [dict(record) if isinstance(record, dict) else None for record in records]
+        errors = {}
+        for index, row in enumerate(cleaned):
+            if row is None:
+                errors[index] = [_error(None, 'type', 'Record must be a JSON object')]
+
+        for field in self.fields:
+            name = field.name
+            # Each distinct value is checked once for the whole column
+            verdicts = {}
+            for index, row in enumerate(cleaned):
+                if row is None:
+                    continue
+                value = row.get(name, _MISSING)
+                if field.is_missing(value):
+                    if field.default is not _MISSING:
+                        row[name] = field.default
+                    elif field.required:
+                        errors.setdefault(index, []).append(
+                            _error(name, 'missing', f'Missing required field: {name}'))
+                    continue
+                try:
+                    key = (type(value), value)
+                    outcome = verdicts.get(key)
+                    if outcome is None:
+                        outcome = verdicts[key] = field.check(value)
+                except TypeError:
+                    # Unhashable values (lists, dicts) cannot be memoised
+                    outcome = field.check(value)
+                coerced, error = outcome
+                if error:
+                    errors.setdefault(index, []).append(error)
+                else:
+                    row[name] = coerced
+
+        for index in errors:
+            cleaned[index] = None
+        return cleaned, errors
+
+
+def compile_schema(schema):
+    """Compile a declarative schema into a reusable Validator"""
+    return Validator(schema)